@@ -0,0 +1,106 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 笔趣阁类小说站点爬取工具
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2023-01-14 23:30:19
+LastEditTime : 2026-10-18 10:12:36
+FilePath     : /CODE/xjLib/xt_bqg/__init__.py
+Github       : https://github.com/sandorn/home
+==============================================================
+"""
+
+from __future__ import annotations
+
+from .aio import AsyncSession, acrawl, aget_download_url, aiter_contents, crawl_async
+from .batch import BookResult, batch_report, crawl_books
+from .cache import CachedResp, ResponseCache
+from .checkpoint import CheckpointStore, is_failed
+from .core import FailedRow, ahttp_get_contents, clean_content, get_contents, get_download_url, normalize_row, resp_handle, resps_handle
+from .corpus import CorpusStore, iter_saved_rows
+from .extract import PROFILES, SiteProfile, extract_chapter, extract_toc, parse_report
+from .hedge import HedgedFetcher, MirrorSet
+from .hybrid import acrawl_hybrid, crawl_hybrid
+from .incremental import ChapterFeed, extract_chapter_chunks
+from .limiter import AIMDController, HostLimiter
+from .pipeline import ReorderBuffer, iter_contents, stream_book
+from .readahead import ReadAhead
+from .retry import CircuitBreaker, RetryPolicy, RetryResult, crawl_with_retry
+from .search import SearchHit, SearchIndex
+from .stages import STAGES, StageTimer, save_rows, stage, timed
+from .toc import TocDiff, TocEntry, TocStore, build_toc, diff_toc, update_book
+from .trace import TraceRecorder, TraceReplayer, iter_trace, profile_trace, replay_trace, toc_urls
+from .urls import DEDUP_STATS, DedupResult, chapter_urls, dedup_report, dedup_toc, normalize_url, title_key
+
+__all__ = (
+    'AIMDController',
+    'AsyncSession',
+    'BookResult',
+    'CachedResp',
+    'ChapterFeed',
+    'CheckpointStore',
+    'CircuitBreaker',
+    'CorpusStore',
+    'DEDUP_STATS',
+    'DedupResult',
+    'FailedRow',
+    'HedgedFetcher',
+    'HostLimiter',
+    'MirrorSet',
+    'PROFILES',
+    'ReadAhead',
+    'ReorderBuffer',
+    'ResponseCache',
+    'RetryPolicy',
+    'RetryResult',
+    'STAGES',
+    'SearchHit',
+    'SearchIndex',
+    'SiteProfile',
+    'StageTimer',
+    'TocDiff',
+    'TocEntry',
+    'TocStore',
+    'TraceRecorder',
+    'TraceReplayer',
+    'acrawl',
+    'acrawl_hybrid',
+    'aget_download_url',
+    'ahttp_get_contents',
+    'aiter_contents',
+    'batch_report',
+    'build_toc',
+    'chapter_urls',
+    'clean_content',
+    'crawl_async',
+    'crawl_books',
+    'crawl_hybrid',
+    'crawl_with_retry',
+    'dedup_report',
+    'dedup_toc',
+    'diff_toc',
+    'extract_chapter',
+    'extract_chapter_chunks',
+    'extract_toc',
+    'get_contents',
+    'get_download_url',
+    'is_failed',
+    'iter_contents',
+    'iter_saved_rows',
+    'iter_trace',
+    'normalize_row',
+    'normalize_url',
+    'parse_report',
+    'profile_trace',
+    'replay_trace',
+    'resp_handle',
+    'resps_handle',
+    'save_rows',
+    'stage',
+    'stream_book',
+    'timed',
+    'title_key',
+    'toc_urls',
+    'update_book',
+)
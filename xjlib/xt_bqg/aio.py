@@ -0,0 +1,359 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 原生 asyncio 接口
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-19 00:12:54
+LastEditTime : 2026-10-19 00:12:54
+FilePath     : /CODE/xjLib/xt_bqg/aio.py
+Github       : https://github.com/sandorn/home
+==============================================================
+单个事件循环承载成千上万的在途章节请求,不需要每个请求占用一个线程:
+- AsyncSession: aiohttp 会话,全局并发由信号量限制,单主机并发由连接池限制
+- aget_download_url: 目录页解析,结果与 get_download_url 一致
+- aiter_contents: 异步生成器,章节完成即产出 [index, title, content](ordered=True 时按序号)
+- 解析默认在事件循环中执行;传入 executor(如 ProcessPoolExecutor)时移出事件循环
+- incremental=True 时正文边下载边解析(incremental.ChapterFeed),不缓存完整页面
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import contextlib
+import re
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from .cache import CachedResp, resp_text
+from .core import FailedRow, chapter_row, finish_toc, normalize_row, resp_handle
+from .extract import DEFAULT_PROFILE, SiteProfile, extract_toc
+from .hybrid import _parse_chunk
+from .incremental import ChapterFeed
+from .limiter import resp_ok, resp_status
+from .pipeline import ReorderBuffer
+from .stages import STAGES
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w-]+)', re.IGNORECASE)
+# 在页面开头这么多字节内查找 <meta> 编码声明
+_SNIFF_BYTES = 4096
+
+
+def _sniff_charset(resp: Any, body: bytes) -> str:
+    """响应头未声明编码时按页面 <meta> 的声明解码(如只在页面中声明 gbk 的站点),未声明时为 utf-8"""
+    match = _META_CHARSET.search(body[:_SNIFF_BYTES])
+    if match:
+        with contextlib.suppress(LookupError):
+            return codecs.lookup(match.group(1).decode('ascii')).name
+    return 'utf-8'
+
+
+class AsyncSession:
+    """信号量限流的 aiohttp 会话,get() 返回 CachedResp,可被 resp_handle 直接处理
+
+    示例用法:
+    >>> async with AsyncSession(concurrency=500, per_host=100) as session:
+    ...     bookname, urls, _ = await aget_download_url(url, session=session)
+    ...     async for index, title, content in aiter_contents(urls, session=session):
+    ...         ...
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 200,
+        per_host: int = 0,
+        timeout: float = 30.0,
+        headers: dict[str, str] | None = None,
+        limiter: HostLimiter | None = None,
+    ):
+        """
+        Args:
+            concurrency: 全局在途请求上限
+            per_host: 单主机连接数上限,0 表示不限
+            timeout: 单个请求的总超时秒数
+            headers: 默认请求头
+            limiter: 按主机自适应并发控制,与线程版共用同一个 HostLimiter
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = headers
+        self.limiter = limiter
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> AsyncSession:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                fallback_charset_resolver=_sniff_charset,
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch(self, url: str, **kwargs: Any) -> CachedResp:
+        async with self._semaphore, self._session.get(url, **kwargs) as resp:
+            body = await resp.read()
+            text = body.decode(resp.get_encoding(), 'replace')
+            return CachedResp(str(resp.url), text, resp.status, dict(resp.headers))
+
+    async def get(self, url: str, **kwargs: Any) -> CachedResp:
+        """请求url,网络错误时抛出异常"""
+        await self.open()
+        if self.limiter is None:
+            return await self._fetch(url, **kwargs)
+        async with self.limiter.aslot(url) as slot:
+            return slot.record(await self._fetch(url, **kwargs))
+
+    __call__ = get
+
+    async def get_chapter(
+        self,
+        url: str,
+        index: int = 0,
+        profile: SiteProfile = DEFAULT_PROFILE,
+        chunk_size: int = 16384,
+        limiter: HostLimiter | None = None,
+    ) -> list:
+        """请求章节页并边下载边解析,返回 [index, title, content],网络错误时抛出异常
+
+        limiter 未指定时使用会话自身的 limiter。
+        """
+        await self.open()
+        limiter = limiter or self.limiter
+        if limiter is None:
+            return await self._fetch_chapter(url, index, profile, chunk_size)
+        async with limiter.aslot(url) as slot:
+            return await self._fetch_chapter(url, index, profile, chunk_size, slot)
+
+    async def _fetch_chapter(self, url: str, index: int, profile: SiteProfile, chunk_size: int, slot: Any = None) -> list:
+        async with self._semaphore, self._session.get(url) as resp:
+            if slot is not None:
+                slot.record(CachedResp(str(resp.url), '', resp.status))
+            if resp.status >= 400:
+                return FailedRow([index, f'HTTP {resp.status}', ''])
+            feed = ChapterFeed(profile, resp.charset) if resp.charset else None
+            head = b''
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                if feed is None:
+                    # 响应头未声明编码: 先攒够页面开头,按 <meta> 声明确定编码
+                    head += chunk
+                    if len(head) < _SNIFF_BYTES:
+                        continue
+                    feed, chunk = ChapterFeed(profile, _sniff_charset(resp, head)), head
+                feed.feed(chunk)
+        if feed is None:
+            feed = ChapterFeed(profile, _sniff_charset(resp, head))
+            feed.feed(head)
+        page = feed.close()
+        return chapter_row(index, page.title, page.content)
+
+
+async def aget_download_url(
+    url: str,
+    *,
+    session: AsyncSession | None = None,
+    afn: Callable[[str], Awaitable[Any]] | None = None,
+    profile: SiteProfile = DEFAULT_PROFILE,
+    drop_similar: bool = False,
+) -> tuple[str, list[str], list[str]]:
+    """get_download_url 的协程版本,返回 (书名, 章节链接列表, 章节标题列表)
+
+    Args:
+        url: 目录页链接
+        session: 共用的会话,未提供 session 与 afn 时临时创建
+        afn: 异步请求函数 async (url) -> resp,优先于 session
+        profile: 站点解析配置
+        drop_similar: 是否丢弃标题近似重复的章节
+
+    Raises:
+        RuntimeError: 目录页请求失败(非响应对象或状态码 >= 400)
+    """
+    if afn is None and session is None:
+        async with AsyncSession() as temp:
+            return await aget_download_url(url, session=temp, profile=profile, drop_similar=drop_similar)
+    resp = await (afn or session.get)(url)
+    status = resp_status(resp)
+    if not resp_ok(resp) or (status or 200) >= 400:
+        msg = f'目录页请求失败: {url} ({f"HTTP {status}" if status else repr(resp)})'
+        raise RuntimeError(msg)
+    toc = extract_toc(resp_text(resp), profile)
+    return finish_toc(url, toc.bookname, toc.hrefs, toc.titles, drop_similar)
+
+
+async def aiter_contents(
+    urls: Iterable[str],
+    *,
+    session: AsyncSession | None = None,
+    afn: Callable[[str], Awaitable[Any]] | None = None,
+    start: int = 0,
+    concurrency: int = 200,
+    ordered: bool = False,
+    window: int | None = None,
+    executor: Executor | None = None,
+    store: CheckpointStore | None = None,
+    book: str | None = None,
+    limiter: HostLimiter | None = None,
+    incremental: bool = False,
+) -> AsyncIterator[list]:
+    """并发抓取章节,完成一章产出一章 [index, title, content]
+
+    在途请求数不超过 concurrency;生成器关闭时取消未完成的请求,
+    需要提前退出 async for 时用 contextlib.aclosing 包装可立即释放。
+
+    Args:
+        urls: 章节链接序列
+        session: 共用的会话,未提供 session 与 afn 时临时创建(并发上限为 concurrency)
+        afn: 异步请求函数 async (url) -> resp,优先于 session
+        start: 起始序号
+        concurrency: 同时在途的章节数
+        ordered: 按序号顺序产出,此时在途与暂存章节数不超过 window
+        window: ordered=True 时的重排窗口,默认 concurrency * 2
+        executor: 解析用的执行器,None 时在事件循环中解析
+        store: 断点存储,已成功的章节不再抓取,新结果实时写入
+        book: 断点存储中的书籍键
+        limiter: 按主机自适应并发控制(HostLimiter),请求前占用目标主机的并发名额;
+            会话已带 limiter 时由会话占用名额,两者须为同一个 HostLimiter
+        incremental: 通过 session.get_chapter 边下载边解析,不能与 afn、executor 同时使用
+    """
+    if store is not None and book is None:
+        msg = '使用断点存储时必须指定book'
+        raise ValueError(msg)
+    if incremental and (afn is not None or executor is not None):
+        msg = 'incremental=True 时不能指定 afn 或 executor'
+        raise ValueError(msg)
+
+    own_session = None
+    if afn is None:
+        if session is None:
+            session = own_session = AsyncSession(concurrency=concurrency)
+        afn = session.get
+    # 会话自带 limiter 时 session.get 已占用名额,不再包装,否则每个请求占两个名额
+    owner = getattr(afn, '__self__', None)
+    session_limiter = owner.limiter if isinstance(owner, AsyncSession) else None
+    if limiter is not None and session_limiter is not None and limiter is not session_limiter:
+        msg = 'limiter 与 session 自带的 limiter 不是同一个,每个请求会占用两个名额'
+        raise ValueError(msg)
+    if limiter is not None and session_limiter is None and not incremental:
+        afn = limiter.awrap(afn)
+
+    loop = asyncio.get_running_loop()
+    tasks = iter(enumerate(urls, start))
+    results: asyncio.Queue = asyncio.Queue()
+    buffer = ReorderBuffer(start, window or concurrency * 2) if ordered else None
+    # ordered 时用条件变量把取任务限制在重排窗口内
+    room = asyncio.Condition()
+
+    async def parse(index: int, url: str, resp: Any) -> list:
+        if executor is None or not isinstance(resp, CachedResp):
+            return normalize_row(index, resp_handle(resp))
+        item = (index, url, resp.text, resp.status)
+        return (await loop.run_in_executor(executor, _parse_chunk, [item]))[0]
+
+    async def fetch_row(index: int, url: str) -> list:
+        if incremental:
+            return await session.get_chapter(url, index, limiter=limiter)
+        begin = time.perf_counter_ns()
+        resp = await afn(url)
+        STAGES.record('fetch', time.perf_counter_ns() - begin)
+        return await parse(index, url, resp)
+
+    async def worker() -> None:
+        try:
+            await work()
+        finally:
+            running[0] -= 1
+            if not running[0]:
+                results.put_nowait(None)
+
+    async def work() -> None:
+        while True:
+            async with room:
+                item = next(tasks, None)
+                if item is not None and buffer is not None:
+                    await room.wait_for(lambda index=item[0]: buffer.accepts(index))
+            if item is None:
+                return
+            index, url = item
+            cached = store.get(book, index) if store is not None else None
+            if cached is not None:
+                await results.put(cached)
+                continue
+            try:
+                row = await fetch_row(index, url)
+            except Exception as e:
+                row = normalize_row(index, e)
+            if store is not None:
+                store.put(book, index, url, row)
+            await results.put(row)
+
+    running = [concurrency]
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        while (row := await results.get()) is not None:
+            if buffer is None:
+                yield row
+                continue
+            buffer.push(row[0], row)
+            ready = list(buffer.pop_ready())
+            if ready:
+                async with room:
+                    room.notify_all()
+            for item in ready:
+                yield item
+        if buffer is not None:
+            for item in buffer.drain():
+                yield item
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if own_session is not None:
+            await own_session.close()
+
+
+async def acrawl(urls: Iterable[str], **kwargs: Any) -> list[list]:
+    """抓取全部章节,返回按序号排序的 [index, title, content] 列表,参数同 aiter_contents"""
+    rows = [row async for row in aiter_contents(urls, **kwargs)]
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def crawl_async(url: str, concurrency: int = 200, **kwargs: Any) -> tuple[str, list[list]]:
+    """同步入口: 在新的事件循环中抓取整本书,返回 (书名, 章节列表)
+
+    示例用法:
+    >>> bookname, rows = crawl_async('https://www.bigee.cc/book/6909/', concurrency=500, per_host=100)
+    >>> save_file(f'{bookname}.txt', rows)
+    """
+    session_kwargs = {key: kwargs.pop(key) for key in ('per_host', 'timeout', 'headers', 'limiter') if key in kwargs}
+
+    async def main() -> tuple[str, list[list]]:
+        async with AsyncSession(concurrency=concurrency, **session_kwargs) as session:
+            bookname, urls, _ = await aget_download_url(url, session=session)
+            return bookname, await acrawl(urls, session=session, concurrency=concurrency, **kwargs)
+
+    return asyncio.run(main())
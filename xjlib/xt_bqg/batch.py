@@ -0,0 +1,268 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 多本书批量抓取与全局公平调度
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 21:43:27
+LastEditTime : 2026-10-18 21:43:27
+FilePath     : /CODE/xjLib/xt_bqg/batch.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 同时处理的书不超过 max_books,其余排队,内存与打开的文件数有上限
+- 各书轮流提交章节(每轮每本一章),大书不会挤占小书
+- 每个主机的在途请求不超过 per_host(传入 HostLimiter 时取其自适应上限),
+  某主机满载时调度其他主机的书,总并发由 max_workers 限制
+- 每本书按章节顺序流式写入各自的文件,格式与 save_file 一致;写入队列有上限,
+  写入失败时该书标记为失败(BookResult.error),不影响其他书
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import queue
+import re
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from xthttp import get
+
+from .checkpoint import is_failed
+from .core import get_contents, get_download_url, normalize_row
+from .limiter import host_of
+from .pipeline import ReorderBuffer
+from .stages import save_rows
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\r\n\t]')
+
+
+@dataclass(slots=True)
+class BookResult:
+    url: str
+    bookname: str = ''
+    filename: str = ''
+    chapters: int = 0
+    failed: int = 0
+    error: str = ''
+
+
+class _Book:
+    """调度中的一本书"""
+
+    def __init__(self, url: str, window: int, start: int):
+        self.url = url
+        self.host = host_of(url)
+        self.result = BookResult(url)
+        self.window = window
+        self.start = start
+        self.todo: deque[tuple[int, str]] = deque()
+        self.buffer: ReorderBuffer | None = None
+        self.total = 0
+        self.finished = 0
+        self.rows: queue.Queue | None = None
+        self.writer: threading.Thread | None = None
+        self.write_error: Exception | None = None
+        self._ended = False
+
+    def can_submit(self) -> bool:
+        return bool(self.todo) and self.buffer is not None and self.buffer.accepts(self.todo[0][0])
+
+    def open(self, filename: str, urls: list[str], br: str) -> None:
+        self.result.filename = filename
+        self.total = len(urls)
+        self.todo.extend(enumerate(urls, self.start))
+        self.buffer = ReorderBuffer(self.start, self.window)
+        self.rows = queue.Queue(maxsize=self.window)
+        self.writer = threading.Thread(target=self._write, args=(filename, br), name=f'writer-{self.result.bookname}')
+        self.writer.start()
+
+    def _pending(self) -> Iterator[list]:
+        while (row := self.rows.get()) is not None:
+            yield row
+        self._ended = True
+
+    def _write(self, filename: str, br: str) -> None:
+        """写入线程: 记录异常并继续取空队列,避免调度线程阻塞在有界队列上"""
+        try:
+            save_rows(filename, self._pending(), br)
+        except Exception as e:
+            self.write_error = e
+            while not self._ended and self.rows.get() is not None:
+                pass
+
+    def push(self, index: int, row: list) -> None:
+        self.buffer.push(index, row)
+        self.finished += 1
+        self.result.chapters += 1
+        if is_failed(row):
+            self.result.failed += 1
+        for ready in self.buffer.pop_ready():
+            self.rows.put(ready)
+
+    @property
+    def done(self) -> bool:
+        return self.buffer is not None and self.finished >= self.total
+
+    def close(self) -> None:
+        if self.rows is not None:
+            for ready in self.buffer.drain():
+                self.rows.put(ready)
+            self.rows.put(None)
+            self.writer.join()
+            if self.write_error is not None:
+                self.result.error = f'写入失败: {self.write_error!r}'
+
+
+def safe_filename(name: str) -> str:
+    """去掉 Windows 文件名中的非法字符"""
+    return _UNSAFE_CHARS.sub('_', name).strip(' .') or 'book'
+
+
+def crawl_books(
+    book_urls: Iterable[str],
+    out_dir: str | os.PathLike = '.',
+    *,
+    fn: Callable[..., Any] = get,
+    max_workers: int = 64,
+    per_host: int = 16,
+    max_books: int = 32,
+    window: int = 64,
+    start: int = 0,
+    br: str = '\n',
+    store: CheckpointStore | None = None,
+    limiter: HostLimiter | None = None,
+) -> list[BookResult]:
+    """批量抓取多本书,每本书写入 out_dir/{书名}.txt
+
+    Args:
+        book_urls: 书籍目录页链接
+        out_dir: 输出目录
+        fn: 请求函数
+        max_workers: 全局线程数(即全局在途请求上限)
+        per_host: 每个主机的在途请求上限
+        max_books: 同时处理的书籍数
+        window: 每本书的重排窗口,在途与暂存章节数上限
+        start: 章节起始序号
+        br: 元素结束标志,与 save_file 一致
+        store: 断点存储,以目录页url为书籍键,已成功的章节不再抓取
+        limiter: 按主机自适应并发控制,提供时主机上限取 min(per_host, 自适应上限)
+
+    Returns:
+        list[BookResult]: 与 book_urls 顺序一致
+
+    示例用法:
+    >>> results = crawl_books(book_urls, 'books', max_workers=128, per_host=32)
+    >>> mylog(batch_report(results))
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    waiting = deque(_Book(url, window, start) for url in dict.fromkeys(book_urls))
+    results = [book.result for book in waiting]
+    active: deque[_Book] = deque()
+    host_inflight: dict[str, int] = {}
+    running: dict[Future, tuple[_Book, int | None, str]] = {}
+    used_names: set[str] = set()
+
+    def host_cap(host: str) -> int:
+        if limiter is None:
+            return per_host
+        return min(per_host, limiter.controller(host).capacity)
+
+    def host_free(host: str) -> bool:
+        return host_inflight.get(host, 0) < host_cap(host)
+
+    def submit(book: _Book, index: int | None, url: str, pool: ThreadPoolExecutor) -> None:
+        host_inflight[book.host] = host_inflight.get(book.host, 0) + 1
+        if index is None:
+            future = pool.submit(get_download_url, url, fn=fn)
+        else:
+            future = pool.submit(get_contents, index, url, fn=fn, limiter=limiter)
+        running[future] = (book, index, url)
+
+    def finish(book: _Book) -> None:
+        book.close()
+        active.remove(book)
+
+    def on_toc(book: _Book, future: Future) -> None:
+        try:
+            bookname, urls, _ = future.result()
+        except Exception as e:
+            book.result.error = repr(e)
+            active.remove(book)
+            return
+        book.result.bookname = bookname
+        name = safe_filename(bookname or host_of(book.url))
+        unique, n = name, 1
+        while unique in used_names:
+            n += 1
+            unique = f'{name}_{n}'
+        used_names.add(unique)
+        book.open(str(out_dir / f'{unique}.txt'), urls, br)
+        if book.done:
+            finish(book)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while waiting or active:
+            while waiting and len(active) < max_books:
+                book = waiting.popleft()
+                active.append(book)
+                submit(book, None, book.url, pool)
+
+            # 轮询各书,每轮每本最多提交一章
+            progress = True
+            while progress and len(running) < max_workers:
+                progress = False
+                for _ in range(len(active)):
+                    book = active[0]
+                    active.rotate(-1)
+                    if not book.can_submit():
+                        continue
+                    # 断点中已成功的章节直接输出,不占用主机名额
+                    cached = store.get(book.url, book.todo[0][0]) if store is not None else None
+                    if cached is not None:
+                        book.push(book.todo.popleft()[0], cached)
+                        progress = True
+                    elif host_free(book.host):
+                        index, url = book.todo.popleft()
+                        submit(book, index, url, pool)
+                        progress = True
+                        if len(running) >= max_workers:
+                            break
+            for book in [book for book in active if book.done]:
+                finish(book)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                book, index, url = running.pop(future)
+                host_inflight[book.host] -= 1
+                if index is None:
+                    on_toc(book, future)
+                    continue
+                row = normalize_row(index, future.exception() or future.result())
+                if store is not None:
+                    store.put(book.url, index, url, row)
+                book.push(index, row)
+                if book.done:
+                    finish(book)
+
+    return results
+
+
+def batch_report(results: list[BookResult]) -> str:
+    """以表格形式返回 crawl_books 的结果"""
+    lines = [f'{"book":<24}{"chapters":>10}{"failed":>8}  file / error']
+    for r in results:
+        lines.append(f'{(r.bookname or r.url)[:24]:<24}{r.chapters:>10}{r.failed:>8}  {r.error or r.filename}')
+    return '\n'.join(lines)
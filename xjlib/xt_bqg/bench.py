@@ -0,0 +1,410 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : xt_bqg 基准测试
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 11:32:08
+LastEditTime : 2026-10-18 11:32:08
+FilePath     : /CODE/xjLib/xt_bqg/bench.py
+Github       : https://github.com/sandorn/home
+==============================================================
+用法:
+    python -m xt_bqg.bench clean [语料路径]
+    python -m xt_bqg.bench rules [--rounds 20000]
+    python -m xt_bqg.bench crawl [--chapters 200] [--latency 0.05] [--jitter 0.02]
+                                 [--error-rate 0] [--chapter-chars 3000] [--strategies a,b] [--json 结果.json]
+clean: 语料为 JSONL(每行一个章节原文字符串)或目录(每个文件一章),不指定时使用合成语料。
+rules: 短字符串上 re_sub / re_compile 每次调用的开销,对比每次新建 RuleSet、按规则缓存与直接复用 RuleSet。
+crawl: 启动本地模拟站点(fakesite),每种抓取方式在独立子进程中运行,
+       输出 章/秒、p50/p95/p99 延迟与峰值内存。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import random
+import sys
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from xt_utils.strings import RuleSet, compile_rules, re_compile, re_sub
+from xtlog import mylog
+
+from .checkpoint import is_failed
+from .cleaner import BUSINESS_RULES, HTML_RULES, clean_content_chain, get_engine
+from .core import get_contents, get_download_url, resp_handle, resps_handle
+from .fakesite import FakeSite, SiteConfig
+
+_AD_SNIPPETS = (
+    '请收藏本站：https://www.bigee.cc',
+    '笔趣阁手机版阅读网址：m.bigee.cc',
+    '『点此报错』',
+    '『加入书签』',
+    '<a href="/book/6909/">返回目录</a>',
+    '<script>read_ad();</script>',
+    '<!-- ad -->',
+)
+
+
+def synthetic_corpus(count: int = 200, paragraphs: int = 40, seed: int = 7) -> list[str]:
+    """生成合成章节,奇数章带HTML标签(原始源码),偶数章为纯文本(css_select().text()的结果)"""
+    rnd = random.Random(seed)  # noqa: S311  # 仅用于生成可复现的合成语料
+    words = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜'
+    corpus = []
+    for i in range(count):
+        parts = []
+        tail = '<br/>' if i % 2 else ''
+        for _ in range(paragraphs):
+            sentence = ''.join(rnd.choice(words) for _ in range(rnd.randint(20, 80)))
+            parts.append(f'　　“{sentence}”，{sentence[:10]}•。{tail}')
+            if rnd.random() < 0.1:
+                parts.append(rnd.choice(_AD_SNIPPETS[: None if tail else 4]))
+        corpus.append('\n'.join(parts))
+    return corpus
+
+
+def load_corpus(path: str | os.PathLike) -> list[str]:
+    """读取录制的章节语料
+
+    Args:
+        path: JSONL文件(每行一个JSON字符串)或目录(每个文件为一章原文)
+
+    Returns:
+        list[str]: 章节原文列表
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        return [item.read_text(encoding='utf-8') for item in sorted(path.iterdir()) if item.is_file()]
+    with path.open(encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def record_corpus(urls: Iterable[str], path: str | os.PathLike, fn: Callable | None = None) -> int:
+    """抓取章节并把 clean_content 的原始输入追加到JSONL语料文件"""
+    from xthttp import get
+
+    fn = fn or get
+    count = 0
+    with pathlib.Path(path).open('a', encoding='utf-8') as file:
+        for url in urls:
+            resp = fn(url)
+            try:
+                content = resp.css_select('#chaptercontent').text()
+            except Exception as e:
+                mylog(f'录制失败 {url}: {e!r}')
+                continue
+            file.write(json.dumps(content, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def _measure(func: Callable[[str], str], corpus: list[str], rounds: int) -> tuple[float, list[str]]:
+    """返回 (章节/秒, 最后一轮输出)"""
+    outputs: list[str] = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        outputs = [func(text) for text in corpus]
+    elapsed = time.perf_counter() - start
+    return len(corpus) * rounds / elapsed, outputs
+
+
+def bench_clean(corpus: list[str] | None = None, rounds: int = 5) -> dict[str, float]:
+    """对比原处理链与预编译引擎的吞吐,并校验输出逐字节一致
+
+    Returns:
+        dict: {'chain': 章节/秒, 'engine': 章节/秒, 'speedup': 倍数}
+    """
+    corpus = corpus or synthetic_corpus()
+    engine = get_engine()
+
+    chain_rate, expected = _measure(clean_content_chain, corpus, rounds)
+    engine_rate, actual = _measure(engine.clean, corpus, rounds)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual, strict=True)) if a != b]
+    if mismatches:
+        msg = f'清洗结果不一致,章节序号: {mismatches[:10]}'
+        raise AssertionError(msg)
+
+    result = {'chain': chain_rate, 'engine': engine_rate, 'speedup': engine_rate / chain_rate}
+    mylog(f'clean_content | 章节数: {len(corpus)} x {rounds} | 原处理链: {chain_rate:.0f} 章/秒 | 预编译引擎: {engine_rate:.0f} 章/秒 | 提升: {result["speedup"]:.2f}x')
+    return result
+
+
+_SHORT_TEXTS = ('第12章 风起云涌\u3000', '<p>请收藏本站：https://www.bigee.cc</p>', 'Hello\xa0World', '“天地玄黄”，宇宙洪荒。')
+_TITLE_RULES = (('\u3000', ''), ('\xa0', ''), ('“', '"'), ('”', '"'), ('请收藏本站', ''))
+
+
+def _per_call(func: Callable[[str], str], rounds: int) -> tuple[float, list[str]]:
+    """返回 (每次调用微秒数, 输出)"""
+    outputs = [func(text) for text in _SHORT_TEXTS]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in _SHORT_TEXTS:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(_SHORT_TEXTS)) * 1e6, outputs
+
+
+def bench_rules(rounds: int = 20000) -> dict[str, dict[str, float]]:
+    """短字符串上规则替换的单次调用开销(微秒),并校验三种方式输出一致
+
+    - compile: 每次调用新建 RuleSet,即不走缓存时的校验与编译开销
+    - cached: 直接调用 re_sub / re_compile,命中 compile_rules 的 LRU 缓存
+    - ruleset: 预先取得 RuleSet 后反复调用 sub
+    """
+    cases = {
+        're_sub/html': (re_sub, HTML_RULES, 'sequential'),
+        're_sub/business': (re_sub, BUSINESS_RULES, 'sequential'),
+        're_compile/title': (re_compile, _TITLE_RULES, 'combined'),
+    }
+    results = {}
+    for name, (func, rules, mode) in cases.items():
+        rule_list = list(rules)
+        ruleset = compile_rules(rule_list, mode)
+        timings = {}
+        outputs = []
+        for label, call in (
+            ('compile', lambda text, rules=rule_list, mode=mode: RuleSet(rules, mode).sub(text)),
+            ('cached', lambda text, func=func, rules=rule_list: func(text, rules)),
+            ('ruleset', ruleset.sub),
+        ):
+            timings[label], output = _per_call(call, rounds)
+            outputs.append(output)
+        if any(output != outputs[0] for output in outputs):
+            msg = f'{name} 三种方式输出不一致'
+            raise AssertionError(msg)
+        timings['speedup'] = timings['compile'] / timings['cached']
+        results[name] = timings
+        mylog(f'{name:<18} | 每次新建: {timings["compile"]:.2f}us | 缓存: {timings["cached"]:.2f}us | RuleSet: {timings["ruleset"]:.2f}us | 提升: {timings["speedup"]:.1f}x')
+    return results
+
+
+def _timed(fn: Callable[..., Any], latencies: list[float]) -> Callable[..., Any]:
+    """记录每次请求耗时的请求函数"""
+
+    def timed(url: str, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(url, *args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    return timed
+
+
+def _process_get_contents(args):
+    return get_contents(*args)
+
+
+def _crawl_enhanced_pool(urls: list[str], fn: Callable[..., Any]) -> list:
+    from xtthread import EnhancedThreadPool
+
+    pool = EnhancedThreadPool(max_workers=200)
+    for i, url in enumerate(urls, 1):
+        pool.submit_task(get_contents, i, url, fn=fn)
+    pool.wait_all_completed()
+    rows = list(pool.get_results())
+    pool.shutdown()
+    return rows
+
+
+def _crawl_async_pool(urls: list[str], fn: Callable[..., Any]) -> list:
+    from xtthread import AsyncThreadPool
+
+    return AsyncThreadPool().submit_tasks(get_contents, [[(i, url), {'fn': fn}] for i, url in enumerate(urls, 1)])
+
+
+def _crawl_ahttp_get_all(urls: list[str], fn: Callable[..., Any]) -> list:
+    from xthttp import ahttp_get_all
+
+    return resps_handle(ahttp_get_all(urls))
+
+
+def _crawl_async_client(urls: list[str], fn: Callable[..., Any]) -> list:
+    from xthttp import AsyncHttpClient
+
+    results = [getattr(resp, 'result', resp) for resp in AsyncHttpClient().multi_request('get', urls)]
+    return [row if isinstance(row, list) else resp_handle(row) for row in results]
+
+
+def _crawl_custom_process(urls: list[str], fn: Callable[..., Any]) -> list:
+    from xtthread.process import run_custom_process
+
+    return run_custom_process(_process_get_contents, [(i, url) for i, url in enumerate(urls, 1)])
+
+
+def _crawl_stream(urls: list[str], fn: Callable[..., Any]) -> list:
+    from .pipeline import iter_contents
+
+    return list(iter_contents(urls, fn=fn, start=1, max_workers=200))
+
+
+def _crawl_hybrid(urls: list[str], fn: Callable[..., Any]) -> list:
+    from .hybrid import crawl_hybrid
+
+    return crawl_hybrid(urls, fn=fn, start=1, concurrency=200)
+
+
+# 名称 -> (抓取函数, 是否使用传入的请求函数);不使用时延迟取服务端统计
+CRAWL_STRATEGIES: dict[str, tuple[Callable[[list[str], Callable[..., Any]], list], bool]] = {
+    'EnhancedThreadPool': (_crawl_enhanced_pool, True),
+    'AsyncThreadPool': (_crawl_async_pool, True),
+    'ahttp_get_all': (_crawl_ahttp_get_all, False),
+    'AsyncHttpClient': (_crawl_async_client, False),
+    'run_custom_process': (_crawl_custom_process, False),
+    'iter_contents': (_crawl_stream, True),
+    'crawl_hybrid': (_crawl_hybrid, True),
+}
+
+
+def peak_rss_mb() -> float | None:
+    """当前进程的峰值常驻内存(MB),无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(values: list[float], points: Iterable[int] = (50, 95, 99)) -> dict[str, float | None]:
+    """最近秩法计算百分位,单位毫秒"""
+    ordered = sorted(values)
+    result: dict[str, float | None] = {}
+    for p in points:
+        if not ordered:
+            result[f'p{p}'] = None
+            continue
+        rank = max(0, min(len(ordered) - 1, -(-len(ordered) * p // 100) - 1))
+        result[f'p{p}'] = round(ordered[rank] * 1000, 1)
+    return result
+
+
+def _run_strategy(name: str, urls: list[str], conn: Any) -> None:
+    """子进程入口,结果经管道返回"""
+    from xthttp import get
+
+    crawl, uses_fn = CRAWL_STRATEGIES[name]
+    latencies: list[float] = []
+    try:
+        start = time.perf_counter()
+        rows = crawl(urls, _timed(get, latencies))
+        elapsed = time.perf_counter() - start
+        ok = sum(not is_failed(row) for row in rows or [])
+        conn.send({'total': len(urls), 'ok': ok, 'elapsed': elapsed, 'latencies': latencies if uses_fn else None, 'rss_mb': peak_rss_mb()})
+    except Exception as e:
+        conn.send({'error': repr(e)})
+    finally:
+        conn.close()
+
+
+def bench_crawl(config: SiteConfig | None = None, strategies: Iterable[str] | None = None, book: int = 1) -> dict[str, dict[str, Any]]:
+    """用模拟站点对比各种抓取方式
+
+    每种方式在独立的 spawn 子进程中运行,峰值内存互不影响;
+    无法注入请求函数的方式(ahttp_get_all 等)使用服务端记录的请求耗时。
+
+    Returns:
+        dict: {方式: {'ok', 'total', 'elapsed', 'rate', 'p50', 'p95', 'p99', 'latency_source', 'rss_mb'}},失败时为 {'error'}
+    """
+    config = config or SiteConfig()
+    names = list(strategies or CRAWL_STRATEGIES)
+    unknown = [name for name in names if name not in CRAWL_STRATEGIES]
+    if unknown:
+        msg = f'未知的抓取方式: {unknown}, 可选: {list(CRAWL_STRATEGIES)}'
+        raise ValueError(msg)
+
+    ctx = multiprocessing.get_context('spawn')
+    results: dict[str, dict[str, Any]] = {}
+    with FakeSite(config) as site:
+        _, urls, _ = get_download_url(site.book_url(book))
+        for name in names:
+            site.reset()
+            parent, child = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_run_strategy, args=(name, urls, child), name=f'bench-{name}')
+            proc.start()
+            child.close()
+            try:
+                result = parent.recv()
+            except EOFError:
+                result = {'error': f'子进程异常退出, exitcode={proc.exitcode}'}
+            proc.join()
+
+            if 'error' not in result:
+                client = result.pop('latencies')
+                result['latency_source'] = 'client' if client else 'server'
+                result.update(percentiles(client or site.latencies))
+                result['rate'] = result['ok'] / result['elapsed'] if result['elapsed'] else 0.0
+                result['requests'] = site.stats()['requests']
+            results[name] = result
+
+    mylog(crawl_report(results, config))
+    return results
+
+
+def crawl_report(results: dict[str, dict[str, Any]], config: SiteConfig | None = None) -> str:
+    """以表格形式返回 bench_crawl 的结果"""
+    lines = []
+    if config is not None:
+        lines.append(f'章节数: {config.chapters} | 字数: {config.chapter_chars} | 延迟: {config.latency}s±{config.jitter}s | 错误率: {config.error_rate}')
+    lines.append(f'{"strategy":<20}{"ok/total":>10}{"elapsed_s":>11}{"ch/s":>9}{"p50_ms":>9}{"p95_ms":>9}{"p99_ms":>9}{"lat":>8}{"rss_mb":>9}')
+    for name, r in results.items():
+        if 'error' in r:
+            lines.append(f'{name:<20}  {r["error"]}')
+            continue
+        rss = '-' if r['rss_mb'] is None else f'{r["rss_mb"]:.0f}'
+        done = f'{r["ok"]}/{r["total"]}'
+        lines.append(
+            f'{name:<20}{done:>10}{r["elapsed"]:>11.2f}{r["rate"]:>9.1f}{r["p50"]!s:>9}{r["p95"]!s:>9}{r["p99"]!s:>9}{r["latency_source"]:>8}{rss:>9}',
+        )
+    return '\n'.join(lines)
+
+
+def _main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog='python -m xt_bqg.bench')
+    sub = parser.add_subparsers(dest='command')
+    clean = sub.add_parser('clean', help='clean_content 吞吐对比')
+    clean.add_argument('corpus', nargs='?', help='语料路径,不指定时使用合成语料')
+    rules = sub.add_parser('rules', help='re_sub / re_compile 单次调用开销')
+    rules.add_argument('--rounds', type=int, default=20000)
+    crawl = sub.add_parser('crawl', help='各抓取方式在模拟站点上的对比')
+    crawl.add_argument('--chapters', type=int, default=200)
+    crawl.add_argument('--chapter-chars', type=int, default=3000)
+    crawl.add_argument('--latency', type=float, default=0.05)
+    crawl.add_argument('--jitter', type=float, default=0.02)
+    crawl.add_argument('--error-rate', type=float, default=0.0)
+    crawl.add_argument('--seed', type=int, default=7)
+    crawl.add_argument('--strategies', help=f'逗号分隔,可选: {",".join(CRAWL_STRATEGIES)}')
+    crawl.add_argument('--json', dest='json_path', help='结果另存为JSON')
+    args = parser.parse_args(argv or ['clean'])
+
+    if args.command == 'crawl':
+        config = SiteConfig(
+            chapters=args.chapters,
+            chapter_chars=args.chapter_chars,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )
+        results = bench_crawl(config, args.strategies.split(',') if args.strategies else None)
+        if args.json_path:
+            pathlib.Path(args.json_path).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    elif args.command == 'rules':
+        bench_rules(args.rounds)
+    else:
+        bench_clean(load_corpus(args.corpus) if args.corpus else None)
+
+
+if __name__ == '__main__':
+    _main(sys.argv[1:])
@@ -0,0 +1,285 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节/目录页响应的磁盘缓存
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 15:10:06
+LastEditTime : 2026-10-18 15:10:06
+FilePath     : /CODE/xjLib/xt_bqg/cache.py
+Github       : https://github.com/sandorn/home
+==============================================================
+按规范化url缓存响应正文(zlib压缩),支持:
+- TTL 过期
+- 总大小上限,超出时按最近访问时间(LRU)淘汰
+- 过期后携带 ETag/Last-Modified 条件请求,304 时直接续期
+缓存命中返回 CachedResp,resp_handle 可直接处理。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from xthttp import UnifiedResp
+
+from .limiter import resp_status
+from .urls import normalize_url
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    url           TEXT    NOT NULL,
+    status        INTEGER NOT NULL,
+    headers       TEXT    NOT NULL,
+    body          BLOB    NOT NULL,
+    size          INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL    NOT NULL,
+    accessed_at   REAL    NOT NULL
+)
+"""
+
+
+def resp_text(resp: Any) -> str:
+    """读取响应正文文本,兼容 text 属性/方法与 content 字节"""
+    text = getattr(resp, 'text', None)
+    if callable(text):
+        text = text()
+    if isinstance(text, str):
+        return text
+    content = getattr(resp, 'content', None)
+    if isinstance(content, bytes):
+        return content.decode(getattr(resp, 'encoding', None) or 'utf-8', 'replace')
+    return ''
+
+
+class CachedResp:
+    """从缓存或录制数据还原的响应,提供与 UnifiedResp 相同的 css_select / xpath 接口"""
+
+    __slots__ = ('_dom', '_pq', 'headers', 'index', 'status', 'text', 'url')
+
+    def __init__(self, url: str, text: str, status: int = 200, headers: dict[str, str] | None = None, index: int = 0):
+        self.url = url
+        self.text = text
+        self.status = status
+        self.headers = headers or {}
+        self.index = index
+        self._dom = None
+        self._pq = None
+
+    def __repr__(self) -> str:
+        return f'<CachedResp [{self.status}] {self.url}>'
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    @property
+    def dom(self) -> Any:
+        """lxml 文档树,首次访问时解析"""
+        if self._dom is None:
+            from lxml import html
+
+            self._dom = html.fromstring(self.text)
+        return self._dom
+
+    def css_select(self, selector: str) -> Any:
+        if self._pq is None:
+            from pyquery import PyQuery
+
+            self._pq = PyQuery(self.dom)
+        return self._pq(selector)
+
+    def xpath(self, *exprs: str) -> Any:
+        results = [self.dom.xpath(expr) for expr in exprs]
+        return results[0] if len(results) == 1 else results
+
+
+class ResponseCache:
+    """磁盘响应缓存(SQLite单文件),默认不启用,需显式包装请求函数
+
+    示例用法:
+    >>> cache = ResponseCache('bqg_cache.db', ttl=7 * 86400, max_bytes=2 << 30)
+    >>> cached_get = cache.wrap(get)
+    >>> bookname, urls, titles = get_download_url(url, fn=cached_get)
+    >>> rows = iter_contents(urls, fn=cached_get)  # 二次运行时全部命中缓存
+    """
+
+    touch_batch = 256
+    evict_batch = 64
+
+    def __init__(self, path: str | os.PathLike = 'xt_bqg_cache.db', ttl: float | None = None, max_bytes: int | None = None, level: int = 6):
+        """
+        Args:
+            path: 缓存文件路径
+            ttl: 过期秒数,None 表示永不过期
+            max_bytes: 压缩后正文总大小上限,None 表示不限
+            level: zlib 压缩级别
+        """
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._touched = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)')
+        self._conn.commit()
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def __enter__(self) -> ResponseCache:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+    def _load(self, key: str) -> tuple | None:
+        with self._lock:
+            return self._conn.execute('SELECT url, status, headers, body, etag, last_modified, stored_at FROM responses WHERE key=?', (key,)).fetchone()
+
+    def _touch(self, key: str, refresh: bool = False) -> None:
+        """更新访问时间;命中时不逐次提交,攒够 touch_batch 次或下次写入、关闭时一并提交"""
+        now = time.time()
+        with self._lock:
+            if refresh:
+                self._conn.execute('UPDATE responses SET accessed_at=?, stored_at=? WHERE key=?', (now, now, key))
+            else:
+                self._conn.execute('UPDATE responses SET accessed_at=? WHERE key=?', (now, key))
+            self._touched += 1
+            if self._touched >= self.touch_batch:
+                self._commit()
+
+    def _commit(self) -> None:
+        """提交当前事务,调用方持有锁"""
+        self._conn.commit()
+        self._touched = 0
+
+    def _evict(self) -> None:
+        """超出大小上限时按LRU分批淘汰,每批只读取 evict_batch 条,调用方持有锁"""
+        if self.max_bytes is None:
+            return
+        while self._total > self.max_bytes:
+            rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?', (self.evict_batch,)).fetchall()
+            if not rows:
+                return
+            victims = []
+            for key, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                self._total -= size
+            self._conn.executemany('DELETE FROM responses WHERE key=?', victims)
+
+    @staticmethod
+    def _to_resp(row: tuple) -> CachedResp:
+        url, status, headers, body, *_ = row
+        return CachedResp(url, zlib.decompress(body).decode('utf-8'), status, json.loads(headers))
+
+    def get(self, url: str, allow_stale: bool = False) -> CachedResp | None:
+        """读取缓存,过期且不允许陈旧数据时返回None"""
+        key = normalize_url(url)
+        row = self._load(key)
+        if row is None or (not allow_stale and self._expired(row)):
+            return None
+        self._touch(key)
+        return self._to_resp(row)
+
+    def _expired(self, row: tuple) -> bool:
+        return self.ttl is not None and time.time() - row[6] > self.ttl
+
+    def put(self, url: str, resp: Any) -> None:
+        """写入响应,仅缓存 2xx 的 UnifiedResp/CachedResp"""
+        status = resp_status(resp) or 200
+        if not isinstance(resp, UnifiedResp | CachedResp) or not 200 <= status < 300:
+            return
+        headers = {str(k): str(v) for k, v in dict(getattr(resp, 'headers', None) or {}).items()}
+        lowered = {k.lower(): v for k, v in headers.items()}
+        body = zlib.compress(resp_text(resp).encode('utf-8'), self.level)
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key=?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, url, status, headers, body, size, etag, last_modified, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, status, json.dumps(headers, ensure_ascii=False), body, len(body), lowered.get('etag'), lowered.get('last-modified'), now, now),
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._commit()
+
+    def fetch(self, url: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """缓存优先的请求
+
+        - 未过期: 直接返回缓存
+        - 已过期且有校验信息: 条件请求,304 续期后返回缓存
+        - 请求失败(抛出异常、非响应对象或非 2xx 状态码)且有旧缓存: 返回旧缓存
+        """
+        key = normalize_url(url)
+        row = self._load(key)
+        if row is not None and not self._expired(row):
+            self.hits += 1
+            self._touch(key)
+            return self._to_resp(row)
+
+        if row is not None and (row[4] or row[5]):
+            conditional = dict(kwargs.pop('headers', None) or {})
+            if row[4]:
+                conditional['If-None-Match'] = row[4]
+            if row[5]:
+                conditional['If-Modified-Since'] = row[5]
+            kwargs['headers'] = conditional
+
+        try:
+            resp = fn(url, *args, **kwargs)
+        except Exception:
+            if row is None:
+                raise
+            self.misses += 1
+            return self._to_resp(row)
+
+        status = resp_status(resp)
+        if row is not None and status == 304:
+            self.revalidated += 1
+            self._touch(key, refresh=True)
+            return self._to_resp(row)
+
+        self.misses += 1
+        if isinstance(resp, UnifiedResp) and 200 <= (status or 200) < 300:
+            self.put(url, resp)
+            return resp
+
+        # 网络错误、非 2xx 状态码等失败结果不入缓存,有旧缓存时返回旧缓存
+        return self._to_resp(row) if row is not None else resp
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """包装请求函数,可直接作为 get_contents / get_download_url 的 fn 参数"""
+
+        def cached(url: str, *args: Any, **kwargs: Any) -> Any:
+            return self.fetch(url, fn, *args, **kwargs)
+
+        cached.__wrapped__ = fn  # type: ignore[attr-defined]
+        return cached
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return {'entries': count, 'bytes': self._total, 'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated}
@@ -0,0 +1,139 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 书籍下载断点存储
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 13:20:45
+LastEditTime : 2026-10-18 13:20:45
+FilePath     : /CODE/xjLib/xt_bqg/checkpoint.py
+Github       : https://github.com/sandorn/home
+==============================================================
+以 (书籍url, 章节序号) 为键把已抓取的章节写入本地SQLite,
+程序中断后重跑只抓取缺失或失败的章节,最终文件由存储内容拼装。
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .core import FailedRow
+from .stages import save_rows
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    book    TEXT    NOT NULL,
+    idx     INTEGER NOT NULL,
+    url     TEXT    NOT NULL,
+    title   TEXT    NOT NULL DEFAULT '',
+    content TEXT    NOT NULL DEFAULT '',
+    ok      INTEGER NOT NULL DEFAULT 0,
+    updated REAL    NOT NULL,
+    PRIMARY KEY (book, idx)
+)
+"""
+
+_ALL_ROWS = 'SELECT idx, title, content FROM chapters WHERE book=? AND idx>? ORDER BY idx LIMIT ?'
+_OK_ROWS = 'SELECT idx, title, content FROM chapters WHERE book=? AND idx>? AND ok=1 ORDER BY idx LIMIT ?'
+
+
+def is_failed(row: Any) -> bool:
+    """resp_handle 的结果是否为失败行(None、异常或 FailedRow);正文为空的章节(如纯图片章节)不算失败"""
+    return not row or isinstance(row, Exception | FailedRow) or len(row) < 3
+
+
+class CheckpointStore:
+    """章节断点存储
+
+    线程安全,每写入一章立即提交,进程崩溃时最多丢失正在写入的一章。
+
+    示例用法:
+    >>> with CheckpointStore('book.db') as store:
+    ...     todo = store.pending(book_url, urls)  # 仅缺失或失败的章节
+    ...     for index, url in todo:
+    ...         get_contents(index, url, store=store, book=book_url)
+    ...     store.assemble(book_url, 'book.txt')
+    """
+
+    page_size = 200
+
+    def __init__(self, path: str | os.PathLike = 'xt_bqg_checkpoint.db'):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> CheckpointStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, book: str, index: int) -> list | None:
+        """返回已成功抓取的章节 [index, title, content],不存在或失败时返回None"""
+        with self._lock:
+            row = self._conn.execute('SELECT title, content FROM chapters WHERE book=? AND idx=? AND ok=1', (book, index)).fetchone()
+        return [index, row[0], row[1]] if row else None
+
+    def put(self, book: str, index: int, url: str, row: Any) -> bool:
+        """记录一章的抓取结果,返回是否成功"""
+        ok = not is_failed(row)
+        title, content = (str(row[1]), str(row[2])) if ok else ('', '')
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO chapters (book, idx, url, title, content, ok, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (book, index, url, title, content, int(ok), time.time()),
+            )
+            self._conn.commit()
+        return ok
+
+    def done(self, book: str) -> set[int]:
+        """已成功抓取的章节序号"""
+        with self._lock:
+            return {idx for (idx,) in self._conn.execute('SELECT idx FROM chapters WHERE book=? AND ok=1', (book,))}
+
+    def pending(self, book: str, urls: Iterable[str], start: int = 0) -> list[tuple[int, str]]:
+        """返回缺失或失败的 (index, url) 列表"""
+        done = self.done(book)
+        return [(index, url) for index, url in enumerate(urls, start) if index not in done]
+
+    def rows(self, book: str, include_failed: bool = False) -> Iterator[list]:
+        """按序号顺序分页产出 [index, title, content],不把整本书读入内存"""
+        sql = _ALL_ROWS if include_failed else _OK_ROWS
+        last = -(2**63)
+        while True:
+            with self._lock:
+                records = self._conn.execute(sql, (book, last, self.page_size)).fetchall()
+            for idx, title, content in records:
+                yield [idx, title, content]
+            if len(records) < self.page_size:
+                return
+            last = records[-1][0]
+
+    def summary(self, book: str) -> dict[str, int]:
+        """章节统计: total / ok / failed"""
+        with self._lock:
+            total, ok = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(ok), 0) FROM chapters WHERE book=?', (book,)).fetchone()
+        return {'total': total, 'ok': ok, 'failed': total - ok}
+
+    def clear(self, book: str) -> None:
+        """删除一本书的全部断点"""
+        with self._lock:
+            self._conn.execute('DELETE FROM chapters WHERE book=?', (book,))
+            self._conn.commit()
+
+    def assemble(self, book: str, filename: str | os.PathLike, br: str = '\n') -> int:
+        """由存储内容拼装最终文件,格式与 save_file 一致,返回写入章节数"""
+        return save_rows(filename, self.rows(book), br=br)
@@ -0,0 +1,190 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节正文清洗引擎
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 11:05:20
+LastEditTime : 2026-10-18 11:05:20
+FilePath     : /CODE/xjLib/xt_bqg/cleaner.py
+Github       : https://github.com/sandorn/home
+==============================================================
+clean_content 的预编译实现,输出与原处理链
+format_html_string → re_sub(business_rules) → str_clean 逐字节一致:
+- 全部正则在首次使用时编译一次
+- 相邻的单字符替换规则合并为一步,以 str.replace 执行
+- 空白合并规则以 str.split/join 执行
+- 每条正则带前置字符判断,文本中不含必需字符时跳过该轮扫描
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+from functools import cache
+
+from xt_utils.strings import format_html_string, re_sub, str_clean
+
+# 与 xt_utils.strings.format_html_string 中的 clean_rules 保持一致
+HTML_RULES: tuple[tuple[str, str], ...] = (
+    (r'<\s*script[^>]*>.*?</\s*script\s*>', ''),  # 移除script标签
+    (r'<br\s*/?>', ' '),  # 将br标签替换为空格
+    (r'<\s*style[^>]*>.*?</\s*style\s*>', ''),  # 移除style标签
+    (r'<a[^>]*>.*?</a>', ''),  # 移除a标签
+    (r'<([a-z][a-z][a-z0-9]*)\s+[^>]*>', r'<\1>'),  # 移除标签属性
+    (r'<!--.*?-->', ''),  # 移除HTML注释
+    (r'[‘’“”]', "'"),  # 统一引号
+    (r'﻿', ''),  # 移除BOM头
+    (r'[•‣◦⁃]', ':'),  # 替换特殊符号
+    (r'<[^>]*>', ''),  # 移除所有HTML标签
+    (r'\s+', ' '),  # 合并多个空白字符
+)
+
+# 站点推广信息等业务规则
+BUSINESS_RULES: tuple[tuple[str, str], ...] = (
+    (
+        r'(关注公众号：书友大本营  关注即送现金、点币！|『点此报错』|『加入书签』|笔趣阁手机版阅读网址|笔趣阁手机版|请收藏本站|请记住本书首发域名|百度搜索“笔趣看小说网”手机阅读|请收藏本站|笔趣看)[:：][^\s]*',
+        '',
+    ),  # 移除网站推广信息
+    (r'https?://[^\s]+', ''),  # 移除URL链接
+    (r'\s+\S*[:：]\S*\s+', ' '),  # 移除中间包含冒号的特殊片段
+)
+
+# 规则命中所必需的字符,文本中一个都不包含时整轮跳过
+RULE_GUARDS: dict[str, tuple[str, ...]] = {
+    BUSINESS_RULES[0][0]: (':', '：'),
+    BUSINESS_RULES[2][0]: (':', '：'),
+}
+
+TRIMS: tuple[str, ...] = ()
+
+_CHAR_CLASS = re.compile(r'\[([^\\\]\[^-]+)\]')
+
+
+def _literal_chars(pattern: str) -> str | None:
+    """规则为单字符或简单字符集时返回字符集合,否则返回None"""
+    if len(pattern) == 1 and re.escape(pattern) == pattern:
+        return pattern
+    matched = _CHAR_CLASS.fullmatch(pattern)
+    return matched.group(1) if matched else None
+
+
+def _leading_literal(pattern: str) -> str | None:
+    """正则首字符为普通字面量时返回该字符,用作命中前置条件"""
+    if pattern and pattern[0] not in '\\[](){}.*+?^$|' and not pattern[0].isspace():
+        return pattern[0]
+    return None
+
+
+def _collapse_whitespace(text: str) -> str:
+    """等价于 re.sub(r'\\s+', ' ', text),str.split 与正则 \\s 使用同一套Unicode空白定义"""
+    joined = ' '.join(text.split())
+    if not joined:
+        return ' ' if text else ''
+    if text[0].isspace():
+        joined = ' ' + joined
+    if text[-1].isspace():
+        joined += ' '
+    return joined
+
+
+class CleanEngine:
+    """预编译的清洗规则链
+
+    规则按原顺序执行,保证与逐条 re.sub 的结果一致;
+    仅在合并不改变语义时把相邻单字符替换合并为一步。
+
+    示例用法:
+    >>> engine = CleanEngine(HTML_RULES, BUSINESS_RULES)
+    >>> engine.clean('<p>Hello<br/>World</p>')
+    'Hello World'
+    """
+
+    __slots__ = ('_business_steps', '_html_steps', '_trims')
+
+    def __init__(self, html_rules: Sequence[tuple[str, str]], business_rules: Sequence[tuple[str, str]] = (), trims: Sequence[str] = (), guards: dict[str, tuple[str, ...]] | None = None):
+        guards = guards or {}
+        self._html_steps = self._compile(html_rules, guards)
+        self._business_steps = self._compile(business_rules, guards)
+        self._trims = tuple(trims)
+
+    @staticmethod
+    def _compile(rules: Sequence[tuple[str, str]], guards: dict[str, tuple[str, ...]]) -> tuple:
+        """把规则序列编译为执行步骤: ('lit', pairs, produced) / ('ws',) / ('re', pattern, repl, guard)"""
+        steps: list[tuple] = []
+        for pattern, repl in rules:
+            if pattern == r'\s+' and repl == ' ':
+                steps.append(('ws',))
+                continue
+
+            chars = _literal_chars(pattern)
+            if chars is not None and '\\' not in repl:
+                # 与上一步字面量替换合并:前一步的产出字符不能再被本步替换
+                if steps and steps[-1][0] == 'lit' and not set(chars) & steps[-1][2]:
+                    _, pairs, produced = steps.pop()
+                    seen = {ch for ch, _ in pairs}
+                    pairs += tuple((ch, repl) for ch in chars if ch not in seen)
+                    steps.append(('lit', pairs, produced | set(repl)))
+                else:
+                    steps.append(('lit', tuple((ch, repl) for ch in chars), set(repl)))
+                continue
+
+            guard = guards.get(pattern)
+            if guard is None:
+                lead = _leading_literal(pattern)
+                guard = (lead,) if lead else ()
+            steps.append(('re', re.compile(pattern), repl, guard))
+
+        return tuple(steps)
+
+    @staticmethod
+    def _run(steps: tuple, text: str) -> str:
+        for step in steps:
+            kind = step[0]
+            if kind == 'lit':
+                for ch, repl in step[1]:
+                    if ch in text:
+                        text = text.replace(ch, repl)
+            elif kind == 'ws':
+                text = _collapse_whitespace(text)
+            else:
+                _, pattern, repl, guard = step
+                if guard and not any(ch in text for ch in guard):
+                    continue
+                text = pattern.sub(repl, text)
+        return text
+
+    def format_html(self, html_content: str) -> str:
+        """等价于 format_html_string"""
+        if not isinstance(html_content, str):
+            error_msg = f'输入必须是字符串，实际为{type(html_content).__name__}'
+            raise TypeError(error_msg)
+        if not html_content.strip():
+            return ''
+        return self._run(self._html_steps, html_content).strip()
+
+    def clean(self, in_str: str | list[str]) -> str:
+        """等价于原 clean_content 处理链"""
+        if isinstance(in_str, list):
+            in_str = '\n'.join(in_str)
+
+        cleaned = self._run(self._business_steps, self.format_html(in_str))
+        for trim in self._trims:
+            cleaned = cleaned.replace(trim, '')
+        return cleaned
+
+
+@cache
+def get_engine() -> CleanEngine:
+    """默认清洗引擎,首次调用时编译"""
+    return CleanEngine(HTML_RULES, BUSINESS_RULES, TRIMS, RULE_GUARDS)
+
+
+def clean_content_chain(in_str: str | list[str]) -> str:
+    """原始的逐条处理链,仅用于基准对比与一致性校验"""
+    if isinstance(in_str, list):
+        in_str = '\n'.join(in_str)
+
+    cleaned = format_html_string(in_str)
+    cleaned = re_sub(cleaned, list(BUSINESS_RULES))
+    return str_clean(cleaned, list(TRIMS))
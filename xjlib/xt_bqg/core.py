@@ -0,0 +1,229 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 头部注释
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2023-01-14 23:30:19
+LastEditTime : 2023-10-27 15:59:02
+FilePath     : /CODE/xjLib/xt_bqg/core.py
+Github       : https://github.com/sandorn/home
+==============================================================
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import Any
+
+from xt_utils.strings import str_clean
+from xthttp import UnifiedResp, ahttp_get, get
+from xtlog import mylog
+
+from .cache import CachedResp, resp_text
+from .cleaner import get_engine
+from .extract import DEFAULT_PROFILE, extract_chapter, extract_toc
+from .limiter import resp_status
+from .stages import stage, timed
+from .urls import chapter_urls, dedup_toc
+
+
+@timed('clean_content')
+def clean_content(in_str):
+    """
+    清理文本内容,移除HTML标签、网站信息和多余空白
+
+    规则链(HTML基础清理 → 业务规则 → 字符清除)由 cleaner.CleanEngine 预编译,
+    输出与逐条调用 format_html_string / re_sub / str_clean 一致。
+
+    参数:
+        in_str: 输入文本或文本列表
+
+    返回:
+        清理后的文本字符串
+    """
+    return get_engine().clean(in_str)
+
+
+@timed('resp_handle')
+def resp_handle(resp, profile=DEFAULT_PROFILE):
+    """解析章节响应,返回 [index, title, content]
+
+    正文可取时按 profile 单次解析提取(extract_chapter),否则回退到 css_select;
+    非响应对象与 4xx/5xx 响应返回 FailedRow
+    """
+    if not isinstance(resp, UnifiedResp | CachedResp):
+        return FailedRow([0, resp, ''])
+    status = resp_status(resp)
+    if status is not None and status >= 400:
+        return FailedRow([getattr(resp, 'index', 0), f'HTTP {status}', ''])
+
+    try:
+        # _xpath = ['//h1/text()', '//*[@id="chaptercontent"]/text()']
+        # title, content = resp.xpath('//h1/text()', '//*[@id="chaptercontent"]/text()')
+        html = resp_text(resp)
+        if html:
+            page = extract_chapter(html, profile)
+            title, content = page.title, page.content
+        else:
+            title = resp.css_select(profile.title_tag).text()
+            content = resp.css_select(f'#{profile.content_id}').text()
+        return chapter_row(resp.index, title, content)
+    except Exception as e:
+        mylog(f'出现错误{e!r}')
+
+
+class FailedRow(list):
+    """抓取失败的章节行 [index, 失败原因, ''],用于区分失败与正文为空的章节"""
+
+    __slots__ = ()
+
+
+def chapter_row(index, title, content):
+    """清理提取到的原始标题与正文,返回 [index, title, content]"""
+    title = ''.join(str_clean(''.join(title), ['\u3000', '\xa0', '\u00a0']))
+    content = clean_content(content).strip()
+    return [index, title, content]
+
+
+@timed('resps_handle')
+def resps_handle(resps):
+    """传入的是爬虫数据包的集合"""
+    texts = []
+
+    for resp in resps:
+        texts.append(resp_handle(resp))
+
+    with stage('sort'):
+        texts.sort(key=lambda x: x[0])
+    # texts = sorted(texts, key=lambda x: x[0])
+    return texts
+
+
+def get_download_url(url, fn=get, profile=DEFAULT_PROFILE, drop_similar=False):
+    """获取目录页,返回 (书名, 章节链接列表, 章节标题列表)
+
+    章节链接经 chapter_urls 补全规范化,再由 dedup_toc 去重(重复章节保留完整目录中的位置),
+    省下的请求数累计到 DEDUP_STATS;drop_similar=True 时同时丢弃标题近似重复的章节。
+    """
+    resp = fn(url)
+    html = resp_text(resp)
+    if html:
+        toc = extract_toc(html, profile)
+        bookname, hrefs, titles = toc.bookname, toc.hrefs, toc.titles
+    else:
+        xpath_list = (
+            # '//meta[@property="og:novel:book_name"]/@content',
+            '//h1/text()',
+            "//dl/span/preceding-sibling::dd[not(@class='more pc_none')]/a/@href",
+            '//dl/span/dd/a/@href',
+            "//dl/span/preceding-sibling::dd[not(@class='more pc_none')]/a/text()",
+            '//dl/span/dd/a/text()',
+            # '//dt[1]/following-sibling::dd/a/@href',
+            # '//dt[1]/following-sibling::dd/a/text()',
+            # '//div[@class="listmain"]/dl/dt[2]/following-sibling::dd/a/@href',
+        )
+        bookname, temp_urls, temp_urls2, titles, titles2 = resp.xpath(*xpath_list)
+        titles += titles2
+        hrefs = temp_urls + temp_urls2
+        bookname = ''.join(bookname)
+
+    return finish_toc(url, bookname, hrefs, titles, drop_similar)
+
+
+def finish_toc(url, bookname, hrefs, titles, drop_similar=False):
+    """补全、规范化并去重目录页提取的章节链接,返回 (书名, 章节链接列表, 章节标题列表)"""
+    result = dedup_toc(chapter_urls(url, hrefs), titles, drop_similar=drop_similar)
+    if result.dropped or result.similar:
+        mylog(f'目录去重 {url} | 重复链接: {len(result.dropped)} | 近似标题: {len(result.similar)} | 节省请求: {result.saved}')
+    return bookname, result.urls, result.titles
+
+
+def normalize_row(index: int, row: Any) -> list:
+    """把单章处理结果规整为 [index, title, content]
+
+    resp_handle 失败时返回 FailedRow 或 None,此处统一回填真实序号;失败结果均规整为 FailedRow。
+    """
+    if isinstance(row, Exception):
+        return FailedRow([index, repr(row), ''])
+    if not row:
+        return FailedRow([index, '', ''])
+    row = FailedRow(row) if isinstance(row, FailedRow) else list(row)
+    row[0] = index
+    return row
+
+
+@timed('get_contents')
+def get_contents(*args, fn=get, store=None, book=None, limiter=None):
+    """抓取并解析单个章节
+
+    参数:
+        args: (index, url, *请求函数的额外参数)
+        fn: 请求函数
+        store: 断点存储(CheckpointStore),已成功的章节直接从存储返回
+        book: 断点存储中的书籍键,一般为目录页url
+        limiter: 按主机自适应并发控制(HostLimiter),请求前占用目标主机的并发名额
+
+    返回:
+        [index, title, content],失败时 title 为失败原因、content 为空,序号始终为真实序号
+    """
+    index, url = args[0:2]
+    if store is not None:
+        if book is None:
+            msg = '使用断点存储时必须指定book'
+            raise ValueError(msg)
+        cached = store.get(book, index)
+        if cached is not None:
+            return cached
+
+    with stage('fetch'):
+        if limiter is not None:
+            with limiter.slot(url) as slot:
+                resp = slot.record(fn(url, *args[2:]))
+        else:
+            resp = fn(url, *args[2:])
+    result = normalize_row(index, resp_handle(resp))
+    if store is not None:
+        store.put(book, index, url, result)
+    return result
+
+
+ahttp_get_contents = partial(get_contents, fn=ahttp_get)
+
+
+if __name__ == '__main__':
+    url = 'https://www.bigee.cc/book/6909/'
+    bookname, urls, titles = get_download_url(url)
+    # mylog(f'bookname: {bookname}')
+    # mylog(f'urls: {urls}')
+    # mylog(f'titles: {titles}')
+    mylog(f'urls[0]: {urls[0]}')
+    res = get_contents(0, 'https://www.d3016ba0.icu/book/58732/1.html')
+    mylog(res)
+
+    def test_clean_content():
+        """测试clean_Content函数"""
+        test_cases = [
+            ('正常文本', 'Hello World'),
+            (
+                '带HTML标签',
+                '<p>Hello<br/>World</p>',
+            ),
+            ('带特殊字符', 'Hello\u3000World\xa0!\u2029'),
+            (
+                '带网站信息',
+                'Hello 百度搜索“笔趣看小说网”手机阅读:   请收藏本站：https://www.bigee.com World  \n 请收藏本站：',
+            ),
+            ('多行文本', ['Line1', 'Line2\t', 'Line3  ']),
+        ]
+
+        mylog('=== 开始测试 clean_Content ===')
+        for name, input_text in test_cases:
+            result = clean_content(input_text)
+            mylog(f'{name}: ')
+            mylog(f'  输入: {input_text!r}')
+            mylog(f'  输出: {result!r}')
+
+        mylog('=== 测试完成 ===')
+
+    # test_clean_content()
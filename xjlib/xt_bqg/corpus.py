@@ -0,0 +1,396 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 压缩章节语料库,支持按章随机读取
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 22:31:40
+LastEditTime : 2026-10-18 22:31:40
+FilePath     : /CODE/xjLib/xt_bqg/corpus.py
+Github       : https://github.com/sandorn/home
+==============================================================
+目录结构:
+- chapters*.dat: 只追加的数据文件,每章正文单独压缩为一个块,compact() 后换用新文件
+- index.db: SQLite索引,(book, idx) → (标题, 偏移, 长度, 编码, 字典)
+
+单章读取只需一次索引查询、一次定位读取与一次解压,与书的大小无关;
+追加只写数据文件末尾并插入一行索引。
+章节短小,单独压缩效果差,train() 从已有章节训练共享字典,之后写入的章节都用该字典压缩。
+编码优先使用 zstd(Python 3.14 的 compression.zstd 或第三方 zstandard),否则使用 zlib(zdict)。
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .checkpoint import is_failed
+from .stages import save_rows
+
+try:
+    from compression import zstd as _zstd  # Python 3.14+
+except ImportError:
+    _zstd = None
+
+try:
+    import zstandard as _zstandard
+except ImportError:
+    _zstandard = None
+
+HAS_ZSTD = _zstd is not None or _zstandard is not None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key     TEXT    PRIMARY KEY,
+    value   TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dicts (
+    id      INTEGER PRIMARY KEY,
+    codec   TEXT    NOT NULL,
+    data    BLOB    NOT NULL,
+    created REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    book    TEXT    NOT NULL,
+    idx     INTEGER NOT NULL,
+    title   TEXT    NOT NULL DEFAULT '',
+    offset  INTEGER NOT NULL,
+    size    INTEGER NOT NULL,
+    raw     INTEGER NOT NULL,
+    codec   TEXT    NOT NULL,
+    dict    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (book, idx)
+);
+"""
+
+# 字典训练时切分片段: 标点与空白之间的短语
+_FRAGMENT = re.compile(r'[^\s，。！？；：、“”‘’「」『』（）,.!?;:()]{2,}')
+
+
+def train_zlib_dict(samples: Iterable[str], size: int = 32768) -> bytes:
+    """由样本章节生成 zlib 预设字典
+
+    在多个样本中重复出现的短语按 (出现的样本数 - 1) * 长度 评分,
+    高分短语放在字典末尾(deflate 匹配距离越近编码越短),总长不超过 size 字节。
+    """
+    df: Counter[str] = Counter()
+    samples = list(samples)
+    for text in samples:
+        df.update(set(_FRAGMENT.findall(text)))
+    scored = sorted(((n - 1) * len(frag.encode('utf-8')), frag) for frag, n in df.items() if n > 1)
+    chosen: list[bytes] = []
+    total = 0
+    for _, frag in reversed(scored):
+        data = frag.encode('utf-8')
+        if total + len(data) > size:
+            break
+        chosen.append(data)
+        total += len(data)
+    if total < size // 2 and samples:
+        # 重复短语不足时用样本正文补齐,常用字与常见搭配同样能被匹配
+        filler = ''.join(samples).encode('utf-8')[: size - total]
+        chosen.append(filler)
+    return b''.join(reversed(chosen))
+
+
+class _Codec:
+    """单一编码 + 可选字典的压缩器,须在外部加锁使用"""
+
+    def __init__(self, codec: str, level: int, zdict: bytes = b''):
+        self.codec = codec
+        self.zdict = zdict
+        if codec == 'zlib':
+            # 预先载入字典的压缩/解压对象,每章复制一份,避免重复处理字典
+            self._zc = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict) if zdict else zlib.compressobj(level, zlib.DEFLATED, -15)
+            self._zd = zlib.decompressobj(-15, zdict=zdict) if zdict else zlib.decompressobj(-15)
+        elif codec == 'zstd':
+            if _zstd is not None:
+                zstd_dict = _zstd.ZstdDict(zdict) if zdict else None
+                self._level, self._zstd_dict = level, zstd_dict
+            elif _zstandard is not None:
+                dict_data = _zstandard.ZstdCompressionDict(zdict) if zdict else None
+                self._cctx = _zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+                self._dctx = _zstandard.ZstdDecompressor(dict_data=dict_data)
+            else:
+                msg = '未安装zstd支持(需要 Python 3.14+ 或 zstandard)'
+                raise RuntimeError(msg)
+        else:
+            msg = f'不支持的编码: {codec}'
+            raise ValueError(msg)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == 'zlib':
+            c = self._zc.copy()
+            return c.compress(data) + c.flush()
+        if _zstd is not None:
+            return _zstd.compress(data, self._level, zstd_dict=self._zstd_dict)
+        return self._cctx.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.codec == 'zlib':
+            d = self._zd.copy()
+            return d.decompress(data) + d.flush()
+        if _zstd is not None:
+            return _zstd.decompress(data, zstd_dict=self._zstd_dict)
+        return self._dctx.decompress(data)
+
+
+def _train(codec: str, samples: list[str], size: int) -> bytes:
+    if codec == 'zlib':
+        return train_zlib_dict(samples, min(size, 32768))
+    data = [s.encode('utf-8') for s in samples]
+    if _zstd is not None:
+        return _zstd.train_dict(data, size).dict_content
+    if _zstandard is not None:
+        return _zstandard.train_dictionary(size, data).as_bytes()
+    msg = '未安装zstd支持(需要 Python 3.14+ 或 zstandard)'
+    raise RuntimeError(msg)
+
+
+def iter_saved_rows(filename: str | os.PathLike, br: str = '\n') -> Iterator[list]:
+    """读取 save_file / save_rows 写出的书籍文件,产出 [index, title, content]
+
+    文件格式为首行文件名,之后每章依次为序号、标题、正文,章末多一个 br。
+    正文中可能有空行,因此只把"空行 + 大于上一章序号的纯数字行"视为新章节的开始;
+    文件末尾与追加写入处会多出空行,正文末尾的空行一律去掉。仅支持 br 为换行符的文件。
+    """
+
+    def _row(row: list, body: list[str]) -> list:
+        while body and not body[-1]:
+            body.pop()
+        return [row[0], row[1] or '', '\n'.join(body)]
+
+    if br != '\n':
+        msg = '仅支持以换行符分隔的文件'
+        raise ValueError(msg)
+    with pathlib.Path(filename).open(encoding='utf-8') as file:
+        next(file, None)  # 首行为文件名
+        row: list | None = None
+        body: list[str] = []
+        blank = True
+        for raw in file:
+            line = raw.rstrip('\n')
+            if blank and line.isdigit() and (row is None or int(line) > row[0]):
+                if row is not None:
+                    yield _row(row, body)
+                row, body = [int(line), None], []
+            elif row is not None and row[1] is None:
+                row[1] = line
+            elif row is not None:
+                body.append(line)
+            blank = not line
+        if row is not None:
+            yield _row(row, body)
+
+
+class CorpusStore:
+    """压缩章节语料库
+
+    线程安全;写入的数据先落盘再提交索引,进程崩溃只会在数据文件末尾留下无索引的垃圾块。
+
+    示例用法:
+    >>> with CorpusStore('corpus') as corpus:
+    ...     corpus.import_file('斗破苍穹.txt', book='斗破苍穹')  # 导入 save_file 写出的文件
+    ...     corpus.train()  # 用已有章节训练共享字典
+    ...     corpus.put_rows(book_url, iter_contents(urls))
+    ...     index, title, content = corpus.get(book_url, 100)
+    """
+
+    def __init__(self, path: str | os.PathLike = 'xt_bqg_corpus', codec: str | None = None, level: int | None = None):
+        """
+        Args:
+            path: 语料库目录
+            codec: 'zstd' 或 'zlib',默认有 zstd 时用 zstd
+            level: 压缩级别,默认 zstd 为 10, zlib 为 9
+        """
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.codec = codec or ('zstd' if HAS_ZSTD else 'zlib')
+        self.level = level if level is not None else (10 if self.codec == 'zstd' else 9)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path / 'index.db', check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE key='data'").fetchone()
+        self._data_name = row[0] if row else 'chapters.dat'
+        self._data = (self.path / self._data_name).open('a+b')
+        self._codecs: dict[tuple[str, int], _Codec] = {}
+        row = self._conn.execute('SELECT MAX(id) FROM dicts WHERE codec=?', (self.codec,)).fetchone()
+        self.dict_id = row[0] or 0
+
+    def __enter__(self) -> CorpusStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._data.close()
+            self._conn.close()
+
+    def _codec_for(self, codec: str, dict_id: int) -> _Codec:
+        """按 (编码, 字典) 缓存压缩器,须持有锁"""
+        found = self._codecs.get((codec, dict_id))
+        if found is None:
+            zdict = b''
+            if dict_id:
+                zdict = self._conn.execute('SELECT data FROM dicts WHERE id=?', (dict_id,)).fetchone()[0]
+            found = self._codecs[codec, dict_id] = _Codec(codec, self.level, zdict)
+        return found
+
+    def train(self, samples: Iterable[str] | None = None, size: int = 112640, sample_size: int = 2000) -> int:
+        """训练共享字典,之后写入的章节使用该字典,返回字典id
+
+        Args:
+            samples: 训练用正文,默认从已有章节中随机抽取 sample_size 章
+            size: 字典字节数上限,zlib 最多使用 32KB
+            sample_size: 默认抽样的章节数
+        """
+        if samples is None:
+            with self._lock:
+                keys = self._conn.execute('SELECT book, idx FROM chapters').fetchall()
+            keys = random.sample(keys, min(sample_size, len(keys)))
+            samples = [row[2] for row in (self.get(book, idx) for book, idx in keys) if row]
+        samples = [s for s in samples if s]
+        if not samples:
+            msg = '没有可用于训练字典的章节'
+            raise ValueError(msg)
+        data = _train(self.codec, samples, size)
+        with self._lock:
+            cursor = self._conn.execute('INSERT INTO dicts (codec, data, created) VALUES (?, ?, ?)', (self.codec, data, time.time()))
+            self._conn.commit()
+            self.dict_id = cursor.lastrowid
+        return self.dict_id
+
+    def _write(self, book: str, index: int, title: str, content: str) -> None:
+        """压缩并追加一章,须持有锁,由调用方提交"""
+        raw = content.encode('utf-8')
+        block = self._codec_for(self.codec, self.dict_id).compress(raw)
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        self._data.write(block)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO chapters (book, idx, title, offset, size, raw, codec, dict) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (book, index, title, offset, len(block), len(raw), self.codec, self.dict_id),
+        )
+
+    def put(self, book: str, index: int, title: str, content: str) -> None:
+        """写入一章,同一 (book, index) 重复写入时覆盖"""
+        with self._lock:
+            self._write(book, index, str(title), str(content))
+            self._data.flush()
+            self._conn.commit()
+
+    def put_rows(self, book: str, rows: Iterable[Any], batch: int = 200) -> int:
+        """批量写入 [index, title, content],跳过失败行,每 batch 章提交一次,返回写入章节数"""
+        count = 0
+        with self._lock:
+            for row in rows:
+                if is_failed(row):
+                    continue
+                self._write(book, int(row[0]), str(row[1]), str(row[2]))
+                count += 1
+                if count % batch == 0:
+                    self._data.flush()
+                    self._conn.commit()
+            self._data.flush()
+            self._conn.commit()
+        return count
+
+    def get(self, book: str, index: int) -> list | None:
+        """读取一章 [index, title, content],不存在时返回None"""
+        with self._lock:
+            record = self._conn.execute('SELECT title, offset, size, codec, dict FROM chapters WHERE book=? AND idx=?', (book, index)).fetchone()
+            if record is None:
+                return None
+            title, offset, size, codec, dict_id = record
+            self._data.seek(offset)
+            block = self._data.read(size)
+            content = self._codec_for(codec, dict_id).decompress(block)
+        return [index, title, content.decode('utf-8')]
+
+    def toc(self, book: str) -> list[tuple[int, str]]:
+        """目录 [(index, title)],不解压正文"""
+        with self._lock:
+            return self._conn.execute('SELECT idx, title FROM chapters WHERE book=? ORDER BY idx', (book,)).fetchall()
+
+    def books(self) -> list[str]:
+        with self._lock:
+            return [book for (book,) in self._conn.execute('SELECT DISTINCT book FROM chapters ORDER BY book')]
+
+    def rows(self, book: str) -> Iterator[list]:
+        """按序号顺序逐章产出 [index, title, content]"""
+        for index, _ in self.toc(book):
+            row = self.get(book, index)
+            if row is not None:
+                yield row
+
+    def export(self, book: str, filename: str | os.PathLike, br: str = '\n') -> int:
+        """导出为与 save_file 格式一致的文本文件,返回章节数"""
+        return save_rows(filename, self.rows(book), br=br)
+
+    def import_file(self, filename: str | os.PathLike, book: str | None = None, br: str = '\n') -> int:
+        """导入 save_file / save_rows 写出的书籍文件,书籍键默认为文件名(不含扩展名),返回章节数"""
+        return self.put_rows(book or pathlib.Path(filename).stem, iter_saved_rows(filename, br))
+
+    def delete(self, book: str) -> None:
+        """删除一本书的索引,数据块在 compact() 时回收"""
+        with self._lock:
+            self._conn.execute('DELETE FROM chapters WHERE book=?', (book,))
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        """章节数、原始字节数、压缩后字节数、压缩比与可回收的垃圾字节数"""
+        with self._lock:
+            chapters, raw, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(raw), 0), COALESCE(SUM(size), 0) FROM chapters').fetchone()
+            books = self._conn.execute('SELECT COUNT(DISTINCT book) FROM chapters').fetchone()[0]
+            self._data.seek(0, os.SEEK_END)
+            file_size = self._data.tell()
+        return {
+            'books': books,
+            'chapters': chapters,
+            'raw_bytes': raw,
+            'stored_bytes': size,
+            'ratio': round(raw / size, 2) if size else None,
+            'garbage_bytes': file_size - size,
+            'codec': self.codec,
+            'dict': self.dict_id,
+        }
+
+    def compact(self) -> int:
+        """把仍被索引的章节块复制到新的数据文件,返回回收的字节数
+
+        新文件名与新偏移在同一事务中提交,提交前中断不影响原文件。
+        """
+        with self._lock:
+            records = self._conn.execute('SELECT book, idx, offset, size FROM chapters ORDER BY offset').fetchall()
+            self._data.seek(0, os.SEEK_END)
+            before = self._data.tell()
+            name = f'chapters.{time.time_ns()}.dat'
+            moved = []
+            with (self.path / name).open('wb') as out:
+                for book, idx, offset, size in records:
+                    self._data.seek(offset)
+                    moved.append((out.tell(), book, idx))
+                    out.write(self._data.read(size))
+                after = out.tell()
+            self._conn.executemany('UPDATE chapters SET offset=? WHERE book=? AND idx=?', moved)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('data', ?)", (name,))
+            self._conn.commit()
+            self._data.close()
+            (self.path / self._data_name).unlink()
+            self._data_name = name
+            self._data = (self.path / name).open('a+b')
+        return before - after
@@ -0,0 +1,218 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 本地模拟小说站点
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 20:02:37
+LastEditTime : 2026-10-18 20:02:37
+FilePath     : /CODE/xjLib/xt_bqg/fakesite.py
+Github       : https://github.com/sandorn/home
+==============================================================
+基于标准库 ThreadingHTTPServer,页面结构与 bigee.cc 一致,
+get_download_url / resp_handle 可直接解析:
+- /book/{book}/          目录页
+- /book/{book}/{n}.html  第n章(n从1开始)
+延迟、抖动、错误率、章节长度均可配置,同一 seed 生成的内容完全相同。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from xtlog import mylog
+
+_WORDS = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光'
+_ROUTE = re.compile(r'^/book/(\d+)/(?:(\d+)\.html)?$')
+
+
+@dataclass(frozen=True, slots=True)
+class SiteConfig:
+    """模拟站点参数
+
+    Args:
+        chapters: 每本书的章节数
+        chapter_chars: 每章正文大约的字数
+        latency: 每个请求的基础延迟(秒)
+        jitter: 延迟抖动幅度(秒),实际延迟在 latency ± jitter 内均匀分布
+        error_rate: 返回 503 的概率
+        head_chapters: 目录页中 <span class="dd_hide"> 之前直接展示的章节数
+        seed: 内容随机种子
+    """
+
+    chapters: int = 200
+    chapter_chars: int = 3000
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    head_chapters: int = 10
+    seed: int = 7
+
+
+def _chapter_title(book: int, n: int, seed: int) -> str:
+    rnd = random.Random(f'{seed}:{book}:{n}:title')  # noqa: S311  # 仅用于模拟站点内容
+    return f'第{n}章 ' + ''.join(rnd.choice(_WORDS) for _ in range(rnd.randint(2, 6)))
+
+
+@lru_cache(maxsize=64)
+def render_toc(book: int, config: SiteConfig) -> bytes:
+    """目录页HTML"""
+    items = [f'<dd><a href="/book/{book}/{n}.html">{_chapter_title(book, n, config.seed)}</a></dd>' for n in range(1, config.chapters + 1)]
+    head, tail = items[: config.head_chapters], items[config.head_chapters :]
+    page = (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>模拟书籍{book}</title></head><body>'
+        f'<div class="book"><div class="info"><h1>模拟书籍{book}</h1></div></div>'
+        f'<div class="listmain"><dl>{"".join(head)}'
+        '<dd class="more pc_none"><a href="javascript:dd_show()">&lt;&lt;---展开全部章节---&gt;&gt;</a></dd>'
+        f'<span class="dd_hide">{"".join(tail)}</span></dl></div></body></html>'
+    )
+    return page.encode('utf-8')
+
+
+@lru_cache(maxsize=1024)
+def render_chapter(book: int, n: int, config: SiteConfig) -> bytes:
+    """章节页HTML,包含与真实站点相同的推广信息与按钮"""
+    rnd = random.Random(f'{config.seed}:{book}:{n}')  # noqa: S311  # 仅用于模拟站点内容
+    paragraphs = []
+    size = 0
+    while size < config.chapter_chars:
+        sentence = ''.join(rnd.choice(_WORDS) for _ in range(rnd.randint(20, 80)))
+        paragraphs.append(f'　　“{sentence}”，{sentence[:10]}。')
+        size += len(sentence) + 16
+    page = (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{_chapter_title(book, n, config.seed)}</title></head><body>'
+        f'<h1 class="wap_none">{_chapter_title(book, n, config.seed)}</h1>'
+        f'<div id="chaptercontent" class="Readarea ReadAjax_content">{"<br /><br />".join(paragraphs)}<br /><br />'
+        '请收藏本站：https://www.bigee.cc。笔趣阁手机版：https://m.bigee.cc <br /><br />'
+        f'<p class="readinline"><a href="javascript:postError();" class="red">『点此报错』</a>'
+        f'<a href="javascript:addBookCase({book});" class="red">『加入书签』</a></p></div></body></html>'
+    )
+    return page.encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: _Server
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:
+        start = time.perf_counter()
+        site = self.server.site
+        config = site.config
+        delay = config.latency + site.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        matched = _ROUTE.match(self.path.split('?', 1)[0])
+        if matched is None:
+            status, body = 404, b'not found'
+        elif site.random() < config.error_rate:
+            status, body = 503, b'service unavailable'
+        else:
+            book, n = int(matched.group(1)), matched.group(2)
+            if n is None:
+                status, body = 200, render_toc(book, config)
+            elif 1 <= int(n) <= config.chapters:
+                status, body = 200, render_chapter(book, int(n), config)
+            else:
+                status, body = 404, b'not found'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8' if status == 200 else 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        site.record(status, time.perf_counter() - start)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    site: FakeSite
+
+
+class FakeSite:
+    """在后台线程运行的模拟站点
+
+    示例用法:
+    >>> with FakeSite(SiteConfig(chapters=100, latency=0.1, error_rate=0.02)) as site:
+    ...     bookname, urls, titles = get_download_url(site.book_url(1))
+    ...     texts = list(iter_contents(urls))
+    ...     mylog(site.stats())
+    """
+
+    def __init__(self, config: SiteConfig | None = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or SiteConfig()
+        self._rnd = random.Random(self.config.seed)  # noqa: S311  # 仅用于模拟延迟与错误
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.site = self
+        self._thread: threading.Thread | None = None
+        self.reset()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def book_url(self, book: int = 1) -> str:
+        return f'{self.url}/book/{book}/'
+
+    def uniform(self, a: float, b: float) -> float:
+        with self._lock:
+            return self._rnd.uniform(a, b)
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rnd.random()
+
+    def record(self, status: int, elapsed: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.latencies.append(elapsed)
+
+    def reset(self) -> None:
+        """清空请求统计"""
+        with self._lock:
+            self.requests = 0
+            self.statuses: dict[int, int] = {}
+            self.latencies: list[float] = []
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {'requests': self.requests, 'statuses': dict(self.statuses)}
+
+    def start(self) -> FakeSite:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='FakeSite', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> FakeSite:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+if __name__ == '__main__':
+    with FakeSite(SiteConfig(), port=8765) as site:
+        mylog(f'模拟站点: {site.book_url(1)}  (Ctrl+C 退出)')
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
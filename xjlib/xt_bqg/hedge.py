@@ -0,0 +1,289 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 对冲请求与镜像站故障转移
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 20:58:16
+LastEditTime : 2026-10-18 20:58:16
+FilePath     : /CODE/xjLib/xt_bqg/hedge.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 对冲: 请求超过该站点近期成功请求的 p95 延迟仍未返回时,向次优镜像(或同一url)再发一次,
+  先成功者返回;对冲次数占比受 max_ratio 限制,避免放大站点压力
+- 镜像: 同一本书在多个站点的目录地址,按平滑延迟与连续失败次数排序,
+  失败时立即改用下一个镜像
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from xthttp import get
+
+from .cache import CachedResp
+from .limiter import resp_ok
+from .urls import normalize_url
+
+# 对冲线程池的默认上限: 线程按需创建、空闲复用,实际线程数约等于调用方并发数加在途对冲数,
+# 固定的小线程池会让请求在池内排队,排队时间既抬高 p95 又使对冲请求同样被堵住
+_MAX_THREADS = 1024
+
+
+class _Health:
+    """单个镜像的延迟与失败统计"""
+
+    __slots__ = ('errors', 'ewma', 'ok', 'samples', 'streak')
+
+    def __init__(self, window: int):
+        self.ok = 0
+        self.errors = 0
+        self.streak = 0
+        self.ewma = 0.0
+        self.samples: deque[float] = deque(maxlen=window)
+
+
+class MirrorSet:
+    """同一本书的多个镜像目录地址
+
+    各镜像的章节文件名需一致,章节url按目录地址前缀互相替换,前缀比较前先经 normalize_url 规范化:
+    >>> mirrors = MirrorSet(['https://www.bigee.cc/book/6909/', 'https://www.d3016ba0.icu/book/58732/'])
+    >>> mirrors.candidates('https://www.bigee.cc/book/6909/1.html')
+    ['https://www.bigee.cc/book/6909/1.html', 'https://www.d3016ba0.icu/book/58732/1.html']
+    """
+
+    def __init__(self, bases: Iterable[str], alpha: float = 0.2, window: int = 200):
+        self.bases = list(dict.fromkeys(bases))
+        if not self.bases:
+            msg = '镜像列表不能为空'
+            raise ValueError(msg)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._health = {base: _Health(window) for base in self.bases}
+        self._keys = [(normalize_url(base), base) for base in self.bases]
+
+    def _split(self, url: str) -> tuple[str, str] | None:
+        """(所属镜像, 规范化url中镜像前缀之后的部分),不属于任何镜像时返回None"""
+        key = normalize_url(url)
+        for prefix, base in self._keys:
+            if key.startswith(prefix):
+                return base, key[len(prefix) :]
+        return None
+
+    def base_of(self, url: str) -> str | None:
+        found = self._split(url)
+        return found[0] if found is not None else None
+
+    def _score(self, base: str) -> float:
+        """越小越优: 未试过的镜像为0以便探测,连续失败时成倍惩罚"""
+        health = self._health[base]
+        if not health.ok and not health.errors:
+            return 0.0
+        return (health.ewma or 1.0) * 2 ** min(health.streak, 8)
+
+    def ranked(self) -> list[str]:
+        with self._lock:
+            return sorted(self.bases, key=self._score)
+
+    def candidates(self, url: str) -> list[str]:
+        """按当前评分排序的候选url,url不属于任何镜像时原样返回"""
+        found = self._split(url)
+        if found is None:
+            return [url]
+        suffix = found[1]
+        return [mirror + suffix for mirror in self.ranked()]
+
+    def observe(self, url: str, latency: float, ok: bool) -> None:
+        base = self.base_of(url)
+        if base is None:
+            return
+        with self._lock:
+            health = self._health[base]
+            if ok:
+                health.ok += 1
+                health.streak = 0
+                health.ewma = latency if not health.ewma else self.alpha * latency + (1 - self.alpha) * health.ewma
+                health.samples.append(latency)
+            else:
+                health.errors += 1
+                health.streak += 1
+
+    def p95(self, url: str, min_samples: int) -> float | None:
+        """该镜像近期成功请求的 p95 延迟,样本不足时返回None"""
+        base = self.base_of(url)
+        if base is None:
+            return None
+        with self._lock:
+            samples = sorted(self._health[base].samples)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                base: {'ok': h.ok, 'errors': h.errors, 'streak': h.streak, 'latency_ms': round(h.ewma * 1000, 1), 'score': round(self._score(base), 4)}
+                for base, h in self._health.items()
+            }
+
+
+class HedgedFetcher:
+    """带对冲与镜像故障转移的请求函数,可直接作为 get_contents / iter_contents 的 fn 参数
+
+    没有镜像时,对冲请求发往同一url;以 url 所在站点为单位统计 p95。
+    延迟从请求在线程中开始执行时计起,不含排队时间。
+    落后的请求无法中断,会在后台执行完毕并计入延迟统计。
+
+    示例用法:
+    >>> fetch = HedgedFetcher(get, mirrors=['https://www.bigee.cc/book/6909/', 'https://www.d3016ba0.icu/book/58732/'])
+    >>> rows = iter_contents(urls, fn=fetch, max_workers=64)
+    >>> mylog(fetch.report())
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., Any] = get,
+        mirrors: MirrorSet | Iterable[str] | None = None,
+        hedge_after: float | None = None,
+        min_samples: int = 20,
+        max_ratio: float = 0.1,
+        max_workers: int | None = None,
+    ):
+        """
+        Args:
+            fn: 实际的请求函数
+            mirrors: 镜像目录地址列表或 MirrorSet
+            hedge_after: 固定的对冲等待秒数,None 时使用近期 p95
+            min_samples: 使用 p95 前至少需要的成功样本数
+            max_ratio: 对冲请求占全部请求的比例上限
+            max_workers: 执行请求的线程数上限,默认按需创建(约为调用方并发数加对冲数);
+                指定时应不小于调用方的并发数,否则请求会在池内排队
+        """
+        self.fn = fn
+        if mirrors is not None and not isinstance(mirrors, MirrorSet):
+            mirrors = MirrorSet(mirrors)
+        # 没有镜像时以站点根地址作为唯一"镜像",复用同一套统计
+        self.mirrors = mirrors
+        self._sites: dict[str, MirrorSet] = {}
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or _MAX_THREADS, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.__wrapped__ = fn
+
+    def _tracker(self, url: str) -> MirrorSet:
+        if self.mirrors is not None and self.mirrors.base_of(url) is not None:
+            return self.mirrors
+        site = '/'.join(normalize_url(url).split('/', 3)[:3]) + '/'
+        with self._lock:
+            tracker = self._sites.get(site)
+            if tracker is None:
+                tracker = self._sites[site] = MirrorSet([site])
+            return tracker
+
+    def _threshold(self, url: str) -> float | None:
+        with self._lock:
+            if self.hedged >= max(1, self.requests * self.max_ratio):
+                return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        return self._tracker(url).p95(url, self.min_samples)
+
+    def _launch(self, target: str, args: tuple, kwargs: dict) -> tuple[Future, list[float]]:
+        """提交请求,返回 (future, 开始执行时刻),后者在线程开始执行前为空列表"""
+        tracker = self._tracker(target)
+        started: list[float] = []
+
+        def run() -> Any:
+            started.append(time.monotonic())
+            return self.fn(target, *args, **kwargs)
+
+        def observe(fut: Future) -> None:
+            if not started:
+                return
+            resp = fut.exception() or fut.result()
+            tracker.observe(target, time.monotonic() - started[0], isinstance(resp, CachedResp) or resp_ok(resp))
+
+        future = self._pool.submit(run)
+        future.add_done_callback(observe)
+        return future, started
+
+    def __call__(self, url: str, *args: Any, **kwargs: Any) -> Any:
+        targets = self._tracker(url).candidates(url)
+        with self._lock:
+            self.requests += 1
+
+        primary, started = self._launch(targets[0], args, kwargs)
+        running = {primary}
+        launched = 1
+        hedged = False
+        last: Any = None
+        threshold = self._threshold(targets[0])
+
+        while running:
+            timeout = None
+            if not hedged and threshold is not None:
+                # 等待时长从请求开始执行时计起;尚未开始时稍后重新计算
+                timeout = threshold if not started else max(0.0, started[0] + threshold - time.monotonic())
+            done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if not started:
+                    continue
+                # 执行超过 p95 仍未返回: 发出对冲请求(有镜像时发往次优镜像)
+                hedged = True
+                with self._lock:
+                    self.hedged += 1
+                running.add(self._launch(targets[launched % len(targets)], args, kwargs)[0])
+                launched += 1
+                continue
+
+            for future in done:
+                resp = future.exception() or future.result()
+                if isinstance(resp, CachedResp) or resp_ok(resp):
+                    if future is not primary and hedged:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return resp
+                last = resp
+
+            # 全部失败且还有未试过的镜像: 故障转移
+            if not running and launched < len(targets):
+                with self._lock:
+                    self.failovers += 1
+                future, started = self._launch(targets[launched], args, kwargs)
+                running.add(future)
+                launched += 1
+
+        return last
+
+    def stats(self) -> dict[str, Any]:
+        mirrors = self.mirrors.stats() if self.mirrors is not None else {}
+        with self._lock:
+            sites = list(self._sites.values())
+            result = {'requests': self.requests, 'hedged': self.hedged, 'hedge_wins': self.hedge_wins, 'failovers': self.failovers}
+        for site in sites:
+            mirrors.update(site.stats())
+        result['mirrors'] = mirrors
+        return result
+
+    def report(self) -> str:
+        """以表格形式返回 stats()"""
+        s = self.stats()
+        lines = [f'请求: {s["requests"]} | 对冲: {s["hedged"]} | 对冲胜出: {s["hedge_wins"]} | 故障转移: {s["failovers"]}']
+        lines.append(f'{"mirror":<44}{"ok":>8}{"err":>6}{"streak":>8}{"lat_ms":>9}')
+        for base, m in s['mirrors'].items():
+            lines.append(f'{base:<44}{m["ok"]:>8}{m["errors"]:>6}{m["streak"]:>8}{m["latency_ms"]:>9}')
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,162 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 异步抓取 + 多进程解析的混合模式
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 19:20:41
+LastEditTime : 2026-10-18 19:20:41
+FilePath     : /CODE/xjLib/xt_bqg/hybrid.py
+Github       : https://github.com/sandorn/home
+==============================================================
+网络I/O与CPU解析分离:
+- 抓取在 asyncio 事件循环上进行,并发数由 concurrency 控制
+- 原始HTML分块送入进程池执行 resp_handle / clean_content,进程数由 processes 控制
+- 两级之间为有界队列,解析跟不上时抓取自动暂停(背压)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from xthttp import UnifiedResp, get
+
+from .cache import CachedResp, resp_text
+from .core import normalize_row, resp_handle
+from .limiter import resp_status
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+
+def _parse_chunk(chunk: list[tuple[int, str, str, int]]) -> list[list]:
+    """进程池中执行: 解析一批 (index, url, html, status),结果与输入一一对应"""
+    return [normalize_row(index, resp_handle(CachedResp(url, text, status, index=index))) for index, url, text, status in chunk]
+
+
+async def acrawl_hybrid(
+    urls: Iterable[str],
+    *,
+    fn: Callable[..., Any] = get,
+    afn: Callable[[str], Awaitable[Any]] | None = None,
+    start: int = 0,
+    concurrency: int = 64,
+    processes: int | None = None,
+    chunk_size: int = 16,
+    max_pending: int | None = None,
+    store: CheckpointStore | None = None,
+    book: str | None = None,
+    limiter: HostLimiter | None = None,
+) -> list[list]:
+    """异步抓取章节,分块交给进程池解析,返回按序号排序的 [index, title, content] 列表
+
+    Args:
+        urls: 章节链接序列
+        fn: 同步请求函数,未提供 afn 时在线程中执行
+        afn: 异步请求函数 async (url) -> resp,提供时直接在事件循环上抓取
+        start: 起始序号
+        concurrency: 同时在途的请求数
+        processes: 解析进程数,默认 CPU 核数
+        chunk_size: 每次送入进程池的最大章节数,队列中已有的响应会尽量凑满一块
+        max_pending: 同时在进程池中排队/执行的块数,默认 processes * 2
+        store: 断点存储,已成功的章节不再抓取,新结果实时写入
+        book: 断点存储中的书籍键
+        limiter: 按主机自适应并发控制,仅作用于同步 fn
+    """
+    if store is not None and book is None:
+        msg = '使用断点存储时必须指定book'
+        raise ValueError(msg)
+
+    if limiter is not None and afn is None:
+        fn = limiter.wrap(fn)
+
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or processes * 2
+    loop = asyncio.get_running_loop()
+    # 队列容量即已抓取未解析的响应上限
+    queue: asyncio.Queue = asyncio.Queue(maxsize=chunk_size * max_pending)
+    pending = asyncio.Semaphore(max_pending)
+    tasks = enumerate(urls, start)
+    rows: dict[int, list] = {}
+    parsing: set[asyncio.Task] = set()
+
+    def collect(index: int, url: str, row: list) -> None:
+        if store is not None:
+            store.put(book, index, url, row)
+        rows[index] = row
+
+    async def fetch(io_pool: ThreadPoolExecutor) -> None:
+        for index, url in tasks:
+            cached = store.get(book, index) if store is not None else None
+            if cached is not None:
+                rows[index] = cached
+                continue
+            try:
+                resp = await afn(url) if afn is not None else await loop.run_in_executor(io_pool, fn, url)
+            except Exception as e:
+                collect(index, url, normalize_row(index, e))
+                continue
+            if isinstance(resp, UnifiedResp | CachedResp):
+                await queue.put((index, url, resp_text(resp), resp_status(resp) or 200))
+            else:
+                collect(index, url, normalize_row(index, resp_handle(resp)))
+
+    async def parse(proc_pool: ProcessPoolExecutor, chunk: list[tuple]) -> None:
+        try:
+            results = await loop.run_in_executor(proc_pool, _parse_chunk, chunk)
+        except Exception as e:
+            results = [normalize_row(item[0], e) for item in chunk]
+        finally:
+            pending.release()
+        for item, row in zip(chunk, results, strict=True):
+            collect(item[0], item[1], row)
+
+    async def dispatch(proc_pool: ProcessPoolExecutor) -> None:
+        while (item := await queue.get()) is not None:
+            chunk = [item]
+            while len(chunk) < chunk_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    queue.put_nowait(None)
+                    break
+                chunk.append(item)
+            await pending.acquire()
+            task = asyncio.create_task(parse(proc_pool, chunk))
+            parsing.add(task)
+            task.add_done_callback(parsing.discard)
+
+    io_pool = ThreadPoolExecutor(max_workers=concurrency)
+    proc_pool = ProcessPoolExecutor(max_workers=processes)
+    dispatcher = asyncio.create_task(dispatch(proc_pool))
+    try:
+        await asyncio.gather(*(fetch(io_pool) for _ in range(concurrency)))
+        await queue.put(None)
+        await dispatcher
+        await asyncio.gather(*parsing)
+    finally:
+        # 不在事件循环中等待线程与进程退出;取消或出错时丢弃尚未开始的抓取与解析
+        dispatcher.cancel()
+        for task in parsing:
+            task.cancel()
+        io_pool.shutdown(wait=False, cancel_futures=True)
+        proc_pool.shutdown(wait=False, cancel_futures=True)
+
+    return [rows[index] for index in sorted(rows)]
+
+
+def crawl_hybrid(urls: Iterable[str], **kwargs: Any) -> list[list]:
+    """acrawl_hybrid 的同步入口,参数相同
+
+    Windows 下进程池需要在 if __name__ == '__main__': 中调用。
+
+    示例用法:
+    >>> bookname, urls, _ = get_download_url(url)
+    >>> texts = crawl_hybrid(urls, concurrency=100, processes=8)
+    >>> save_file(f'{bookname}.txt', texts)
+    """
+    return asyncio.run(acrawl_hybrid(urls, **kwargs))
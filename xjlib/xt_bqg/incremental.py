@@ -0,0 +1,111 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节页增量解析
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-19 01:05:37
+LastEditTime : 2026-10-19 01:05:37
+FilePath     : /CODE/xjLib/xt_bqg/incremental.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 正文分块到达时即送入 lxml HTMLPullParser,解析与下载重叠进行
+- 标题与正文节点结束时立即取出文本,其余已解析完的节点随即清空,原始字节不保留
+- 结果与 extract_chapter 完全一致,可直接交给 core.chapter_row 清理
+"""
+
+from __future__ import annotations
+
+import codecs
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from lxml import etree
+
+from .extract import DEFAULT_PROFILE, PARSE_STATS, ChapterPage, SiteProfile, node_text
+
+
+class ChapterFeed:
+    """边下载边解析的章节页解析器
+
+    示例用法:
+    >>> feed = ChapterFeed(encoding='utf-8')
+    >>> for chunk in resp.iter_content(8192):
+    ...     feed.feed(chunk)
+    >>> page = feed.close()  # 与 extract_chapter(完整正文) 相同
+    """
+
+    __slots__ = ('_contents', '_decoder', '_parser', '_roots', '_titles', 'elapsed', 'fed', 'profile')
+
+    def __init__(self, profile: SiteProfile = DEFAULT_PROFILE, encoding: str | None = None):
+        """
+        Args:
+            profile: 站点解析配置
+            encoding: 字节块的编码,提供时按该编码增量解码后送入解析器;
+                为 None 时字节块原样送入,由 libxml2 按页面声明识别编码
+        """
+        self.profile = profile
+        self.elapsed = 0.0
+        self.fed = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)('replace') if encoding else None
+        self._parser = etree.HTMLPullParser(events=('start', 'end'))
+        self._titles: list[str] = []
+        self._contents: list[str] = []
+        # 尚未结束的标题/正文节点,可能互相嵌套
+        self._roots: list[Any] = []
+
+    def feed(self, chunk: str | bytes) -> None:
+        """送入一块正文"""
+        start = time.perf_counter()
+        self.fed += len(chunk)
+        if self._decoder is not None and isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._parser.feed(chunk)
+            self._drain()
+        self.elapsed += time.perf_counter() - start
+
+    def close(self) -> ChapterPage:
+        """结束解析,返回 ChapterPage;残缺的页面按已收到的部分补全结束标签"""
+        start = time.perf_counter()
+        if self._decoder is not None:
+            tail = self._decoder.decode(b'', final=True)
+            if tail:
+                self._parser.feed(tail)
+        if self.fed:
+            self._parser.close()
+            self._drain()
+        self.elapsed += time.perf_counter() - start
+        PARSE_STATS.record(self.profile.name, 'chapter_feed', self.elapsed)
+        return ChapterPage(' '.join(self._titles), ' '.join(self._contents), self.elapsed)
+
+    def _drain(self) -> None:
+        profile = self.profile
+        roots = self._roots
+        for event, el in self._parser.read_events():
+            if event == 'start':
+                if el.tag == profile.title_tag or el.get('id') == profile.content_id:
+                    roots.append(el)
+                continue
+            if roots:
+                if el is not roots[-1]:
+                    continue
+                roots.pop()
+                (self._titles if el.tag == profile.title_tag else self._contents).append(node_text(el))
+                if roots:
+                    continue
+            # 已处理完的子树不再需要,释放节点及其之前的兄弟节点
+            el.clear()
+            parent = el.getparent()
+            if parent is not None:
+                while el.getprevious() is not None:
+                    del parent[0]
+
+
+def extract_chapter_chunks(chunks: Iterable[str | bytes], profile: SiteProfile = DEFAULT_PROFILE, encoding: str | None = None) -> ChapterPage:
+    """逐块解析章节页,适用于 requests 的 iter_content、文件分块读取等流式来源"""
+    feed = ChapterFeed(profile, encoding)
+    for chunk in chunks:
+        feed.feed(chunk)
+    return feed.close()
@@ -0,0 +1,289 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 按主机自适应并发控制(AIMD)
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 14:02:17
+LastEditTime : 2026-10-18 14:02:17
+FilePath     : /CODE/xjLib/xt_bqg/limiter.py
+Github       : https://github.com/sandorn/home
+==============================================================
+加性增、乘性减:
+- 请求成功且延迟正常时,每完成约 limit 个请求并发上限 +1
+- 出现错误、429/503 或延迟超过基线 latency_factor 倍时,上限乘以 decrease
+- 每个往返周期内最多收缩一次,避免一批失败把上限直接压到底
+同一个 HostLimiter 可同时用于线程(slot/wrap)与 asyncio 协程(aslot/awrap)。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+from xthttp import UnifiedResp
+
+THROTTLE_STATUS = frozenset({429, 503})
+
+
+def host_of(url: str) -> str:
+    """提取url的主机名(小写,含端口)"""
+    return urlsplit(url).netloc.lower()
+
+
+def resp_status(resp: Any) -> int | None:
+    """读取响应状态码,兼容 status / status_code 两种命名"""
+    for attr in ('status', 'status_code'):
+        status = getattr(resp, attr, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def resp_ok(resp: Any) -> bool:
+    """请求是否成功: UnifiedResp / CachedResp 且状态码不是 429/503/5xx"""
+    from .cache import CachedResp  # cache 依赖本模块,延迟导入
+
+    status = resp_status(resp)
+    return isinstance(resp, UnifiedResp | CachedResp) and status not in THROTTLE_STATUS and (status is None or status < 500)
+
+
+class AIMDController:
+    """单个主机的AIMD并发上限计算,本身不加锁,由 HostLimiter 统一加锁调用"""
+
+    __slots__ = (
+        'alpha',
+        'completed',
+        'decrease',
+        'errors',
+        'increase',
+        'inflight',
+        'last_decrease',
+        'latency_base',
+        'latency_ewma',
+        'latency_factor',
+        'limit',
+        'max_limit',
+        'min_limit',
+        'ok',
+        'recent',
+        'throttled',
+    )
+
+    def __init__(
+        self,
+        initial: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_factor: float = 3.0,
+        alpha: float = 0.2,
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.alpha = alpha
+        self.inflight = 0
+        self.ok = 0
+        self.errors = 0
+        self.throttled = 0
+        self.completed = 0
+        self.latency_ewma = 0.0
+        self.latency_base = 0.0
+        self.last_decrease = 0.0
+        self.recent: deque[float] = deque(maxlen=4096)
+
+    @property
+    def capacity(self) -> int:
+        """当前允许的在途请求数"""
+        return max(1, int(self.limit))
+
+    def _observe(self, latency: float, now: float) -> None:
+        self.completed += 1
+        self.recent.append(now)
+        self.latency_ewma = latency if not self.latency_ewma else self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+        # 基线取平滑延迟的历史最小值,并缓慢上浮以适应站点整体变慢
+        self.latency_base = self.latency_ewma if not self.latency_base else min(self.latency_ewma, self.latency_base * 1.001)
+
+    def _backoff(self, now: float) -> None:
+        if now - self.last_decrease < max(self.latency_ewma, 0.05):
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+
+    def on_success(self, latency: float, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.ok += 1
+        self._observe(latency, now)
+        if self.latency_base and latency > self.latency_base * self.latency_factor:
+            self._backoff(now)
+        else:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def on_failure(self, latency: float, throttled: bool = False, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        if throttled:
+            self.throttled += 1
+        else:
+            self.errors += 1
+        self._observe(latency, now)
+        self._backoff(now)
+
+    def throughput(self, window: float = 10.0, now: float | None = None) -> float:
+        """最近 window 秒内每秒完成的请求数"""
+        now = time.monotonic() if now is None else now
+        recent = self.recent
+        while recent and now - recent[0] > window:
+            recent.popleft()
+        return len(recent) / window
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'limit': round(self.limit, 2),
+            'inflight': self.inflight,
+            'ok': self.ok,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'latency_ms': round(self.latency_ewma * 1000, 1),
+            'base_ms': round(self.latency_base * 1000, 1),
+            'throughput': round(self.throughput(), 2),
+        }
+
+
+class _Slot:
+    """一次受控请求,record() 根据响应结果反馈给控制器"""
+
+    __slots__ = ('host', 'outcome', 'start')
+
+    def __init__(self, host: str):
+        self.host = host
+        self.start = time.monotonic()
+        self.outcome: tuple[bool, bool] | None = None
+
+    def record(self, resp: Any) -> Any:
+        self.outcome = (resp_ok(resp), resp_status(resp) in THROTTLE_STATUS)
+        return resp
+
+
+class HostLimiter:
+    """按主机分别维护AIMD控制器,在途请求数超过上限时阻塞等待
+
+    示例用法:
+    >>> limiter = HostLimiter(initial=16, max_limit=200)
+    >>> rows = iter_contents(urls, fn=limiter.wrap(get), max_workers=200)
+    >>> mylog(limiter.report())  # 查看各主机当前上限与吞吐
+    """
+
+    def __init__(self, **controller_kwargs: Any):
+        self._kwargs = controller_kwargs
+        self._cond = threading.Condition()
+        self._hosts: dict[str, AIMDController] = {}
+        # 等待名额的协程,release 时跨线程唤醒
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def controller(self, host: str) -> AIMDController:
+        with self._cond:
+            ctrl = self._hosts.get(host)
+            if ctrl is None:
+                ctrl = self._hosts[host] = AIMDController(**self._kwargs)
+            return ctrl
+
+    def acquire(self, host: str) -> None:
+        ctrl = self.controller(host)
+        with self._cond:
+            while ctrl.inflight >= ctrl.capacity:
+                self._cond.wait()
+            ctrl.inflight += 1
+
+    async def aacquire(self, host: str) -> None:
+        """acquire 的协程版本,等待时不阻塞事件循环"""
+        ctrl = self.controller(host)
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if ctrl.inflight < ctrl.capacity:
+                    ctrl.inflight += 1
+                    return
+                event = asyncio.Event()
+                self._waiters.append((loop, event))
+            await event.wait()
+
+    def release(self, host: str, latency: float, ok: bool, throttled: bool = False) -> None:
+        ctrl = self.controller(host)
+        with self._cond:
+            ctrl.inflight -= 1
+            if ok:
+                ctrl.on_success(latency)
+            else:
+                ctrl.on_failure(latency, throttled)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    @contextmanager
+    def slot(self, url: str) -> Generator[_Slot]:
+        """占用目标主机的一个并发名额,未调用 record() 或抛出异常均按失败处理"""
+        host = host_of(url)
+        self.acquire(host)
+        slot = _Slot(host)
+        try:
+            yield slot
+        finally:
+            ok, throttled = slot.outcome or (False, False)
+            self.release(host, time.monotonic() - slot.start, ok, throttled)
+
+    @asynccontextmanager
+    async def aslot(self, url: str) -> AsyncGenerator[_Slot]:
+        """slot 的协程版本"""
+        host = host_of(url)
+        await self.aacquire(host)
+        slot = _Slot(host)
+        try:
+            yield slot
+        finally:
+            ok, throttled = slot.outcome or (False, False)
+            self.release(host, time.monotonic() - slot.start, ok, throttled)
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """包装请求函数,可直接作为 get_contents / iter_contents 的 fn 参数"""
+
+        def limited(url: str, *args: Any, **kwargs: Any) -> Any:
+            with self.slot(url) as slot:
+                return slot.record(fn(url, *args, **kwargs))
+
+        limited.__wrapped__ = fn  # type: ignore[attr-defined]
+        return limited
+
+    def awrap(self, afn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """包装异步请求函数,可作为 aiter_contents / acrawl_hybrid 的 afn 参数"""
+
+        async def limited(url: str, *args: Any, **kwargs: Any) -> Any:
+            async with self.aslot(url) as slot:
+                return slot.record(await afn(url, *args, **kwargs))
+
+        limited.__wrapped__ = afn  # type: ignore[attr-defined]
+        return limited
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """各主机当前上限、在途数、成功/失败计数、平滑延迟与吞吐"""
+        with self._cond:
+            return {host: ctrl.snapshot() for host, ctrl in self._hosts.items()}
+
+    def report(self) -> str:
+        """以表格形式返回 stats()"""
+        lines = [f'{"host":<28}{"limit":>8}{"inflight":>10}{"ok":>8}{"err":>6}{"429":>6}{"lat_ms":>9}{"base_ms":>9}{"req/s":>8}']
+        for host, s in self.stats().items():
+            lines.append(f'{host:<28}{s["limit"]:>8}{s["inflight"]:>10}{s["ok"]:>8}{s["errors"]:>6}{s["throttled"]:>6}{s["latency_ms"]:>9}{s["base_ms"]:>9}{s["throughput"]:>8}')
+        return '\n'.join(lines)
@@ -0,0 +1,180 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节流式处理管道
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 10:12:36
+LastEditTime : 2026-10-18 10:12:36
+FilePath     : /CODE/xjLib/xt_bqg/pipeline.py
+Github       : https://github.com/sandorn/home
+==============================================================
+抓取 → resp_handle → clean_content → 写文件 的流式管道:
+- 章节按序号连续就绪后立即输出,无需等待整本书下载完毕
+- 有界重排缓冲区,内存占用与书的章节数无关
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+from xthttp import get
+
+from .core import get_contents, get_download_url, normalize_row
+from .stages import save_rows
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+
+class ReorderBuffer:
+    """按序号重排的有界缓冲区
+
+    乱序到达的章节暂存于缓冲区,序号连续后按顺序弹出。
+    仅接收 [next_index, next_index + maxsize) 范围内的序号,保证缓冲区大小有上限。
+
+    示例:
+    >>> buf = ReorderBuffer(start=0, maxsize=4)
+    >>> buf.push(1, 'b')
+    >>> list(buf.pop_ready())
+    []
+    >>> buf.push(0, 'a')
+    >>> list(buf.pop_ready())
+    ['a', 'b']
+    """
+
+    __slots__ = ('_pending', 'maxsize', 'next_index')
+
+    def __init__(self, start: int = 0, maxsize: int = 64):
+        if maxsize < 1:
+            msg = f'maxsize必须大于0,当前为: {maxsize}'
+            raise ValueError(msg)
+        self.next_index = start
+        self.maxsize = maxsize
+        self._pending: dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def accepts(self, index: int) -> bool:
+        """序号是否落在当前窗口内"""
+        return self.next_index <= index < self.next_index + self.maxsize
+
+    def push(self, index: int, item: Any) -> None:
+        """放入一个元素,序号超出窗口时抛出ValueError"""
+        if not self.accepts(index):
+            msg = f'序号{index}超出重排窗口[{self.next_index}, {self.next_index + self.maxsize})'
+            raise ValueError(msg)
+        self._pending[index] = item
+
+    def pop_ready(self) -> Iterator[Any]:
+        """按顺序弹出所有序号连续的元素"""
+        while self.next_index in self._pending:
+            yield self._pending.pop(self.next_index)
+            self.next_index += 1
+
+    def drain(self) -> Iterator[Any]:
+        """按序号弹出剩余全部元素(允许存在空洞)"""
+        for index in sorted(self._pending):
+            yield self._pending.pop(index)
+            self.next_index = index + 1
+
+
+def iter_contents(
+    urls: Iterable[str],
+    *,
+    fn: Callable[..., Any] = get,
+    start: int = 0,
+    max_workers: int = 32,
+    window: int | None = None,
+    handler: Callable[..., Any] = get_contents,
+    store: CheckpointStore | None = None,
+    book: str | None = None,
+    limiter: HostLimiter | None = None,
+) -> Iterator[list]:
+    """并发抓取章节,并按序号顺序逐个产出 [index, title, content]
+
+    同一时刻在途与暂存的章节数不超过 window,首章就绪即可产出。
+
+    Args:
+        urls: 章节链接序列
+        fn: 传给 handler 的请求函数,默认 xthttp.get
+        start: 起始序号
+        max_workers: 线程数
+        window: 重排窗口大小,默认 max_workers * 2
+        handler: 单章处理函数,签名同 get_contents(index, url, fn=...)
+        store: 断点存储,已成功的章节不再抓取,新结果实时写入
+        book: 断点存储中的书籍键
+        limiter: 按主机自适应并发控制,max_workers 此时只是线程数上限
+
+    Yields:
+        list: [index, title, content]
+    """
+    if store is not None and book is None:
+        msg = '使用断点存储时必须指定book'
+        raise ValueError(msg)
+
+    if limiter is not None:
+        fn = limiter.wrap(fn)
+
+    window = window or max_workers * 2
+    buffer = ReorderBuffer(start, window)
+    tasks = enumerate(urls, start)
+    upcoming = next(tasks, None)
+    running: dict[Future, tuple[int, str]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            # 只提交落在重排窗口内的章节,形成背压
+            while upcoming is not None and buffer.accepts(upcoming[0]):
+                index, url = upcoming
+                cached = store.get(book, index) if store is not None else None
+                if cached is not None:
+                    buffer.push(index, cached)
+                else:
+                    running[pool.submit(handler, index, url, fn=fn)] = upcoming
+                upcoming = next(tasks, None)
+
+            yield from buffer.pop_ready()
+
+            if not running:
+                if upcoming is None:
+                    break
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, url = running.pop(future)
+                exc = future.exception()
+                row = normalize_row(index, exc or future.result())
+                if store is not None:
+                    store.put(book, index, url, row)
+                buffer.push(index, row)
+            yield from buffer.pop_ready()
+
+    yield from buffer.drain()
+
+
+def stream_book(url: str, filename: str | None = None, br: str = '\n', **kwargs: Any) -> int:
+    """流式下载整本书,边抓取边写入文件
+
+    Args:
+        url: 书籍目录页链接
+        filename: 输出文件名,默认为 '{bookname}.txt'
+        br: 元素结束标志,与 save_file 一致
+        **kwargs: 透传给 iter_contents;传入 store 时以目录页url作为书籍键,重跑只抓取缺失章节
+
+    Returns:
+        int: 写入的章节数
+    """
+    if kwargs.get('store') is not None:
+        kwargs.setdefault('book', url)
+    bookname, urls, _ = get_download_url(url)
+    return save_rows(filename or f'{bookname}.txt', iter_contents(urls, **kwargs), br=br)
+
+
+if __name__ == '__main__':
+    stream_book('https://www.bigee.cc/book/6909/', max_workers=64)
@@ -0,0 +1,263 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 阅读预读模式: 按阅读位置调整抓取优先级
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 22:05:12
+LastEditTime : 2026-10-18 22:05:12
+FilePath     : /CODE/xjLib/xt_bqg/readahead.py
+Github       : https://github.com/sandorn/home
+==============================================================
+打开一本书时优先抓取读者马上要看的章节,其余章节在后台慢慢补齐:
+- 高优先级: 被 get() 等待的章节 > 当前阅读位置附近 [position - behind, position + ahead] > 前 head 章
+- 低优先级: 其余章节按序号顺序抓取,同时在途数不超过 background,
+  始终为高优先级章节保留空闲线程
+- 阅读位置可在抓取过程中随时通过 seek() 调整,下一次调度即生效
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from xthttp import get
+
+from .core import get_contents, normalize_row
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+
+class ReadAhead:
+    """按阅读位置调度的章节抓取器
+
+    示例用法:
+    >>> bookname, urls, titles = get_download_url(url)
+    >>> reader = ReadAhead(urls, start=1, head=3, ahead=5).start()
+    >>> index, title, content = reader.get(1)  # 首章就绪即返回,不必等整本书
+    >>> reader.seek(20)  # 读者跳到第20章,其附近章节立即提升为高优先级
+    >>> rows = reader.join()  # 等待后台抓完全部章节
+
+    与 xt_QTextBrowser 配合,翻到底部时切换到下一章。界面线程中不要阻塞等待:
+    get(index, timeout=0) 立即返回(未就绪时同时将该章提到最高优先级),先显示占位文字,
+    章节就绪后由 on_ready 在工作线程中发出信号,槽函数在界面线程中刷新:
+    >>> class Reader(xt_QTextBrowser):
+    ...     chapter_ready = pyqtSignal(object)
+    ...
+    ...     def __init__(self, urls):
+    ...         super().__init__()
+    ...         self.index = 0
+    ...         self.chapter_ready.connect(self.show_chapter)
+    ...         self.reader = ReadAhead(urls, on_ready=self.chapter_ready.emit).start()
+    ...
+    ...     def scroll_to_bottom_event(self):
+    ...         self.index += 1
+    ...         self.reader.seek(self.index)
+    ...         row = self.reader.get(self.index, timeout=0)
+    ...         self.setText(row[2] if row else '加载中...')
+    ...
+    ...     def show_chapter(self, row):
+    ...         if row[0] == self.index:
+    ...             self.setText(row[2])
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        *,
+        fn: Callable[..., Any] = get,
+        start: int = 0,
+        head: int = 3,
+        ahead: int = 5,
+        behind: int = 1,
+        max_workers: int = 16,
+        background: int | None = None,
+        store: CheckpointStore | None = None,
+        book: str | None = None,
+        limiter: HostLimiter | None = None,
+        on_ready: Callable[[list], Any] | None = None,
+    ):
+        """
+        Args:
+            urls: 章节链接序列
+            fn: 请求函数
+            start: 起始序号
+            head: 开头优先抓取的章节数
+            ahead: 阅读位置之后优先抓取的章节数
+            behind: 阅读位置之前优先抓取的章节数
+            max_workers: 线程数
+            background: 低优先级章节同时在途数上限,默认 max_workers // 2
+            store: 断点存储,已成功的章节直接可读,新结果实时写入
+            book: 断点存储中的书籍键
+            limiter: 按主机自适应并发控制
+            on_ready: 章节就绪回调,参数为 [index, title, content],在工作线程中调用
+        """
+        if store is not None and book is None:
+            msg = '使用断点存储时必须指定book'
+            raise ValueError(msg)
+
+        self.urls = list(urls)
+        self.start_index = start
+        self.end_index = start + len(self.urls)
+        self.head = head
+        self.ahead = ahead
+        self.behind = behind
+        self.max_workers = max_workers
+        self.background = max(1, max_workers // 2) if background is None else background
+        self.fn = limiter.wrap(fn) if limiter is not None else fn
+        self.store = store
+        self.book = book
+        self.on_ready = on_ready
+        self.position = start
+
+        self._cond = threading.Condition()
+        self._rows: dict[int, list] = {}
+        if store is not None:
+            for row in store.rows(book):
+                if start <= row[0] < self.end_index:
+                    self._rows[row[0]] = row
+        self._pending = set(range(start, self.end_index)) - self._rows.keys()
+        # 低优先级顺序,已被高优先级取走的序号惰性跳过
+        self._order = sorted(self._pending)
+        self._wanted: dict[int, None] = {}  # get() 正在等待的章节,按请求先后
+        self._inflight: dict[int, bool] = {}  # index -> 是否为后台请求
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self.urgent_fetches = 0
+        self.background_fetches = 0
+
+    def __enter__(self) -> ReadAhead:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def _in_range(self, index: int) -> bool:
+        return self.start_index <= index < self.end_index
+
+    def _urgent(self) -> Iterator[int]:
+        """按优先级从高到低产出高优先级章节序号"""
+        yield from self._wanted
+        yield self.position
+        for step in range(1, max(self.ahead, self.behind) + 1):
+            if step <= self.ahead:
+                yield self.position + step
+            if step <= self.behind:
+                yield self.position - step
+        yield from range(self.start_index, min(self.start_index + self.head, self.end_index))
+
+    def _next(self) -> tuple[int, bool] | None:
+        """选出下一个要抓取的章节: (序号, 是否为后台请求),须持有锁"""
+        if len(self._inflight) >= self.max_workers:
+            return None
+        for index in self._urgent():
+            if index in self._pending:
+                return index, False
+        if sum(self._inflight.values()) >= self.background:
+            return None
+        while self._order:
+            index = heapq.heappop(self._order)
+            if index in self._pending:
+                return index, True
+        return None
+
+    def _fetch(self, index: int) -> None:
+        url = self.urls[index - self.start_index]
+        try:
+            row = normalize_row(index, get_contents(index, url, fn=self.fn))
+        except Exception as e:
+            row = normalize_row(index, e)
+        if self.store is not None:
+            self.store.put(self.book, index, url, row)
+        with self._cond:
+            self._rows[index] = row
+            self._inflight.pop(index, None)
+            self._wanted.pop(index, None)
+            self._cond.notify_all()
+        if self.on_ready is not None:
+            self.on_ready(row)
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool, self._cond:
+            while not self._closed and (self._pending or self._inflight):
+                item = self._next()
+                if item is None:
+                    self._cond.wait()
+                    continue
+                index, background = item
+                self._pending.discard(index)
+                self._inflight[index] = background
+                if background:
+                    self.background_fetches += 1
+                else:
+                    self.urgent_fetches += 1
+                pool.submit(self._fetch, index)
+
+    def start(self) -> ReadAhead:
+        """启动后台调度线程,重复调用无副作用"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='xt_bqg-readahead', daemon=True)
+            self._thread.start()
+        return self
+
+    def seek(self, index: int) -> None:
+        """设置当前阅读位置,附近章节提升为高优先级"""
+        with self._cond:
+            self.position = index
+            self._cond.notify_all()
+
+    def get(self, index: int, timeout: float | None = None) -> list | None:
+        """返回 [index, title, content],未就绪时将其提到最高优先级并等待,超时返回None"""
+        if not self._in_range(index):
+            msg = f'章节序号{index}超出范围[{self.start_index}, {self.end_index})'
+            raise IndexError(msg)
+        self.start()
+        with self._cond:
+            if index not in self._rows:
+                self._wanted[index] = None
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: index in self._rows or self._closed, timeout)
+            return self._rows.get(index)
+
+    def ready(self, index: int) -> bool:
+        with self._cond:
+            return index in self._rows
+
+    def progress(self) -> tuple[int, int]:
+        """(已就绪章节数, 总章节数)"""
+        with self._cond:
+            return len(self._rows), len(self.urls)
+
+    def join(self, timeout: float | None = None) -> list[list]:
+        """等待全部章节抓取完毕,返回按序号排序的 [index, title, content] 列表"""
+        self.start()
+        self._thread.join(timeout)
+        with self._cond:
+            return [self._rows[index] for index in sorted(self._rows)]
+
+    def close(self) -> None:
+        """停止调度新的章节,已在途的请求执行完毕后返回"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                'total': len(self.urls),
+                'ready': len(self._rows),
+                'inflight': len(self._inflight),
+                'position': self.position,
+                'urgent_fetches': self.urgent_fetches,
+                'background_fetches': self.background_fetches,
+            }
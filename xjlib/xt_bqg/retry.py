@@ -0,0 +1,268 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 失败章节重试队列与按主机熔断
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 21:20:08
+LastEditTime : 2026-10-18 21:20:08
+FilePath     : /CODE/xjLib/xt_bqg/retry.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 抓取或解析失败的章节按真实序号重新入队,指数退避后重试,其余章节照常抓取
+- 同一主机连续失败达到阈值时熔断,冷却期内暂停向该主机发请求,
+  冷却结束后先放行一个探测请求,成功则恢复
+- 结束时汇总始终未成功的章节
+"""
+
+from __future__ import annotations
+
+import heapq
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from xthttp import get
+
+from .cache import CachedResp
+from .checkpoint import is_failed
+from .core import get_contents, normalize_row
+from .limiter import host_of, resp_ok
+
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
+    from .limiter import HostLimiter
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """重试策略: 第 n 次重试前等待 min(max_delay, base_delay * 2**(n-1)),再乘以 [1 - jitter, 1] 内的随机系数"""
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次尝试失败后的等待秒数"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1)  # noqa: S311  # 仅用于退避抖动,错开重试时刻
+
+
+class CircuitBreaker:
+    """按主机的熔断器(closed → open → half-open → closed)
+
+    示例用法:
+    >>> breaker = CircuitBreaker(threshold=5, cooldown=30)
+    >>> if breaker.retry_after(host) == 0:
+    ...     ok = ...  # 发请求
+    ...     breaker.record(host, ok)
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, probe_interval: float = 0.5):
+        """
+        Args:
+            threshold: 连续失败多少次后熔断
+            cooldown: 熔断持续秒数
+            probe_interval: 探测请求未返回时,其他请求的再次检查间隔
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        # host -> [状态, 连续失败次数, 熔断时刻, 熔断次数]
+        self._hosts: dict[str, list] = {}
+
+    def _get(self, host: str) -> list:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = [self.CLOSED, 0, 0.0, 0]
+        return state
+
+    def retry_after(self, host: str, now: float | None = None) -> float:
+        """允许请求时返回0,否则返回建议等待的秒数"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._get(host)
+            if state[0] == self.CLOSED:
+                return 0.0
+            if state[0] == self.HALF_OPEN:
+                return self.probe_interval
+            remaining = state[2] + self.cooldown - now
+            if remaining > 0:
+                return remaining
+            state[0] = self.HALF_OPEN  # 放行一个探测请求
+            return 0.0
+
+    def record(self, host: str, ok: bool, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._get(host)
+            if ok:
+                state[0], state[1] = self.CLOSED, 0
+                return
+            state[1] += 1
+            if state[0] == self.HALF_OPEN or state[1] >= self.threshold:
+                if state[0] != self.OPEN:
+                    state[3] += 1
+                state[0], state[2] = self.OPEN, now
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            return self._get(host)[0]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {host: {'state': s[0], 'failures': s[1], 'trips': s[3]} for host, s in self._hosts.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class FailedChapter:
+    index: int
+    url: str
+    attempts: int
+    error: str
+
+
+@dataclass(slots=True)
+class RetryResult:
+    """重试抓取的结果"""
+
+    rows: list[list] = field(default_factory=list)  # 按序号排序,包含失败章节的占位行
+    failed: list[FailedChapter] = field(default_factory=list)
+    attempts: int = 0
+    retries: int = 0
+    breakers: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def summary(self) -> dict[str, int]:
+        return {'total': len(self.rows), 'ok': len(self.rows) - len(self.failed), 'failed': len(self.failed), 'attempts': self.attempts, 'retries': self.retries}
+
+    def report(self) -> str:
+        """汇总与始终未成功的章节列表"""
+        s = self.summary()
+        lines = [f'章节: {s["total"]} | 成功: {s["ok"]} | 失败: {s["failed"]} | 请求: {s["attempts"]} | 重试: {s["retries"]}']
+        for host, b in self.breakers.items():
+            if b['trips']:
+                lines.append(f'熔断 {host}: {b["trips"]} 次, 当前 {b["state"]}')
+        if self.failed:
+            lines.append(f'{"index":>7}  {"attempts":>8}  {"url":<48}error')
+            lines.extend(f'{f.index:>7}  {f.attempts:>8}  {f.url:<48}{f.error}' for f in self.failed)
+        return '\n'.join(lines)
+
+
+def crawl_with_retry(
+    urls: Iterable[str],
+    *,
+    fn: Callable[..., Any] = get,
+    start: int = 0,
+    max_workers: int = 32,
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+    store: CheckpointStore | None = None,
+    book: str | None = None,
+    limiter: HostLimiter | None = None,
+    indices: Iterable[int] | None = None,
+) -> RetryResult:
+    """并发抓取章节,失败章节按真实序号指数退避重试,主机连续失败时熔断
+
+    Args:
+        urls: 章节链接序列
+        fn: 请求函数
+        start: 起始序号
+        max_workers: 线程数
+        policy: 重试策略,默认 RetryPolicy()
+        breaker: 熔断器,默认 CircuitBreaker(),可在多次调用间共享
+        store: 断点存储,已成功的章节不再抓取,每次尝试的结果实时写入
+        book: 断点存储中的书籍键
+        limiter: 按主机自适应并发控制
+        indices: 与 urls 一一对应的章节序号,用于只补抓部分章节,提供时忽略 start
+
+    Returns:
+        RetryResult: rows 按序号排序,failed 为重试用尽仍失败的章节
+
+    示例用法:
+    >>> result = crawl_with_retry(urls, start=1, policy=RetryPolicy(max_attempts=4))
+    >>> save_file(f'{bookname}.txt', result.rows)
+    >>> mylog(result.report())
+    """
+    if store is not None and book is None:
+        msg = '使用断点存储时必须指定book'
+        raise ValueError(msg)
+
+    policy = policy or RetryPolicy()
+    breaker = breaker or CircuitBreaker()
+    result = RetryResult()
+    rows: dict[int, list] = {}
+    pairs = zip(indices, urls, strict=True) if indices is not None else enumerate(urls, start)
+    # 堆元素: (可执行时刻, 序号, url, 第几次尝试)
+    queue: list[tuple[float, int, str, int]] = []
+    for index, url in pairs:
+        cached = store.get(book, index) if store is not None else None
+        if cached is not None:
+            rows[index] = cached
+        else:
+            queue.append((0.0, index, url, 1))
+    heapq.heapify(queue)
+
+    def attempt(index: int, url: str) -> tuple[list, bool]:
+        """返回 (结果行, 传输层是否成功),后者用于熔断判断"""
+        transport: list[bool] = []
+
+        def fetch(target: str, *args: Any, **kwargs: Any) -> Any:
+            resp = fn(target, *args, **kwargs)
+            transport.append(isinstance(resp, CachedResp) or resp_ok(resp))
+            return resp
+
+        try:
+            row = get_contents(index, url, fn=fetch, limiter=limiter)
+        except Exception as e:
+            row = normalize_row(index, e)
+        return row, bool(transport) and transport[-1]
+
+    running: dict[Future, tuple[int, str, int]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while queue or running:
+            now = time.monotonic()
+            deferred = []
+            while queue and len(running) < max_workers and queue[0][0] <= now:
+                item = heapq.heappop(queue)
+                wait_s = breaker.retry_after(host_of(item[2]), now)
+                if wait_s > 0:
+                    deferred.append((now + wait_s, *item[1:]))
+                    continue
+                running[pool.submit(attempt, item[1], item[2])] = item[1:]
+                result.attempts += 1
+            for item in deferred:
+                heapq.heappush(queue, item)
+
+            timeout = max(0.0, queue[0][0] - time.monotonic()) if queue and len(running) < max_workers else None
+            if not running:
+                time.sleep(timeout or 0)
+                continue
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, url, tries = running.pop(future)
+                row, transport_ok = future.result()
+                breaker.record(host_of(url), transport_ok)
+                if store is not None:
+                    store.put(book, index, url, row)
+                rows[index] = row
+                if not is_failed(row):
+                    continue
+                if tries < policy.max_attempts:
+                    result.retries += 1
+                    heapq.heappush(queue, (time.monotonic() + policy.delay(tries), index, url, tries + 1))
+                else:
+                    result.failed.append(FailedChapter(index, url, tries, str(row[1])[:200]))
+
+    result.rows = [rows[index] for index in sorted(rows)]
+    result.failed.sort(key=lambda f: f.index)
+    result.breakers = breaker.stats()
+    return result
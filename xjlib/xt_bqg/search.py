@@ -0,0 +1,367 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 已下载书籍的全文倒排索引
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 23:02:15
+LastEditTime : 2026-10-18 23:02:15
+FilePath     : /CODE/xjLib/xt_bqg/search.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 分词: 相邻两个字母/数字/汉字组成一个二元词(CJK bigram),大小写不敏感,标点与空白不入索引
+- 存储: SQLite,每批章节写成一个段,postings(term, seg) → [章节id, 位置数, 位置...],较长时压缩
+- 增量: 新章节只追加新段;同一章内容变化时重新索引,旧记录在查询时过滤,optimize() 时清除
+- 并行: 分词与倒排表构建在进程池中按批执行,主进程只负责写库
+- 查询: 按短语匹配,返回书籍、章节序号与匹配的字符偏移
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import zlib
+from array import array
+from collections import defaultdict, deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from .checkpoint import is_failed
+from .corpus import iter_saved_rows
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id      INTEGER PRIMARY KEY,
+    book    TEXT    NOT NULL,
+    idx     INTEGER NOT NULL,
+    title   TEXT    NOT NULL DEFAULT '',
+    content BLOB    NOT NULL,
+    digest  TEXT    NOT NULL,
+    seg     INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (book, idx)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term    TEXT    NOT NULL,
+    seg     INTEGER NOT NULL,
+    data    BLOB    NOT NULL,
+    PRIMARY KEY (term, seg)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key     TEXT    PRIMARY KEY,
+    value   INTEGER NOT NULL
+);
+"""
+
+# 候选章节按id批量读取,id 列表以 JSON 数组传入
+_DOCS_BY_ID = 'SELECT id, book, idx, title FROM docs WHERE id IN (SELECT value FROM json_each(?)) ORDER BY book, idx'
+_BOOK_DOCS_BY_ID = 'SELECT id, book, idx, title FROM docs WHERE id IN (SELECT value FROM json_each(?)) AND book=? ORDER BY book, idx'
+_ALL_DOCS = 'SELECT id, book, idx, title FROM docs ORDER BY book, idx'
+_BOOK_DOCS = 'SELECT id, book, idx, title FROM docs WHERE book=? ORDER BY book, idx'
+
+
+# 字母/数字/汉字(\w 去掉下划线),前瞻匹配以取得重叠的二元词
+_BIGRAM = re.compile(r'(?=([^\W_]{2}))')
+# 倒排表超过该字节数才压缩,短倒排表压缩得不偿失
+_COMPRESS_MIN = 64
+
+
+def fold_case(text: str) -> str:
+    """保持长度的小写化: 个别字符小写后长度改变(如 'İ' → 'i̇'),保留原字符,使偏移与原文一致"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(low if len(low := ch.lower()) == 1 else ch for ch in text)
+
+
+def bigrams(text: str) -> Iterator[tuple[int, str]]:
+    """产出 (字符偏移, 二元词),两个字符都是字母/数字/汉字时才成词"""
+    for m in _BIGRAM.finditer(fold_case(text)):
+        yield m.start(), m.group(1)
+
+
+def _encode(postings: Iterable[tuple[int, list[int]]]) -> bytes:
+    """[(章节id, 递增位置列表)] → 字节,格式为 uint32 [章节id, 位置数, 位置...],较长时压缩"""
+    buf = array('I')
+    for doc, positions in postings:
+        buf.append(doc)
+        buf.append(len(positions))
+        buf.extend(positions)
+    data = buf.tobytes()
+    return b'z' + zlib.compress(data, 1) if len(data) > _COMPRESS_MIN else b'r' + data
+
+
+def _decode(data: bytes) -> Iterator[tuple[int, list[int]]]:
+    buf = array('I')
+    buf.frombytes(zlib.decompress(data[1:]) if data[:1] == b'z' else data[1:])
+    i, end = 0, len(buf)
+    while i < end:
+        n = buf[i + 1]
+        yield buf[i], buf[i + 2 : i + 2 + n].tolist()
+        i += 2 + n
+
+
+def _index_chunk(docs: list[tuple[int, str]]) -> dict[str, bytes]:
+    """进程池中执行: 把一批 (章节id, 正文) 构建为一个段的倒排表,按词排序以便顺序写入"""
+    terms: dict[str, dict[int, list[int]]] = defaultdict(dict)
+    for doc, text in docs:
+        for m in _BIGRAM.finditer(fold_case(text)):
+            per_doc = terms[m.group(1)]
+            positions = per_doc.get(doc)
+            if positions is None:
+                per_doc[doc] = [m.start()]
+            else:
+                positions.append(m.start())
+    return {term: _encode(terms[term].items()) for term in sorted(terms)}
+
+
+@dataclass(slots=True)
+class SearchHit:
+    book: str
+    index: int
+    title: str
+    offsets: list[int] = field(default_factory=list)  # 短语在正文中的字符偏移
+    snippet: str = ''
+
+
+class SearchIndex:
+    """章节全文索引
+
+    示例用法:
+    >>> with SearchIndex('library.idx') as idx:
+    ...     idx.add_files(glob.glob('books/*.txt'), processes=8)  # save_file 写出的文件
+    ...     idx.add_rows(book_url, new_rows)  # 追加新下载的章节
+    ...     for hit in idx.search('斗气化马'):
+    ...         print(hit.book, hit.index, hit.offsets, hit.snippet)
+    """
+
+    def __init__(self, path: str | os.PathLike = 'xt_bqg_search.db', batch: int = 256):
+        """
+        Args:
+            path: 索引文件
+            batch: 每个段包含的章节数,也是送入进程池的批大小
+        """
+        self.path = str(path)
+        self.batch = batch
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        # seg=0 的章节已登记但倒排表未写入(上次中断),删除后下次会重新索引
+        self._conn.execute('DELETE FROM docs WHERE seg=0')
+        self._seed_doc()
+        self._conn.commit()
+
+    def __enter__(self) -> SearchIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _next_seg(self) -> int:
+        """分配新的段号,须持有锁"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key='seg'").fetchone()
+        seg = (row[0] if row else 0) + 1
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seg', ?)", (seg,))
+        return seg
+
+    def _seed_doc(self) -> None:
+        """旧版索引文件没有章节id计数,以章节表与倒排表中出现过的最大id初始化"""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key='doc'").fetchone() is not None:
+            return
+        doc = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM docs').fetchone()[0]
+        for (data,) in self._conn.execute('SELECT data FROM postings'):
+            doc = max(doc, max(d for d, _ in _decode(data)))
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('doc', ?)", (doc,))
+
+    def _next_doc(self) -> int:
+        """分配新的章节id,已删除章节的id不再复用,否则其残留的倒排项会命中新内容,须持有锁"""
+        doc = self._conn.execute("SELECT value FROM meta WHERE key='doc'").fetchone()[0] + 1
+        self._conn.execute("UPDATE meta SET value=? WHERE key='doc'", (doc,))
+        return doc
+
+    def _register(self, book: str, row: Any) -> tuple[int, str] | None:
+        """登记一章,内容未变时返回None,须持有锁"""
+        index, title, content = int(row[0]), str(row[1]), str(row[2])
+        digest = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+        found = self._conn.execute('SELECT digest FROM docs WHERE book=? AND idx=?', (book, index)).fetchone()
+        if found is not None:
+            if found[0] == digest:
+                return None
+            # 删除旧记录,旧章节id的倒排项在查询时被过滤
+            self._conn.execute('DELETE FROM docs WHERE book=? AND idx=?', (book, index))
+        doc = self._next_doc()
+        self._conn.execute(
+            'INSERT INTO docs (id, book, idx, title, content, digest) VALUES (?, ?, ?, ?, ?, ?)',
+            (doc, book, index, title, zlib.compress(content.encode('utf-8')), digest),
+        )
+        return doc, content
+
+    def _write_segment(self, chunk: list[tuple[int, str]], terms: dict[str, bytes]) -> None:
+        """写入一个段,并与其中章节的段号在同一事务中提交"""
+        with self._lock:
+            seg = self._next_seg()
+            self._conn.executemany('INSERT INTO postings (term, seg, data) VALUES (?, ?, ?)', ((term, seg, data) for term, data in terms.items()))
+            self._conn.executemany('UPDATE docs SET seg=? WHERE id=?', ((seg, doc) for doc, _ in chunk))
+            self._conn.commit()
+
+    def add_books(self, books: Iterable[tuple[str, Iterable[Any]]], processes: int | None = None) -> int:
+        """增量索引多本书的章节,返回新增或更新的章节数
+
+        Args:
+            books: (书籍键, [index, title, content] 序列) 的序列,失败行自动跳过
+            processes: 构建倒排表的进程数,默认 CPU 核数;为 0 时在当前进程中执行
+        """
+        processes = (os.cpu_count() or 1) if processes is None else processes
+
+        def chunks() -> Iterator[list[tuple[int, str]]]:
+            chunk: list[tuple[int, str]] = []
+            for book, rows in books:
+                for row in rows:
+                    if is_failed(row):
+                        continue
+                    with self._lock:
+                        doc = self._register(book, row)
+                    if doc is not None:
+                        chunk.append(doc)
+                    if len(chunk) >= self.batch:
+                        yield chunk
+                        chunk = []
+            if chunk:
+                yield chunk
+
+        count = 0
+        if not processes:
+            for chunk in chunks():
+                self._write_segment(chunk, _index_chunk(chunk))
+                count += len(chunk)
+            return count
+
+        # 有界的在途批次,按提交顺序写段,内存占用与书库大小无关
+        pending: deque[tuple[Future, list]] = deque()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for chunk in chunks():
+                pending.append((pool.submit(_index_chunk, chunk), chunk))
+                while len(pending) >= processes * 2:
+                    future, done = pending.popleft()
+                    self._write_segment(done, future.result())
+                    count += len(done)
+            while pending:
+                future, done = pending.popleft()
+                self._write_segment(done, future.result())
+                count += len(done)
+        return count
+
+    def add_rows(self, book: str, rows: Iterable[Any], processes: int | None = 0) -> int:
+        """增量索引一本书的章节,默认在当前进程中执行,适合边下载边索引"""
+        return self.add_books([(book, rows)], processes=processes)
+
+    def add_files(self, filenames: Iterable[str | os.PathLike], processes: int | None = None) -> int:
+        """索引 save_file / save_rows 写出的书籍文件,书籍键为文件名(不含扩展名)"""
+        return self.add_books(((pathlib.Path(f).stem, iter_saved_rows(f)) for f in filenames), processes=processes)
+
+    def _postings(self, term: str) -> dict[int, list[int]]:
+        """合并一个二元词在全部段中的倒排表,须持有锁"""
+        merged: dict[int, list[int]] = {}
+        for (data,) in self._conn.execute('SELECT data FROM postings WHERE term=? ORDER BY seg', (term,)):
+            merged.update(_decode(data))
+        return merged
+
+    def search(self, phrase: str, book: str | None = None, limit: int = 100, context: int = 20) -> list[SearchHit]:
+        """短语查询,返回按 (书籍, 章节序号) 排序的前 limit 个命中章节
+
+        Args:
+            phrase: 查询短语,大小写不敏感;不含可索引的二元词时(如单字)退化为逐章扫描
+            book: 只在这本书中查找
+            limit: 最多返回的章节数
+            context: 摘要中命中位置前后保留的字符数
+        """
+        phrase = fold_case(phrase)
+        if not phrase:
+            return []
+        grams = list(bigrams(phrase))
+        # 二元词覆盖整个短语时,位置连续即为命中,无需回读正文核对
+        exact = len(grams) == len(phrase) - 1
+        hits: list[SearchHit] = []
+        with self._lock:
+            if grams:
+                candidates = self._candidates(grams)
+                if not candidates:
+                    return []
+                ids = json.dumps(list(candidates))
+                docs = self._conn.execute(_DOCS_BY_ID, (ids,)) if book is None else self._conn.execute(_BOOK_DOCS_BY_ID, (ids, book))
+            else:
+                candidates = {}
+                docs = self._conn.execute(_ALL_DOCS) if book is None else self._conn.execute(_BOOK_DOCS, (book,))
+            docs = docs.fetchall()
+            for doc, doc_book, index, title in docs:
+                content = zlib.decompress(self._conn.execute('SELECT content FROM docs WHERE id=?', (doc,)).fetchone()[0]).decode('utf-8')
+                starts = candidates.get(doc)
+                if starts is None or not exact:
+                    lowered = fold_case(content)
+                    starts = [s for s in (starts if starts is not None else _find_all(lowered, phrase)) if lowered.startswith(phrase, s)]
+                if not starts:
+                    continue
+                first = starts[0]
+                hits.append(SearchHit(doc_book, index, title, starts, content[max(0, first - context) : first + len(phrase) + context]))
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def _candidates(self, grams: list[tuple[int, str]]) -> dict[int, list[int]]:
+        """按二元词倒排表求交,返回 {章节id: 短语起始偏移},须持有锁"""
+        lists = {term: self._postings(term) for term in {term for _, term in grams}}
+        # 从最短的倒排表开始求交
+        ordered = sorted(grams, key=lambda g: len(lists[g[1]]))
+        anchor_offset, anchor = ordered[0]
+        docs = set(lists[anchor])
+        for _, term in ordered[1:]:
+            docs &= lists[term].keys()
+            if not docs:
+                return {}
+        result: dict[int, list[int]] = {}
+        for doc in docs:
+            # 短语起点 start 处,偏移 offset 的二元词位于 anchor位置 + (offset - anchor_offset)
+            checks = [(offset - anchor_offset, set(lists[term][doc])) for offset, term in ordered[1:]]
+            starts = [pos - anchor_offset for pos in lists[anchor][doc] if all(pos + delta in positions for delta, positions in checks)]
+            if starts:
+                result[doc] = starts
+        return result
+
+    def optimize(self) -> None:
+        """合并全部段并清除已删除章节的倒排项"""
+        with self._lock:
+            live = {doc for (doc,) in self._conn.execute('SELECT id FROM docs')}
+            terms = [term for (term,) in self._conn.execute('SELECT DISTINCT term FROM postings')]
+            seg = self._next_seg()
+            for term in terms:
+                merged = sorted((doc, positions) for doc, positions in self._postings(term).items() if doc in live)
+                self._conn.execute('DELETE FROM postings WHERE term=?', (term,))
+                if merged:
+                    self._conn.execute('INSERT INTO postings (term, seg, data) VALUES (?, ?, ?)', (term, seg, _encode(merged)))
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            docs, books = self._conn.execute('SELECT COUNT(*), COUNT(DISTINCT book) FROM docs').fetchone()
+            terms, segs = self._conn.execute('SELECT COUNT(DISTINCT term), COUNT(DISTINCT seg) FROM postings').fetchone()
+        return {'books': books, 'chapters': docs, 'terms': terms, 'segments': segs}
+
+
+def _find_all(text: str, phrase: str) -> Iterator[int]:
+    start = text.find(phrase)
+    while start != -1:
+        yield start
+        start = text.find(phrase, start + 1)
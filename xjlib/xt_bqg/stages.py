@@ -0,0 +1,199 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节处理各阶段耗时统计
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 20:31:55
+LastEditTime : 2026-10-18 20:31:55
+FilePath     : /CODE/xjLib/xt_bqg/stages.py
+Github       : https://github.com/sandorn/home
+==============================================================
+按阶段累计调用次数、总耗时、最大耗时与对数直方图:
+- get_contents: 单章总耗时(含 fetch 与 resp_handle)
+- fetch: 网络请求
+- resp_handle: 解析 + 清洗(含 clean_content)
+- clean_content: 正则清洗
+- resps_handle / sort: 批量解析与排序
+- write: 写文件,流式写入时扣除等待上游产出的时间
+每次记录只有两次计时与一次加锁,默认开启;STAGES.enabled = False 可关闭。
+进程池(crawl_hybrid、run_custom_process)子进程中的耗时不会汇总到主进程。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from functools import wraps
+from typing import Any
+
+from xt_utils.files import save_iter
+
+# 直方图第 i 格为 [2**(i-1), 2**i) 微秒,最后一格收纳更长的耗时(约134秒以上)
+_BUCKETS = 28
+
+
+class StageStats:
+    """单个阶段的累计数据"""
+
+    __slots__ = ('buckets', 'count', 'max_ns', 'total_ns')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[min((elapsed_ns // 1000).bit_length(), _BUCKETS - 1)] += 1
+
+    def percentile(self, p: float) -> float:
+        """由直方图估算百分位(取所在格的上界,不超过最大值),单位毫秒"""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(2**i / 1000, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_s': round(self.total_ns / 1e9, 4),
+            'avg_ms': round(self.total_ns / self.count / 1e6, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_ns / 1e6, 3),
+            'histogram_us': {f'<{2**i}': n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class _Span:
+    """stage() 返回的计时上下文"""
+
+    __slots__ = ('name', 'start', 'timer')
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> _Span:
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.timer.record(self.name, time.perf_counter_ns() - self.start)
+
+
+class _ProducerClock:
+    """包装可迭代对象,累计等待上游产出元素的时间"""
+
+    __slots__ = ('_it', 'ns')
+
+    def __init__(self, iterable: Iterable[Any]):
+        self._it = iter(iterable)
+        self.ns = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        start = time.perf_counter_ns()
+        try:
+            return next(self._it)
+        finally:
+            self.ns += time.perf_counter_ns() - start
+
+
+class StageTimer:
+    """各阶段耗时汇总,线程安全
+
+    示例用法:
+    >>> texts = list(iter_contents(urls))
+    >>> mylog(STAGES.report())
+    >>> STAGES.dump('stages.json')
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: dict[str, StageStats] = {}
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.add(elapsed_ns)
+
+    def stage(self, name: str) -> _Span:
+        """计时上下文: with STAGES.stage('fetch'): ..."""
+        return _Span(self, name)
+
+    def timed(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """计时装饰器,关闭统计时只多一次属性判断"""
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter_ns() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._stages.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def report(self) -> str:
+        """以表格形式返回各阶段统计"""
+        lines = [f'{"stage":<16}{"count":>8}{"total_s":>10}{"avg_ms":>10}{"p50_ms":>10}{"p95_ms":>10}{"p99_ms":>10}{"max_ms":>10}']
+        for name, s in self.snapshot().items():
+            lines.append(f'{name:<16}{s["count"]:>8}{s["total_s"]:>10}{s["avg_ms"]:>10}{s["p50_ms"]:>10}{s["p95_ms"]:>10}{s["p99_ms"]:>10}{s["max_ms"]:>10}')
+        return '\n'.join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def dump(self, path: str | os.PathLike) -> None:
+        """统计结果写入JSON文件"""
+        pathlib.Path(path).write_text(self.to_json(), encoding='utf-8')
+
+
+STAGES = StageTimer()
+stage = STAGES.stage
+timed = STAGES.timed
+
+
+def save_rows(filename: str | os.PathLike, rows: Iterable[Any], br: str = '\n', append: bool = False, header: str | None = None) -> int:
+    """save_iter 并记录 write 阶段耗时,流式输入时扣除等待上游的时间"""
+    clock = _ProducerClock(rows)
+    start = time.perf_counter_ns()
+    count = save_iter(filename, clock, br=br, append=append, header=header)
+    STAGES.record('write', time.perf_counter_ns() - start - clock.ns)
+    return count
@@ -0,0 +1,273 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 目录快照与增量更新
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 19:41:12
+LastEditTime : 2026-10-18 19:41:12
+FilePath     : /CODE/xjLib/xt_bqg/toc.py
+Github       : https://github.com/sandorn/home
+==============================================================
+保存每本书上次的目录(章节url + 标题指纹),再次运行时与最新目录比对:
+- added: 新增章节
+- removed: 已从目录中移除的章节
+- retitled: url不变但标题变化的章节(通常是作者修订)
+只抓取 added + retitled;新章节都在末尾时追加到已有输出文件,
+否则按最新目录顺序重写文件,改标题的章节原位替换。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from xthttp import get
+
+from .checkpoint import is_failed
+from .core import get_download_url
+from .corpus import iter_saved_rows
+from .pipeline import iter_contents
+from .stages import save_rows
+from .urls import normalize_url
+
+if TYPE_CHECKING:
+    from .limiter import HostLimiter
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS toc (
+    book    TEXT    NOT NULL,
+    key     TEXT    NOT NULL,
+    idx     INTEGER NOT NULL,
+    url     TEXT    NOT NULL,
+    title   TEXT    NOT NULL,
+    fp      TEXT    NOT NULL,
+    updated REAL    NOT NULL,
+    PRIMARY KEY (book, key)
+)
+"""
+
+
+def title_fingerprint(title: str) -> str:
+    """标题指纹,忽略全部空白字符"""
+    return hashlib.blake2b(''.join(str(title).split()).encode('utf-8'), digest_size=8).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class TocEntry:
+    index: int
+    url: str
+    title: str
+    fp: str
+
+
+@dataclass(slots=True)
+class TocDiff:
+    """两次目录之间的差异,各列表均按章节序号排序"""
+
+    added: list[TocEntry] = field(default_factory=list)
+    removed: list[TocEntry] = field(default_factory=list)
+    retitled: list[tuple[TocEntry, TocEntry]] = field(default_factory=list)  # (旧, 新)
+    total: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.retitled)
+
+    @property
+    def changed(self) -> list[TocEntry]:
+        """需要抓取的章节: 新增 + 改标题(取新目录中的条目)"""
+        return sorted(self.added + [new for _, new in self.retitled], key=lambda e: e.index)
+
+    def summary(self) -> dict[str, int]:
+        return {'total': self.total, 'added': len(self.added), 'removed': len(self.removed), 'retitled': len(self.retitled)}
+
+
+def build_toc(urls: Iterable[str], titles: Iterable[str], start: int = 0) -> dict[str, TocEntry]:
+    """由 get_download_url 的结果构造目录,以规范化url为键,重复url保留首次出现"""
+    toc: dict[str, TocEntry] = {}
+    for index, (url, title) in enumerate(zip(urls, titles, strict=False), start):
+        toc.setdefault(normalize_url(url), TocEntry(index, url, title, title_fingerprint(title)))
+    return toc
+
+
+def diff_toc(old: dict[str, TocEntry], new: dict[str, TocEntry]) -> TocDiff:
+    """比对新旧目录"""
+    diff = TocDiff(total=len(new))
+    for key, entry in new.items():
+        prev = old.get(key)
+        if prev is None:
+            diff.added.append(entry)
+        elif prev.fp != entry.fp:
+            diff.retitled.append((prev, entry))
+    diff.removed = [entry for key, entry in old.items() if key not in new]
+    diff.added.sort(key=lambda e: e.index)
+    diff.removed.sort(key=lambda e: e.index)
+    diff.retitled.sort(key=lambda pair: pair[1].index)
+    return diff
+
+
+class TocStore:
+    """目录快照存储(SQLite单文件),线程安全
+
+    示例用法:
+    >>> with TocStore('toc.db') as store:
+    ...     diff = store.diff(book_url, build_toc(urls, titles))
+    ...     ...  # 抓取 diff.changed
+    ...     store.save(book_url, build_toc(urls, titles))
+    """
+
+    def __init__(self, path: str | os.PathLike = 'xt_bqg_toc.db'):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> TocStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def load(self, book: str) -> dict[str, TocEntry]:
+        """上次保存的目录,不存在时返回空字典"""
+        with self._lock:
+            records = self._conn.execute('SELECT key, idx, url, title, fp FROM toc WHERE book=?', (book,)).fetchall()
+        return {key: TocEntry(idx, url, title, fp) for key, idx, url, title, fp in records}
+
+    def save(self, book: str, toc: dict[str, TocEntry]) -> None:
+        """用新目录整体替换快照"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('DELETE FROM toc WHERE book=?', (book,))
+            self._conn.executemany(
+                'INSERT INTO toc (book, key, idx, url, title, fp, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(book, key, e.index, e.url, e.title, e.fp, now) for key, e in toc.items()],
+            )
+            self._conn.commit()
+
+    def diff(self, book: str, toc: dict[str, TocEntry]) -> TocDiff:
+        return diff_toc(self.load(book), toc)
+
+    def books(self) -> list[str]:
+        with self._lock:
+            return [book for (book,) in self._conn.execute('SELECT DISTINCT book FROM toc')]
+
+    def clear(self, book: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM toc WHERE book=?', (book,))
+            self._conn.commit()
+
+
+def _needs_rewrite(old: dict[str, TocEntry], new: dict[str, TocEntry], diff: TocDiff) -> bool:
+    """已有文件能否直接追加: 无改标题章节、已有章节序号不变且新增章节都在末尾"""
+    if not old:
+        return False
+    if diff.retitled:
+        return True
+    if any(old[key].index != entry.index for key, entry in new.items() if key in old):
+        return True
+    return bool(diff.added) and diff.added[0].index < max(entry.index for entry in old.values())
+
+
+def _merge_rows(filename: str, old: dict[str, TocEntry], new: dict[str, TocEntry], fresh: dict[str, list], br: str) -> Iterator[list]:
+    """按最新目录顺序合并已有文件中的章节与新抓取的章节,文件中的章节经旧快照按规范化url匹配"""
+    old_keys = {entry.index: key for key, entry in old.items()}
+    saved = {}
+    if pathlib.Path(filename).exists():
+        for row in iter_saved_rows(filename, br):
+            key = old_keys.get(row[0])
+            if key in new and key not in fresh:
+                saved[key] = row
+    for key, entry in sorted(new.items(), key=lambda item: item[1].index):
+        row = fresh.get(key) or saved.get(key)
+        if row is not None:
+            yield [entry.index, row[1], row[2]]
+
+
+def update_book(
+    url: str,
+    filename: str | os.PathLike | None = None,
+    *,
+    store: TocStore,
+    fn: Callable[..., Any] = get,
+    start: int = 0,
+    br: str = '\n',
+    max_workers: int = 32,
+    limiter: HostLimiter | None = None,
+) -> TocDiff:
+    """增量更新一本书: 只抓取新增与改标题的章节并写入已有输出文件
+
+    首次运行(无快照)时全部章节都算新增,等同于完整下载。
+    抓取失败的章节不写入文件、不记入快照,下次运行仍会出现在 diff 中重新抓取。
+    新增章节都在已有章节之后时直接追加;有改标题章节、补抓此前失败的章节或目录中间插入章节时,
+    文件按最新目录顺序重写(先写临时文件再替换),改标题的章节原位替换,已移出目录的章节不再保留,
+    此时 br 只能为换行符。
+
+    Args:
+        url: 书籍目录页链接,同时作为快照中的书籍键
+        filename: 输出文件名,默认为 '{bookname}.txt'
+        store: 目录快照存储
+        fn: 请求函数
+        start: 章节起始序号,应与首次下载时一致
+        br: 元素结束标志,与 save_file 一致
+        max_workers: 抓取线程数
+        limiter: 按主机自适应并发控制
+
+    Returns:
+        TocDiff: 本次比对结果
+    """
+    bookname, urls, titles = get_download_url(url, fn=fn)
+    new = build_toc(urls, titles, start)
+    old = store.load(url)
+    diff = diff_toc(old, new)
+    todo = diff.changed
+    filename = str(filename or f'{bookname}.txt')
+    rewrite = bool(todo) and _needs_rewrite(old, new, diff) and pathlib.Path(filename).exists()
+    if rewrite and br != '\n':
+        msg = '需要按目录顺序重写文件时 br 只能为换行符'
+        raise ValueError(msg)
+
+    failed: set[int] = set()
+    keys = {entry.index: key for key, entry in new.items()}
+
+    def rows() -> Iterable[list]:
+        # iter_contents 的序号是 todo 中的位置,回填为章节真实序号
+        for row in iter_contents([e.url for e in todo], fn=fn, max_workers=max_workers, limiter=limiter):
+            entry = todo[row[0]]
+            row[0] = entry.index
+            if is_failed(row):
+                failed.add(entry.index)
+                continue
+            yield row
+
+    if rewrite:
+        fresh = {keys[row[0]]: row for row in rows()}
+        temp = pathlib.Path(f'{filename}.tmp')
+        save_rows(temp, _merge_rows(filename, old, new, fresh, br), br=br, header=filename)
+        temp.replace(filename)
+    elif todo:
+        save_rows(filename, rows(), br=br, append=bool(old))
+
+    # 失败的新增章节不入快照,失败的改标题章节保留旧指纹
+    snapshot = {}
+    for key, entry in new.items():
+        if entry.index not in failed:
+            snapshot[key] = entry
+        elif key in old:
+            snapshot[key] = old[key]
+    store.save(url, snapshot)
+    return diff
@@ -0,0 +1,256 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 抓取过程录制与回放
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 23:40:26
+LastEditTime : 2026-10-18 23:40:26
+FilePath     : /CODE/xjLib/xt_bqg/trace.py
+Github       : https://github.com/sandorn/home
+==============================================================
+- 录制: TraceRecorder 包装请求函数,每个请求的 url、状态码、响应头、正文与耗时写入 gzip 压缩的 JSONL
+- 回放: TraceReplayer 作为请求函数按url返回录制的响应(CachedResp),可按录制耗时或最快速度返回
+- replay_trace() 按录制顺序把章节页响应送入 resp_handle / clean_content,无需网络即可剖析与回归测试解析清洗部分;
+  目录页(其地址是录制中其他url的上级目录)不参与回放
+
+用法:
+    python -m xt_bqg.trace replay trace.jsonl.gz [--speed 1.0] [--rounds 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from xthttp import UnifiedResp, get
+from xtlog import mylog
+
+from .cache import CachedResp, resp_text
+from .core import normalize_row, resp_handle
+from .limiter import resp_status
+from .stages import STAGES
+from .urls import normalize_url
+
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    """录制请求,可直接作为 get_contents / get_download_url / iter_contents 的 fn 参数
+
+    示例用法:
+    >>> with TraceRecorder('bigee.jsonl.gz') as recorder:
+    ...     bookname, urls, _ = get_download_url(url, fn=recorder)
+    ...     rows = list(iter_contents(urls, fn=recorder))
+    """
+
+    def __init__(self, path: str | os.PathLike, fn: Callable[..., Any] = get, level: int = 6, flush_every: int = 1):
+        """
+        Args:
+            path: 录制文件,已存在时追加
+            fn: 实际的请求函数
+            level: gzip 压缩级别
+            flush_every: 每写入多少条记录把压缩缓冲刷入文件,进程崩溃时最多丢失这么多条;
+                每次刷新都会稍微降低压缩率
+        """
+        self.path = str(path)
+        self.fn = fn
+        self.count = 0
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self._lock = threading.Lock()
+        # 录制器持有文件句柄直到 close(),不能用 with 包裹
+        self._file = gzip.open(self.path, 'at', encoding='utf-8', compresslevel=level)  # noqa: SIM115
+        self._start = time.monotonic()
+        self._write({'trace': TRACE_VERSION, 'created': time.time()})
+        self.__wrapped__ = fn
+
+    def __enter__(self) -> TraceRecorder:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                # 文本层与 zlib 缓冲一并刷出,已写入的记录可被 iter_trace 读回
+                self._file.flush()
+                self._pending = 0
+
+    def __call__(self, url: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.count += 1
+        start = time.monotonic()
+        record: dict[str, Any] = {'t': round(start - self._start, 6), 'url': url}
+        try:
+            resp = self.fn(url, *args, **kwargs)
+        except Exception as e:
+            record.update(elapsed=round(time.monotonic() - start, 6), error=repr(e), raised=True)
+            self._write(record)
+            raise
+        record['elapsed'] = round(time.monotonic() - start, 6)
+        if isinstance(resp, UnifiedResp | CachedResp):
+            headers = dict(getattr(resp, 'headers', None) or {})
+            record.update(status=resp_status(resp) or 200, headers={str(k): str(v) for k, v in headers.items()}, body=resp_text(resp))
+        else:
+            # 请求函数以返回值表示失败(异常对象、None 等)
+            record.update(error=repr(resp), raised=False)
+        self._write(record)
+        return resp
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def iter_trace(path: str | os.PathLike) -> Iterator[dict[str, Any]]:
+    """按录制顺序产出请求记录,录制中断导致的残缺结尾会被忽略"""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        try:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    return
+                if 'url' in record:
+                    yield record
+        except EOFError:
+            return
+
+
+def to_resp(record: dict[str, Any], index: int = 0) -> Any:
+    """把录制记录还原为响应;录制时的失败还原为 RuntimeError,raised=True 时抛出"""
+    if 'error' in record:
+        error = RuntimeError(record['error'])
+        if record.get('raised'):
+            raise error
+        return error
+    return CachedResp(record['url'], record['body'], record.get('status', 200), record.get('headers'), index=index)
+
+
+class TraceReplayer:
+    """按url返回录制的响应,可直接作为请求函数使用
+
+    同一url录制了多次时按录制顺序依次返回,用完后重复最后一次。
+
+    示例用法:
+    >>> fetch = TraceReplayer('bigee.jsonl.gz', speed=1.0)  # 按录制耗时返回
+    >>> bookname, urls, _ = get_download_url(url, fn=fetch)
+    >>> rows = list(iter_contents(urls, fn=fetch))
+    """
+
+    def __init__(self, path: str | os.PathLike, speed: float | None = None, strict: bool = True):
+        """
+        Args:
+            path: 录制文件
+            speed: 回放速度倍数,1.0 为录制时的耗时,None 为不等待
+            strict: url 不在录制中时抛出 KeyError,否则返回 RuntimeError 对象
+        """
+        self.speed = speed
+        self.strict = strict
+        self.records = list(iter_trace(path))
+        self._lock = threading.Lock()
+        self._by_url: dict[str, deque[dict[str, Any]]] = {}
+        for record in self.records:
+            self._by_url.setdefault(normalize_url(record['url']), deque()).append(record)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __call__(self, url: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            queue = self._by_url.get(normalize_url(url))
+            if not queue:
+                self.misses += 1
+                record = None
+            else:
+                self.hits += 1
+                record = queue.popleft() if len(queue) > 1 else queue[0]
+        if record is None:
+            if self.strict:
+                msg = f'录制中没有该url: {url}'
+                raise KeyError(msg)
+            return RuntimeError(f'录制中没有该url: {url}')
+        if self.speed:
+            time.sleep(record['elapsed'] / self.speed)
+        return to_resp(record)
+
+
+def toc_urls(path: str | os.PathLike) -> set[str]:
+    """录制中的目录页(规范化url): 是其他录制url的上级目录"""
+    urls = {normalize_url(record['url']) for record in iter_trace(path)}
+    found = set()
+    for url in urls:
+        parent = url
+        while (cut := parent.rfind('/', 0, len(parent) - 1)) > 0:
+            parent = parent[: cut + 1]
+            if parent in urls:
+                found.add(parent)
+    return found
+
+
+def replay_trace(path: str | os.PathLike, speed: float | None = None, handler: Callable[[Any], Any] = resp_handle) -> Iterator[list]:
+    """按录制顺序把章节页响应送入 handler(默认 resp_handle,含 clean_content),产出 [序号, title, content]
+
+    目录页(见 toc_urls)不是章节,跳过;序号按章节页计数。
+
+    Args:
+        path: 录制文件
+        speed: 按录制时的请求发起时刻回放的速度倍数,None 为最快速度
+        handler: 单个响应的处理函数
+    """
+    tocs = toc_urls(path)
+    chapters = (record for record in iter_trace(path) if normalize_url(record['url']) not in tocs)
+    start = time.monotonic()
+    for index, record in enumerate(chapters):
+        if speed:
+            delay = (record['t'] + record['elapsed']) / speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        try:
+            row = handler(to_resp(record, index))
+        except Exception as e:
+            row = e
+        yield normalize_row(index, row)
+
+
+def profile_trace(path: str | os.PathLike, rounds: int = 1, speed: float | None = None) -> str:
+    """多轮回放录制文件,返回各阶段耗时汇总(STAGES.report)"""
+    STAGES.reset()
+    start = time.perf_counter()
+    count = 0
+    for _ in range(rounds):
+        count += sum(1 for _ in replay_trace(path, speed=speed))
+    elapsed = time.perf_counter() - start
+    return f'回放 {count} 个响应,耗时 {elapsed:.2f}s,{count / elapsed:.0f} 个/秒\n{STAGES.report()}'
+
+
+def _main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog='python -m xt_bqg.trace')
+    sub = parser.add_subparsers(dest='command', required=True)
+    play = sub.add_parser('replay', help='回放录制文件并输出各阶段耗时')
+    play.add_argument('path')
+    play.add_argument('--speed', type=float, default=None, help='按录制时刻回放的速度倍数,默认最快速度')
+    play.add_argument('--rounds', type=int, default=1)
+    args = parser.parse_args(argv)
+    mylog(profile_trace(args.path, rounds=args.rounds, speed=args.speed))
+
+
+if __name__ == '__main__':
+    _main(sys.argv[1:])
@@ -0,0 +1,182 @@
+# !/usr/bin/env python
+"""
+==============================================================
+Description  : 章节链接规范化
+Develop      : VSCode
+Author       : sandorn sandorn@live.cn
+Date         : 2026-10-18 14:48:52
+LastEditTime : 2026-10-18 14:48:52
+FilePath     : /CODE/xjLib/xt_bqg/urls.py
+Github       : https://github.com/sandorn/home
+==============================================================
+目录页章节链接的规范化与去重:
+- 相对链接按目录页地址补全后规范化,同一章节的不同写法得到同一url
+- "最新章节"区块与完整目录重复列出的章节只保留在完整目录中的位置(最后一次出现)
+- 标题近似重复(仅空白、标点、括号附注或数字写法不同)的章节单独报告,可选择丢弃
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from xt_utils.strings import duplicate
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 括号内的附注,如 （求月票）、【二合一】、(上架感言)
+_TITLE_NOTE = re.compile(r'[(\[【〔][^)\]】〕]*[)\]】〕]')
+_CHAPTER_NO = re.compile(r'第([零〇一二两三四五六七八九十百千万\d]+)[章节回卷集]')
+_NON_WORD = re.compile(r'[\W_]+')
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_UNITS = {'十': 10, '百': 100, '千': 1000, '万': 10000}
+
+
+def normalize_url(url: str) -> str:
+    """规范化url,作为缓存与去重的键
+
+    - scheme、主机名转小写,去掉默认端口
+    - 去掉片段(#...),查询参数按键排序
+    - 空路径补为 '/'
+
+    Examples:
+        >>> normalize_url('HTTPS://www.Bigee.cc:443/book/6909/1.html?b=2&a=1#top')
+        'https://www.bigee.cc/book/6909/1.html?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def chapter_urls(base: str, hrefs: Iterable[str]) -> list[str]:
+    """按目录页地址补全章节链接(urljoin)并规范化"""
+    return [normalize_url(urljoin(base, href.strip())) for href in hrefs]
+
+
+def cn_number(text: str) -> int:
+    """中文或阿拉伯数字转整数,如 '一千零二十三' → 1023, '十五' → 15"""
+    if text.isdigit():
+        return int(text)
+    total = section = digit = 0
+    for char in text:
+        if char.isdigit():
+            digit = digit * 10 + int(char)
+        elif char in _CN_DIGITS:
+            digit = _CN_DIGITS[char]
+        elif char == '万':
+            total += (section + digit) * 10000
+            section = digit = 0
+        else:
+            section += (digit or 1) * _CN_UNITS[char]
+            digit = 0
+    return total + section + digit
+
+
+def title_key(title: str) -> str:
+    """近似重复比较用的标题键
+
+    全角转半角、小写,去掉括号附注、空白与标点,章节号统一为阿拉伯数字:
+    >>> title_key('第十二章  风起（求月票）') == title_key('第12章 风起!')
+    True
+    """
+    text = _TITLE_NOTE.sub('', unicodedata.normalize('NFKC', str(title))).lower()
+    text = _CHAPTER_NO.sub(lambda m: f'第{cn_number(m.group(1))}章', text)
+    return _NON_WORD.sub('', text)
+
+
+@dataclass(slots=True)
+class DedupResult:
+    """目录去重结果,dropped / similar 中的序号均为去重前的位置"""
+
+    urls: list[str] = field(default_factory=list)
+    titles: list[str] = field(default_factory=list)
+    dropped: list[int] = field(default_factory=list)  # url重复而丢弃的位置
+    similar: list[tuple[int, int]] = field(default_factory=list)  # (较早, 较晚) 标题近似重复的位置
+    dropped_similar: list[int] = field(default_factory=list)  # drop_similar=True 时因标题近似而丢弃的位置
+
+    @property
+    def saved(self) -> int:
+        """省下的章节请求数"""
+        return len(self.dropped) + len(self.dropped_similar)
+
+
+def dedup_toc(urls: Iterable[str], titles: Iterable[str], drop_similar: bool = False) -> DedupResult:
+    """章节链接去重,保持顺序
+
+    同一规范化url出现多次时保留最后一次(完整目录中的位置);
+    不同url但标题近似的章节记入 similar,drop_similar=True 时同样只保留最后一个。
+
+    Args:
+        urls: 已补全的章节链接
+        titles: 与 urls 一一对应的标题
+        drop_similar: 是否丢弃标题近似重复的章节
+    """
+    urls, titles = list(urls), list(titles)
+    titles += [''] * (len(urls) - len(titles))
+    canonical = [normalize_url(url) for url in urls]
+    kept = duplicate(range(len(urls)), key=lambda i: canonical[i], reverse=True)
+    result = DedupResult(dropped=sorted(set(range(len(urls))) - set(kept)))
+
+    latest: dict[str, int] = {}
+    for i in reversed(kept):
+        key = title_key(titles[i])
+        if not key:
+            continue
+        if key in latest:
+            result.similar.append((i, latest[key]))
+            if drop_similar:
+                result.dropped_similar.append(i)
+        else:
+            latest[key] = i
+    result.similar.reverse()
+    result.dropped_similar.reverse()
+
+    skip = set(result.dropped_similar)
+    result.urls = [canonical[i] for i in kept if i not in skip]
+    result.titles = [titles[i] for i in kept if i not in skip]
+    DEDUP_STATS.record(len(urls), result)
+    return result
+
+
+class DedupStats:
+    """累计目录去重效果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.chapters = 0
+        self.dropped = 0
+        self.similar = 0
+        self.saved = 0
+
+    def record(self, chapters: int, result: DedupResult) -> None:
+        with self._lock:
+            self.pages += 1
+            self.chapters += chapters
+            self.dropped += len(result.dropped)
+            self.similar += len(result.similar)
+            self.saved += result.saved
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {'pages': self.pages, 'chapters': self.chapters, 'dropped': self.dropped, 'similar': self.similar, 'saved': self.saved}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.pages = self.chapters = self.dropped = self.similar = self.saved = 0
+
+
+DEDUP_STATS = DedupStats()
+
+
+def dedup_report() -> str:
+    """目录去重汇总"""
+    s = DEDUP_STATS.snapshot()
+    return f'目录页: {s["pages"]} | 章节链接: {s["chapters"]} | 重复链接: {s["dropped"]} | 近似标题: {s["similar"]} | 节省请求: {s["saved"]}'
@@ -15,6 +15,7 @@ from __future__ import annotations
 import os
 import pathlib
 import winreg
+from collections.abc import Iterable
 from typing import Any
 
 from xtlog import mylog as log
@@ -226,6 +227,79 @@ def save_file(filename: str | os.PathLike, data: Any, br: str = '\n') -> None:
         raise OSError(msg) from e
 
 
+def save_iter(
+    filename: str | os.PathLike,
+    data: Iterable[Any],
+    br: str = '\n',
+    append: bool = False,
+    header: str | None = None,
+) -> int:
+    """
+    流式写入文件，逐个消费可迭代对象，输出格式与 save_file 写入列表时一致
+
+    追加写入时先去掉上次写入的结尾 br，写完后再补上，分批追加的结果与一次写入完全相同。
+
+    Args:
+        filename: 文件名
+        data: 可迭代对象，每个元素可以是字符串、列表或元组
+        br: 元素结束标志，默认为换行符"\n"
+        append: 追加到已有文件末尾，文件已存在时不再写入首行
+        header: 首行内容，默认为文件名
+
+    Returns:
+        int: 写入的元素个数
+
+    Raises:
+        IOError: 当写入文件失败时
+    """
+    directory = pathlib.Path(filename).parent
+    if directory and not pathlib.Path(directory).exists():
+        pathlib.Path(directory).mkdir(exist_ok=True, parents=True)
+
+    count = 0
+    append = append and pathlib.Path(filename).exists()
+    try:
+        if append:
+            _strip_closing(filename, br)
+        with pathlib.Path(filename).open('a' if append else 'w', encoding='utf-8') as file:
+            if not append:
+                file.write((str(filename) if header is None else header) + br)
+
+            def _write_nested(data_item: Any) -> None:
+                """递归写入嵌套的数据结构"""
+                if isinstance(data_item, (list, tuple)):
+                    for item in data_item:
+                        _write_nested(item)
+                    file.write(br)
+                else:
+                    file.write(str(data_item) + br)
+
+            for item in data:
+                _write_nested(item)
+                count += 1
+            file.write(br)  # 与 save_file 写入列表时的结尾保持一致
+
+        size = f'size: {FileSize(filename)}'
+        log(f'[{filename}]保存完成,\t共{count}项,\tfile {size}。')
+
+    except OSError as e:
+        msg = f'写入文件失败: {filename}, 错误: {e}'
+        raise OSError(msg) from e
+
+    return count
+
+
+def _strip_closing(filename: str | os.PathLike, br: str) -> None:
+    """去掉 save_file / save_iter 写入的结尾 br，以便继续追加"""
+    closing = br.encode('utf-8')
+    with pathlib.Path(filename).open('rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        if closing and size >= len(closing):
+            file.seek(size - len(closing))
+            if file.read() == closing:
+                file.truncate(size - len(closing))
+
+
 def read_file(filepath: str | os.PathLike, encoding: str = 'utf-8') -> str:
     """
     读取整个文件内容
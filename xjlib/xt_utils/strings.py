@@ -15,13 +15,18 @@ from __future__ import annotations
 
 import base64
 import hashlib
+import heapq
 import json
 import os
 import random
 import re
 import string
-from collections.abc import Callable, Iterable, Sequence
-from functools import reduce
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial, reduce
+from itertools import islice
 from re import Pattern
 from typing import Any, Literal
 
@@ -338,7 +343,11 @@ def remove_all_blank(value: str, keep_blank: bool = True, custom_invisible: Patt
     return ''.join([ch for ch in value if ch.isprintable() and (keep_blank or ch not in whitespace_set)])
 
 
-def str_replace(replacement: str, trims: Sequence[tuple[str, str]], implementation: Literal['loop', 'reduce'] = 'reduce') -> str:
+def str_replace(
+    replacement: str,
+    trims: Sequence[tuple[str, str]],
+    implementation: Literal['loop', 'reduce', 'automaton', 'longest'] = 'reduce',
+) -> str:
     """执行多组字符串替换操作。
 
     Args:
@@ -347,6 +356,10 @@ def str_replace(replacement: str, trims: Sequence[tuple[str, str]], implementati
         implementation: 实现方式选择:
             - "loop": 循环遍历方式（最易读）
             - "reduce": 函数式编程方式（平衡性能与可读性）
+            - "automaton": Aho-Corasick 单次扫描同时替换，与 re_compile 结果一致，规则很多时最快
+            - "longest": 同 "automaton"，同一起点取最长的规则
+            注意 "loop"/"reduce" 逐条链式替换（前一条的结果会被后一条再次替换），
+            "automaton"/"longest" 对原文同时替换，两者在规则相互包含时结果不同
 
     Returns:
         str: 完成所有替换后的字符串
@@ -360,6 +373,8 @@ def str_replace(replacement: str, trims: Sequence[tuple[str, str]], implementati
         'AbCde'
         >>> str_replace('hello', [('l', 'x')], implementation='loop')
         'hexxo'
+        >>> str_replace('abc', [('a', 'b'), ('b', 'c')], implementation='automaton')
+        'bcc'
     """
     # 输入验证
     if not isinstance(replacement, str):
@@ -385,16 +400,25 @@ def str_replace(replacement: str, trims: Sequence[tuple[str, str]], implementati
         # 实现方式2: 函数式编程（原始实现）
         return reduce(lambda strtmp, item: strtmp.replace(item[0], item[1]), trims, replacement)
 
-    msg = f"无效实现方式: {implementation}，请选择'loop'/'reduce'"
+    if implementation in ('automaton', 'longest'):
+        # 实现方式3: 自动机（规则按内容缓存，单次扫描）
+        return compile_rules(tuple((search, replace) for search, replace in trims), implementation).sub(replacement)
+
+    msg = f"无效实现方式: {implementation}，请选择'loop'/'reduce'/'automaton'/'longest'"
     raise ValueError(msg)
 
 
-def str_clean(replacement: str, trims: Sequence[str]) -> str:
+def str_clean(
+    replacement: str,
+    trims: Sequence[str],
+    implementation: Literal['loop', 'reduce', 'automaton', 'longest'] = 'reduce',
+) -> str:
     """字符清除，通过调用 str_replace 实现将指定子字符串替换为空字符串。
 
     Args:
         replacement: 待处理的字符串
         trims: 包含要清除的子字符串的序列
+        implementation: 同 str_replace，清除词很多（如屏蔽词表）时使用 "automaton"
 
     Returns:
         str: 清除指定子字符串后的结果
@@ -405,8 +429,290 @@ def str_clean(replacement: str, trims: Sequence[str]) -> str:
     """
     # 将清除规则转换为 str_replace 所需的 (search, replace) 格式
     replace_rules = [(item, '') for item in trims]
-    # 使用 reduce 实现方式保持与原逻辑一致
-    return str_replace(replacement, replace_rules, implementation='reduce')
+    return str_replace(replacement, replace_rules, implementation=implementation)
+
+
+RuleMode = Literal['sequential', 'combined', 'automaton', 'longest']
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式字面量替换,单次扫描完成全部替换,耗时与规则数量基本无关。
+
+    匹配语义(均为自左向右、互不重叠):
+        - "first": 起点最靠左者优先,同一起点按规则顺序取第一条,与 re_compile 结果一致
+        - "longest": 起点最靠左者优先,同一起点取最长的一条
+
+    同一查找串出现多次时,优先级按首次出现的位置,替换值取最后一次,与 re_compile 一致。
+    扫描不回退: 候选匹配之后已读过的文本中的匹配暂存起来,候选提交后依次接替。
+
+    Examples:
+        >>> AhoCorasick([('he', 'X'), ('hers', 'Y')]).sub('ushers')
+        'usXrs'
+        >>> AhoCorasick([('he', 'X'), ('hers', 'Y')], match='longest').sub('ushers')
+        'usY'
+    """
+
+    __slots__ = ('_better', '_depth', '_fail', '_goto', '_link', '_match', '_rank', '_repls', '_starts', 'match')
+
+    def __init__(self, rules: Iterable[tuple[str, str]], match: Literal['first', 'longest'] = 'first'):
+        if match not in ('first', 'longest'):
+            msg = f"无效匹配方式: {match}，请选择'first'/'longest'"
+            raise ValueError(msg)
+        self.match = match
+        replacements: dict[str, str] = {}
+        for idx, (search, repl) in enumerate(rules):
+            if not search:
+                msg = f'替换规则[{idx}]的查找字符串不能为空'
+                raise ValueError(msg)
+            replacements[search] = repl
+
+        # 状态 0 为根;_match[s] 为以 s 结尾的规则序号(-1 表示无),_link[s] 为失败链上下一个有匹配的状态
+        goto: list[dict[str, int]] = [{}]
+        depth = [0]
+        matched = [-1]
+        for idx, search in enumerate(replacements):
+            state = 0
+            for ch in search:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    depth.append(depth[state] + 1)
+                    matched.append(-1)
+                state = nxt
+            matched[state] = idx
+
+        fail = [0] * len(goto)
+        link = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch) != nxt else 0
+                link[nxt] = fail[nxt] if matched[fail[nxt]] >= 0 else link[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._link = link
+        self._depth = depth
+        self._match = matched
+        self._repls = list(replacements.values())
+        # 同一起点的候选比较键,越小越优先
+        rank = list(range(len(replacements))) if match == 'first' else [-len(key) for key in replacements]
+        self._rank = rank
+        # _better[s]: 从 s 继续匹配可能得到的规则中最优的比较键,不优于当前候选时无需继续向后查看
+        worst = max(rank, default=0) + 1
+        better = [worst] * len(goto)
+        for state in reversed([0, *order]):
+            for nxt in goto[state].values():
+                better[state] = min(better[state], better[nxt], rank[matched[nxt]] if matched[nxt] >= 0 else worst)
+        self._better = better
+        # 根状态下跳到下一个可能的起始字符
+        self._starts = re.compile('[' + ''.join(re.escape(ch) for ch in goto[0]) + ']') if goto[0] else None
+
+    def __len__(self) -> int:
+        return len(self._repls)
+
+    def sub(self, replacement: str) -> str:
+        """对字符串执行替换"""
+        starts = self._starts
+        if starts is None:
+            return replacement
+        goto, fail, link, depth, matched, rank, better = self._goto, self._fail, self._link, self._depth, self._match, self._rank, self._better
+        out: list[str] = []
+        size = len(replacement)
+        pos = 0  # 已输出到的位置
+        i = 0
+        state = 0
+        best = -1  # 当前候选规则序号
+        best_start = best_end = 0
+        # 起点不早于 best_end 的已结束匹配 (起点, 比较键, 终点, 规则序号),best 提交后从中接替
+        pending: list[tuple[int, int, int, int]] = []
+        while True:
+            if best < 0:
+                if state == 0:
+                    found = starts.search(replacement, i)
+                    if found is None:
+                        break
+                    i = found.start()
+            elif i >= size or i - depth[state] > best_start or (i - depth[state] == best_start and better[state] >= rank[best]):
+                # 仍在进行的部分匹配既没有更靠左的起点,同一起点也不会得到更优的规则: 提交候选
+                out.append(replacement[pos:best_start])
+                out.append(self._repls[best])
+                pos = best_end
+                # 丢弃越过 pos 的部分匹配,从当前位置接着扫描,不回退
+                while depth[state] > i - pos:
+                    state = fail[state]
+                best = -1
+                while pending:
+                    start, _, end, idx = heapq.heappop(pending)
+                    if start >= pos:
+                        best, best_start, best_end = idx, start, end
+                        break
+                continue
+            if i >= size:
+                break
+            ch = replacement[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            i += 1
+            # 枚举以 i 结尾的全部规则
+            s = state if matched[state] >= 0 else link[state]
+            while s:
+                idx = matched[s]
+                start = i - depth[s]
+                if best < 0 or start < best_start or (start == best_start and rank[idx] < rank[best]):
+                    best, best_start, best_end = idx, start, i
+                    pending.clear()
+                elif start >= best_end:
+                    heapq.heappush(pending, (start, rank[idx], i, idx))
+                s = link[s]
+        out.append(replacement[pos:])
+        return ''.join(out)
+
+    __call__ = sub
+
+
+class RuleSet:
+    """预编译的替换规则集,创建时完成全部校验与编译,可重复用于任意多个字符串。
+
+    模式:
+        - "sequential": 按顺序逐条应用正则替换,与 re_sub 一致
+        - "combined": 规则按字面量合并为单个正则一次替换,与 re_compile 一致
+        - "automaton": 字面量规则交给 AhoCorasick 单次扫描替换,结果与 "combined" 一致,适合成百上千条规则
+        - "longest": 同 "automaton",但同一起点取最长的规则
+
+    一般通过 compile_rules 获取,相同规则只编译一次。
+
+    Examples:
+        >>> rules = RuleSet([('\\d+', ''), ('[a-c]', 'X')])
+        >>> rules.sub('abc123def')
+        'XXXdef'
+        >>> RuleSet([('a', 'b'), ('b', 'c')], mode='combined')('abc')
+        'bcc'
+    """
+
+    __slots__ = ('_apply', 'mode', 'rules')
+
+    def __init__(self, rules: Iterable[tuple[str, str]], mode: RuleMode = 'sequential'):
+        self.rules = tuple(rules)
+        self.mode = mode
+        if mode == 'sequential':
+            self._apply = self._build_sequential()
+        elif mode == 'combined':
+            self._apply = self._build_combined()
+        elif mode in ('automaton', 'longest'):
+            self._apply = self._build_automaton()
+        else:
+            msg = f"无效模式: {mode}，请选择'sequential'/'combined'/'automaton'/'longest'"
+            raise ValueError(msg)
+
+    def __repr__(self) -> str:
+        return f'RuleSet({len(self.rules)} rules, mode={self.mode!r})'
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _build_sequential(self) -> Callable[[str], str]:
+        steps: list[Callable[[str], str]] = []
+        for idx, (pattern, repl) in enumerate(self.rules):
+            if not isinstance(pattern, str) or not isinstance(repl, str):
+                msg = f'规则[{idx}]必须包含两个字符串'
+                raise TypeError(msg)
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                msg = f'规则[{idx}]正则表达式无效: {e}'
+                raise re.error(msg) from e
+            if re.escape(pattern) == pattern and '\\' not in repl:
+                # 纯字面量且替换串无转义时 str.replace 结果相同且更快
+                steps.append(lambda text, old=pattern, new=repl: text.replace(old, new))
+            else:
+                steps.append(partial(compiled.sub, repl))
+
+        if not steps:
+            return str
+        if len(steps) == 1:
+            return steps[0]
+
+        def apply(text: str) -> str:
+            for step in steps:
+                text = step(text)
+            return text
+
+        return apply
+
+    def _literal_rules(self) -> dict[str, str]:
+        """校验字面量规则,返回 {查找串: 替换串},键按首次出现排序、值取最后一次"""
+        replacements: dict[str, str] = {}
+        for idx, rule in enumerate(self.rules):
+            if not isinstance(rule, tuple) or len(rule) != 2:
+                msg = f'规则[{idx}]必须是包含两个元素的元组'
+                raise TypeError(msg)
+            pattern_str, repl_str = rule
+            if not isinstance(pattern_str, str) or not isinstance(repl_str, str):
+                msg = f'规则[{idx}]的元素必须是字符串'
+                raise TypeError(msg)
+            replacements[pattern_str] = repl_str
+        return replacements
+
+    def _build_combined(self) -> Callable[[str], str]:
+        replacements = self._literal_rules()
+        if not replacements:
+            return str
+        if all(len(key) == 1 for key in replacements):
+            # 单字符规则之间不会竞争同一位置,等价于逐字符映射
+            table = str.maketrans(replacements)
+            return lambda text: text.translate(table)
+
+        # 同一查找串重复出现时,alternation 按首次出现的位置匹配,替换取最后一次的值
+        combined_pattern = re.compile('|'.join(re.escape(rule[0]) for rule in self.rules))
+        lookup = replacements.__getitem__
+        return partial(combined_pattern.sub, lambda match: lookup(match.group()))
+
+    def _build_automaton(self) -> Callable[[str], str]:
+        replacements = self._literal_rules()
+        if '' in replacements and self.mode == 'automaton':
+            # 空查找串在每个位置都匹配,自动机不处理,交给正则以保持与 re_compile 一致
+            return self._build_combined()
+        return AhoCorasick(replacements.items(), 'first' if self.mode == 'automaton' else 'longest').sub
+
+    def sub(self, replacement: str) -> str:
+        """对字符串应用规则集"""
+        return self._apply(replacement)
+
+    __call__ = sub
+
+
+@lru_cache(maxsize=256)
+def _cached_rule_set(rules: tuple, mode: str) -> RuleSet:
+    return RuleSet(rules, mode)  # type: ignore[arg-type]
+
+
+def compile_rules(rules: Iterable[tuple[str, str]], mode: RuleMode = 'sequential') -> RuleSet:
+    """按规则内容缓存的 RuleSet 构造函数(LRU,最多256组规则)。
+
+    规则元组相同即命中缓存,不再重复校验与编译;规则中含不可哈希的元素(如列表)时直接新建。
+
+    Examples:
+        >>> compile_rules([('a', 'b')]) is compile_rules([('a', 'b')])
+        True
+    """
+    key = tuple(rules)
+    try:
+        return _cached_rule_set(key, mode)
+    except TypeError as e:
+        if 'unhashable' not in str(e):
+            raise
+    return RuleSet(key, mode)
 
 
 def re_sub(replacement: str, trims: Sequence[tuple[str, str]]) -> str:
@@ -432,27 +738,11 @@ def re_sub(replacement: str, trims: Sequence[tuple[str, str]]) -> str:
         msg = f"'replacement'必须是字符串，实际为{type(replacement).__name__}"
         raise TypeError(msg)
 
-    # 预编译正则表达式并验证规则
-    compiled_rules = []
-    for idx, (pattern, repl) in enumerate(trims):
-        if not isinstance(pattern, str) or not isinstance(repl, str):
-            msg = f'规则[{idx}]必须包含两个字符串'
-            raise TypeError(msg)
-        try:
-            compiled_pattern = re.compile(pattern)
-            compiled_rules.append((compiled_pattern, repl))
-        except re.error as e:
-            msg = f'规则[{idx}]正则表达式无效: {e}'
-            raise re.error(msg) from e
-
-    if not compiled_rules:
-        return replacement
-
-    # 使用预编译模式进行替换，提升性能
-    return reduce(lambda str_tmp, rule: rule[0].sub(rule[1], str_tmp), compiled_rules, replacement)
+    # 规则集按内容缓存,相同规则只校验、编译一次
+    return compile_rules(trims, 'sequential').sub(replacement)
 
 
-def re_compile(replacement: str, replace_rules: Sequence[tuple[str, str]]) -> str:
+def re_compile(replacement: str, replace_rules: Sequence[tuple[str, str]], implementation: Literal['regex', 'automaton'] = 'regex') -> str:
     """使用编译的正则表达式模式集对字符串进行一次性替换。
 
     与re_sub的功能区别:
@@ -470,6 +760,8 @@ def re_compile(replacement: str, replace_rules: Sequence[tuple[str, str]]) -> st
     Args:
         replacement: 待处理的原始字符串
         replace_rules: 包含替换规则的序列，每个规则为(search_str, replace_str)元组
+        implementation: "regex" 合并为单个正则；"automaton" 使用 Aho-Corasick 自动机，
+            结果相同，规则数量达到数百条以上时明显更快
 
     Returns:
         str: 应用所有替换规则后的结果字符串
@@ -498,41 +790,152 @@ def re_compile(replacement: str, replace_rules: Sequence[tuple[str, str]]) -> st
         msg = f"'replace_rules'必须是序列类型，实际为{type(replace_rules).__name__}"
         raise TypeError(msg)
 
-    # 验证规则格式并提取模式
-    patterns = []
-    replacements: dict[str, str] = {}
-    for idx, rule in enumerate(replace_rules):
-        if not isinstance(rule, tuple) or len(rule) != 2:
-            msg = f'规则[{idx}]必须是包含两个元素的元组'
-            raise TypeError(msg)
+    if implementation not in ('regex', 'automaton'):
+        msg = f"无效实现方式: {implementation}，请选择'regex'/'automaton'"
+        raise ValueError(msg)
+
+    # 规则集按内容缓存,相同规则只校验、编译一次
+    return compile_rules(replace_rules, 'combined' if implementation == 'regex' else 'automaton').sub(replacement)
+
+
+def _safe_end_blank(text: str) -> int:
+    """末尾的空格串及其前面的 \\r / \\u200b 可能与后续文本组成匹配"""
+    cut = len(text.rstrip(' '))
+    return cut - 1 if cut and text[cut - 1] in '\r\u200b' else cut
 
-        pattern_str, repl_str = rule
-        if not isinstance(pattern_str, str) or not isinstance(repl_str, str):
-            msg = f'规则[{idx}]的元素必须是字符串'
-            raise TypeError(msg)
 
-        escaped_pattern = re.escape(pattern_str)
-        patterns.append(escaped_pattern)
-        replacements[pattern_str] = repl_str
+def _safe_end_comma(text: str) -> int:
+    """末尾的「空格 + 逗号串」可能与后续逗号组成匹配"""
+    cut = len(text.rstrip('，'))
+    return cut - 1 if cut and text[cut - 1] == ' ' else len(text)
 
-    if not patterns:
-        return replacement
 
-    # 编译组合模式
-    combined_pattern = re.compile('|'.join(patterns))
+# str_split_limited_list 的清理步骤: (模式, 替换, 可安全处理的前缀长度)
+_SEGMENT_CLEAN: tuple[tuple[Pattern[str], str, Callable[[str], int]], ...] = (
+    (re.compile(r'[\r\u200b] | {2,}'), '', _safe_end_blank),
+    (re.compile(r'\n+'), ' ', lambda text: len(text.rstrip('\n'))),
+    (re.compile(r'([ 。！？]){2,}'), r'\1', lambda text: len(text.rstrip(' 。！？'))),
+    (re.compile(r' ，{2,}'), '，', _safe_end_comma),
+)
+# 分割点优先级: 句末标点 > 逗号分号 > 空白
+_SEGMENT_SEPS = (re.compile(r'[。！？]'), re.compile(r'[，；]'), re.compile(r'\s'))
 
-    # 执行替换
-    def replace_match(match: re.Match) -> str:
-        matched_str = match.group()
-        return str(replacements.get(matched_str, matched_str))  # 明确转换为str类型
 
-    return combined_pattern.sub(replace_match, replacement)
+def _stream_sub(chunks: Iterable[str], pattern: Pattern[str], repl: str, safe_end: Callable[[str], int]) -> Iterator[str]:
+    """分块执行 pattern.sub,末尾可能跨块匹配的部分留到下一块,结果与整体替换一致"""
+    carry = ''
+    for chunk in chunks:
+        text = carry + chunk if carry else chunk
+        cut = safe_end(text)
+        if cut:
+            yield pattern.sub(repl, text[:cut])
+        carry = text[cut:]
+    if carry:
+        yield pattern.sub(repl, carry)
+
+
+def _coalesce(chunks: Iterable[str], size: int) -> Iterator[str]:
+    """把零碎的小块(如文件逐行)合并为不小于 size 的块,减少逐块处理的固定开销"""
+    parts: list[str] = []
+    total = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        total += len(chunk)
+        if total >= size:
+            yield ''.join(parts)
+            parts.clear()
+            total = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def iter_split_limited(chunks: Iterable[str], minlen: int = 100, maxlen: int = 300) -> Iterator[str]:
+    """str_split_limited_list 的流式版本,逐块读入文本(如文件的各行),逐段产出,结果与之完全一致。
+
+    单次扫描,耗时与输入长度成线性;零碎的输入块先合并到约 8K 字符再处理,
+    除当前一块输入外,只缓存不超过 maxlen 的待分割文本与最后两段结果。
+
+    Args:
+        chunks: 文本块的可迭代对象,各块首尾相接即为完整文本
+        minlen: 最小段落长度
+        maxlen: 最大段落长度
+
+    Examples:
+        >>> with open('book.txt', encoding='utf-8') as f:
+        ...     for segment in iter_split_limited(f, 50, 200):
+        ...         tts(segment)
+    """
+    cleaned: Iterable[str] = _coalesce(chunks, 8192)
+    for pattern, repl, safe_end in _SEGMENT_CLEAN:
+        cleaned = _stream_sub(cleaned, pattern, repl, safe_end)
+
+    buf = ''
+    pos = 0  # buf 中待分割文本的起点
+    base = 0  # buf[pos] 在清理后全文中的位置
+    # 已扫描到的全文位置,以及其前各级分割符最后一次出现的位置;
+    # 窗口右移时只需扫描新进入窗口的部分,每个字符只扫描一次
+    scanned = 0
+    last = [-1] * len(_SEGMENT_SEPS)
+    held: list[str] = []  # 最后一段可能需要并入前一段,始终保留最近两段
+    started = False
+
+    def split(limit: int) -> str:
+        """在 [base, base + limit) 内按优先级找最后一个满足 minlen 的分割点,返回该段"""
+        nonlocal pos, base, scanned
+        bound = base + limit
+        if bound > scanned:
+            # 分割符均为单个字符,在反转后的新增部分中正向查找即为最后一次出现
+            fresh = buf[pos + scanned - base : pos + limit][::-1]
+            for k, sep in enumerate(_SEGMENT_SEPS):
+                m = sep.search(fresh)
+                if m is not None:
+                    last[k] = bound - 1 - m.start()
+            scanned = bound
+        cut = limit
+        for found in last:
+            if found >= base and found - base + 1 > minlen:
+                cut = found - base + 1
+                break
+        segment = buf[pos : pos + cut]
+        pos += cut
+        base += cut
+        return segment
+
+    def push(segment: str) -> Iterator[str]:
+        held.append(segment)
+        if len(held) > 2:
+            yield held.pop(0)
+
+    for chunk in cleaned:
+        if not chunk:
+            continue
+        buf = buf[pos:] + chunk
+        pos = 0
+        # 首段须确认全文超过 maxlen;此后窗口内容与后续输入无关,满 maxlen 即可分割
+        while len(buf) - pos > maxlen or (started and len(buf) - pos == maxlen):
+            started = True
+            yield from push(split(maxlen))
+
+    rest = len(buf) - pos
+    if not started:
+        if rest:
+            yield buf[pos:]
+        return
+    while rest:
+        yield from push(split(min(rest, maxlen)))
+        rest = len(buf) - pos
+
+    if len(held) > 1 and len(held[-1]) < minlen:
+        tail = held.pop()
+        held[-1] += tail
+    yield from held
 
 
 def str_split_limited_list(intext: str, minlen: int = 100, maxlen: int = 300) -> list[str]:
     """将输入的字符串分割成若干个段落，每个段落的长度在minlen和maxlen之间。
 
-    优先在句子结束符（。！？）处分割，其次在逗号、分号处分割，最后在空格处分割
+    优先在句子结束符（。！？）处分割，其次在逗号、分号处分割，最后在空格处分割；
+    由 iter_split_limited 单次扫描实现，长文本或文件分块输入可直接使用 iter_split_limited。
 
     Args:
         intext: 输入的字符串
@@ -547,58 +950,75 @@ def str_split_limited_list(intext: str, minlen: int = 100, maxlen: int = 300) ->
         >>> len(paragraphs)  # 返回段落数量
         5
     """
+    return list(iter_split_limited([intext], minlen, maxlen))
 
-    # 清理文本
-    cleaned_text = re.sub(r'[\r\u200b] | {2,}', '', intext)
-    cleaned_text = re.sub(r'\n+', ' ', cleaned_text)
-    cleaned_text = re.sub(r'([ 。！？]){2,}', r'\1', cleaned_text)
-    cleaned_text = re.sub(r' ，{2,}', '，', cleaned_text)
-
-    if len(cleaned_text) <= maxlen:
-        return [cleaned_text] if cleaned_text else []
-
-    segments = []
-    start = 0
-
-    while start < len(cleaned_text):
-        end = min(start + maxlen, len(cleaned_text))
-        segment = cleaned_text[start:end]
-
-        # 优先查找句号、感叹号、问号
-        for sep in [r'[。！？]', r'[，；]', r'\s']:
-            matches = list(re.finditer(sep, segment))
-            if matches:
-                # 找到最后一个满足 minlen 条件的分割点
-                for m in reversed(matches):
-                    if m.end() > minlen:
-                        split_pos = m.end()
-                        segments.append(segment[:split_pos])
-                        start += split_pos
-                        break
-                else:
-                    # 没有满足 minlen 的分割点，则继续下一级分隔符
-                    continue
-                break
+
+Measure = Literal['chars', 'bytes'] | Callable[[str], int]
+
+
+def _measure_func(measure: Measure) -> Callable[[str], int]:
+    """长度预算的计量函数: 字符数、UTF-8 字节数或自定义(如分词器的 token 计数)"""
+    if measure == 'chars':
+        return len
+    if measure == 'bytes':
+        return lambda text: len(text.encode('utf-8'))
+    if callable(measure):
+        return measure
+    msg = f"无效计量方式: {measure}，请选择'chars'/'bytes'或传入计量函数"
+    raise ValueError(msg)
+
+
+def _pack_groups(items: Iterable[Any], cost: Callable[[Any], int], maxlen: int) -> Iterator[list[Any]]:
+    """按预算贪心分组: 当前组放不下时另起一组,单项超出预算时独占一组。
+
+    与 str2list 原逻辑一致,首项即超出预算时先产出一个空组。
+    """
+    group: list[Any] = []
+    used = 0
+    for item in items:
+        size = cost(item)
+        if used + size <= maxlen:
+            group.append(item)
+            used += size
         else:
-            # 无合适分割点时，强制截断
-            segments.append(segment)
-            start += maxlen
+            yield group
+            group = [item]
+            used = size
+    if group:
+        yield group
 
-    # 合并最后一段如果太短
-    if len(segments) > 1 and len(segments[-1]) < minlen:
-        segments[-2] += segments.pop()
 
-    return segments
+def pack_sentences(sentences: Iterable[str], maxlen: int = 300, measure: Measure = 'chars') -> Iterator[str]:
+    """把句子按预算依次打包成段,每段只在结束时拼接一次。
+
+    Args:
+        sentences: 句子的可迭代对象
+        maxlen: 每段的预算上限
+        measure: 计量方式,"chars" 字符数、"bytes" UTF-8 字节数,或 (text) -> int 的计量函数(如分词器的 token 计数);
+            段的用量按各句用量之和计算,分词器跨句合并 token 的情况不计入
+
+    Examples:
+        >>> list(pack_sentences(['一二。', '三四。', '五六七。'], maxlen=7))
+        ['一二。三四。', '五六七。']
+        >>> list(pack_sentences(['一二。', '三四。', '五六七。'], maxlen=18, measure='bytes'))
+        ['一二。三四。', '五六七。']
+    """
+    for group in _pack_groups(sentences, _measure_func(measure), maxlen):
+        if group:
+            yield ''.join(group)
 
 
-def str2list(intext: str, maxlen: int = 300) -> list[str]:
+def str2list(intext: str, maxlen: int = 300, measure: Measure = 'chars') -> list[str]:
     """将输入的字符串分割成若干个段落，每个段落的长度不超过 maxlen。
 
-    基于中文句号分割文本，适用于中文段落处理
+    基于中文句号分割文本，适用于中文段落处理。句子按预算累计用量，每段只在结束时拼接一次，
+    耗时与文本长度成线性；首句即超过 maxlen 时结果以空串开头（与原实现一致）。
 
     Args:
         intext: 输入的字符串
         maxlen: 最大段落长度
+        measure: 长度的计量方式，"chars" 字符数、"bytes" UTF-8 字节数，
+            或 (text) -> int 的计量函数（如分词器的 token 计数，按各句之和计算）
 
     Returns:
         list: 分割后的段落列表
@@ -607,34 +1027,18 @@ def str2list(intext: str, maxlen: int = 300) -> list[str]:
         >>> paragraphs = str2list('这是第一段。这是第二段。', 20)
         >>> len(paragraphs)  # 返回段落数量
         2
+        >>> str2list('这是第一段。这是第二段。', 24, measure='bytes')
+        ['这是第一段。', '这是第二段。']
     """
     # 预处理文本，将各种换行符和特殊字符转换为句号
-    processed_text = str_replace(
+    text = str_replace(
         intext,
         [('\r', '。'), ('\n', '。'), (' ', ''), ('\u200b', ''), ('。。', '。')],
     )
+    sentence_list = [f'{item}。' for item in text.split('。') if item]
 
-    # 分割文本
-    sentence_list = processed_text.split('。')
-    sentence_list = [f'{item}。' for item in sentence_list if item]
-
-    result_list = []
-    temp_str = ''
-
-    for sentence in sentence_list:
-        # 如果当前段落长度不超过最大长度，则继续添加新的句子
-        if len(temp_str + sentence) <= maxlen:
-            temp_str += sentence
-        else:
-            # 否则，当前段落结束，添加到段落列表中
-            result_list.append(temp_str)
-            temp_str = sentence
-
-    # 处理最后一个段落
-    if temp_str:
-        result_list.append(temp_str)
-
-    return result_list
+    # 首句即超出预算时 _pack_groups 先产出空组，对应结果开头的空串
+    return [''.join(group) for group in _pack_groups(sentence_list, _measure_func(measure), maxlen)]
 
 
 def dict2qss(dict_tmp: dict) -> str:
@@ -798,6 +1202,169 @@ def obj_to_str(obj: Any) -> str:
     return str(obj)
 
 
+# 整块拼接处理时的分隔符,字面量规则不含该字符时匹配不会跨越元素边界
+_BATCH_SEP = '\x00'
+
+
+class _RuleStep:
+    """批量处理中的一步规则替换,可被进程池序列化,子进程中按规则重新取得缓存的规则集"""
+
+    __slots__ = ('_joinable', '_sub', 'kind', 'rules')
+
+    def __init__(self, kind: str, rules: Iterable[tuple[str, str]]):
+        self.kind = kind
+        self.rules = tuple(rules)
+        if kind in ('loop', 'reduce'):
+            self._sub = partial(reduce, lambda text, rule: text.replace(rule[0], rule[1]), self.rules)
+        else:
+            self._sub = compile_rules(self.rules, kind).sub  # type: ignore[arg-type]
+        # 字面量规则可把整块拼成一个字符串一次处理,省去逐个调用的开销
+        self._joinable = kind != 'sequential' and all(search and _BATCH_SEP not in search and _BATCH_SEP not in repl for search, repl in self.rules)
+
+    def apply_many(self, chunk: list[Any]) -> list[Any] | None:
+        """整块处理,无法保证与逐个处理结果一致时返回 None"""
+        if not self._joinable or len(chunk) < 2:
+            return None
+        try:
+            joined = _BATCH_SEP.join(chunk)
+        except TypeError:  # 含非字符串元素
+            return None
+        if joined.count(_BATCH_SEP) != len(chunk) - 1:
+            return None
+        return self._sub(joined).split(_BATCH_SEP)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (_RuleStep, (self.kind, self.rules))
+
+    def __call__(self, text: str) -> str:
+        if not isinstance(text, str):
+            msg = f"'replacement'必须是字符串，实际为{type(text).__name__}"
+            raise TypeError(msg)
+        return self._sub(text)
+
+
+def _apply_chunk(funcs: tuple[Callable[[str], str], ...], chunk: list[Any], keep_non_str: bool) -> list[Any]:
+    """对一块数据依次应用 funcs,进程池中执行"""
+    if len(funcs) == 1 and isinstance(funcs[0], _RuleStep):
+        out = funcs[0].apply_many(chunk)
+        if out is not None:
+            return out
+    if len(funcs) == 1 and not keep_non_str:
+        return list(map(funcs[0], chunk))
+    out = []
+    append = out.append
+    for item in chunk:
+        if keep_non_str and not isinstance(item, str):
+            append(item)
+            continue
+        for func in funcs:
+            item = func(item)
+        append(item)
+    return out
+
+
+def iter_batch(
+    values: Iterable[Any],
+    *funcs: Callable[[str], str],
+    chunksize: int = 10000,
+    processes: int | None = 0,
+    keep_non_str: bool = True,
+) -> Iterator[Any]:
+    """按块对字符串序列依次应用 funcs,按输入顺序逐个产出结果,不预先读取全部输入。
+
+    Args:
+        values: 字符串的可迭代对象(列表、生成器、pandas Series 等)
+        funcs: 依次应用的单字符串处理函数;使用进程池时必须可被 pickle(模块级函数、partial 等)
+        chunksize: 每块的元素数
+        processes: 进程数,0 时在当前进程中执行,None 为 CPU 核数;输入不足一块时总在当前进程中执行
+        keep_non_str: 非字符串元素(None、NaN 等)原样保留,为 False 时同样交给 funcs 处理
+    """
+    if chunksize < 1:
+        msg = f'chunksize必须大于0,当前为: {chunksize}'
+        raise ValueError(msg)
+    processes = (os.cpu_count() or 1) if processes is None else processes
+    iterator = iter(values)
+    first = list(islice(iterator, chunksize))
+    second = list(islice(iterator, chunksize)) if first else []
+    chunks = iter(lambda: list(islice(iterator, chunksize)), [])
+    if not processes or not second:
+        for chunk in (first, second):
+            yield from _apply_chunk(funcs, chunk, keep_non_str)
+        for chunk in chunks:
+            yield from _apply_chunk(funcs, chunk, keep_non_str)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque(pool.submit(_apply_chunk, funcs, chunk, keep_non_str) for chunk in (first, second))
+        for chunk in chunks:
+            # 最多 processes * 2 块在途,按提交顺序取回结果
+            while len(pending) >= processes * 2:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(_apply_chunk, funcs, chunk, keep_non_str))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def batch_apply(
+    values: Iterable[Any],
+    *funcs: Callable[[str], str],
+    chunksize: int = 10000,
+    processes: int | None = 0,
+    keep_non_str: bool = True,
+) -> Any:
+    """批量对字符串序列依次应用 funcs,保持输入顺序,返回与输入相同的容器类型。
+
+    - pandas Series: 返回同 index、同 name 的 Series
+    - numpy 数组: 返回同形状的 object 数组
+    - 其余可迭代对象: 返回列表
+
+    Series / 数组的结果直接写入 numpy 数组,不生成中间列表。pandas 与 numpy 均为可选依赖,
+    仅当输入本身是它们的对象时才会用到。参数同 iter_batch。
+
+    Examples:
+        >>> batch_apply(['a1', 'b2'], partial(re_sub, trims=[('\\d', '')]))
+        ['a', 'b']
+    """
+    options = {'chunksize': chunksize, 'processes': processes, 'keep_non_str': keep_non_str}
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(values, pd.Series):
+        np = sys.modules['numpy']
+        data = np.fromiter(iter_batch(values, *funcs, **options), dtype=object, count=len(values))
+        return pd.Series(data, index=values.index, name=values.name, dtype=object)
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray):
+        flat = values.ravel()
+        return np.fromiter(iter_batch(flat, *funcs, **options), dtype=object, count=flat.size).reshape(values.shape)
+    return list(iter_batch(values, *funcs, **options))
+
+
+def format_html_batch(values: Iterable[Any], **batch_kwargs: Any) -> Any:
+    """format_html_string 的批量版本,batch_kwargs 同 batch_apply"""
+    return batch_apply(values, format_html_string, **batch_kwargs)
+
+
+def re_sub_batch(values: Iterable[Any], trims: Sequence[tuple[str, str]], **batch_kwargs: Any) -> Any:
+    """re_sub 的批量版本,规则只校验、编译一次,batch_kwargs 同 batch_apply"""
+    return batch_apply(values, _RuleStep('sequential', trims), **batch_kwargs)
+
+
+def str_clean_batch(
+    values: Iterable[Any],
+    trims: Sequence[str],
+    implementation: Literal['loop', 'reduce', 'automaton', 'longest'] = 'reduce',
+    **batch_kwargs: Any,
+) -> Any:
+    """str_clean 的批量版本,batch_kwargs 同 batch_apply"""
+    rules = [(item, '') for item in trims]
+    str_replace('', rules, implementation=implementation)  # 校验规则与实现方式
+    return batch_apply(values, _RuleStep(implementation, rules), **batch_kwargs)
+
+
+def remove_all_blank_batch(values: Iterable[Any], keep_blank: bool = True, custom_invisible: Pattern[str] | None = None, **batch_kwargs: Any) -> Any:
+    """remove_all_blank 的批量版本,batch_kwargs 同 batch_apply"""
+    return batch_apply(values, partial(remove_all_blank, keep_blank=keep_blank, custom_invisible=custom_invisible), **batch_kwargs)
+
+
 if __name__ == '__main__':
     # 测试函数定义
     def test_str_replace():
@@ -819,6 +1386,18 @@ if __name__ == '__main__':
         trims_list = [('A', 'aaa'), ('B', 'bbb')]
         print(re_compile(replacement, trims_list))
 
+    def test_aho_corasick():
+        import time
+
+        # 短规则命中后,同一起点的长规则部分匹配要走很远才失败: 扫描不回退时耗时仍为线性
+        replacement = 'a' * 20000
+        for trims_list in ([('a', 'X'), ('a' * 1000 + 'b', 'Y')], [('a' * 1000 + 'b', 'Y'), ('a', 'X')]):
+            start = time.perf_counter()
+            result = AhoCorasick(trims_list).sub(replacement)
+            elapsed = time.perf_counter() - start
+            assert result == re_compile(replacement, trims_list)
+            print(f'AhoCorasick 20000 chars: {elapsed * 1000:.1f}ms')
+
     # 运行单元测试
     from unittest import TestCase
 
@@ -851,6 +1430,7 @@ if __name__ == '__main__':
     test_str_clean()
     test_re_sub()
     test_re_compile()
+    test_aho_corasick()
 
     # 测试更多功能
     # str2 = "Powe, on；the 2333, 。哈哈 ！！\x08\x0e\U0001f914看看可以吗？一行代码就可以了！^_^"
@@ -13,10 +13,9 @@ Github       : https://github.com/sandorn/home
 
 from __future__ import annotations
 
-import os
 import pathlib
 
-from xt_bqg import get_contents, get_download_url
+from xt_bqg import crawl_hybrid, get_contents, get_download_url
 from xt_utils.files import save_file
 from xtthread.process import run_custom_process
 from xtwraps import timer
@@ -30,11 +29,20 @@ def new_get_contents(args):
 def cmpro(bookname, urls):
     res_list = run_custom_process(new_get_contents, [(i, url) for i, url in enumerate(urls, 1)])
     res_list.sort(key=lambda x: x[0])  # #排序
-    files = os.path.splitext(pathlib.Path(__file__).name)[0]
+    files = pathlib.Path(__file__).stem
     save_file(f'{files}&{bookname}&cmpro.txt', res_list, br='\n')
 
 
+@timer
+def cmhybrid(bookname, urls):
+    # 抓取走异步I/O,解析分块交给进程池
+    res_list = crawl_hybrid(urls, start=1, concurrency=64, chunk_size=16)
+    files = pathlib.Path(__file__).stem
+    save_file(f'{files}&{bookname}&cmhybrid.txt', res_list, br='\n')
+
+
 if __name__ == '__main__':
     url = 'https://www.bigee.cc/book/6909/'
     bookname, urls, _ = get_download_url(url)
     cmpro(bookname, urls[0:10])  # |<perf_counter: s>
+    # cmhybrid(bookname, urls[0:10])
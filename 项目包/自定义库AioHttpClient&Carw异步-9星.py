@@ -15,9 +15,10 @@ from __future__ import annotations
 
 import pathlib
 
-from xt_bqg import get_contents, get_download_url, resps_handle
-from xt_utils.files import save_file
+from xt_bqg import HostLimiter, get_contents, get_download_url, iter_contents, resps_handle
+from xt_utils.files import save_file, save_iter
 from xthttp import AsyncHttpClient, ahttp_get, ahttp_get_all
+from xtlog import mylog
 from xtthread import AsyncThreadPool
 from xtwraps import timer
 
@@ -41,6 +42,16 @@ def ahttp_GetAll(book_name, urls):
     save_file(f'{files}&{book_name}ahttp_get_all.txt', texts, br='\n')
 
 
+@timer
+def ahttp_AIMD(book_name, urls):
+    # 按主机自适应并发,替代 ahttp_get_all 的无上限并发
+    limiter = HostLimiter(initial=16, max_limit=200)
+    texts = iter_contents(urls, fn=ahttp_get, max_workers=200, limiter=limiter)
+    files = pathlib.Path(__file__).name.split('.')[0]
+    save_iter(f'{files}&{book_name}ahttp_AIMD.txt', texts, br='\n')
+    mylog(limiter.report())
+
+
 @timer
 def AsyncHttpClient_run(book_name, urls):
     texts = []
@@ -64,3 +75,4 @@ if __name__ == '__main__':
     # AioHttpCrawl_pool(book_name, urls[0:10])  # |perf_counter: 68.29s
     ahttp_GetAll(book_name, urls[0:10])  # |perf_counter: 56.20s
     # AsyncHttpClient_run(book_name, urls[0:10])  # |perf_counter: 42.20s
+    # ahttp_AIMD(book_name, urls[0:10])
@@ -15,8 +15,9 @@ from __future__ import annotations
 
 import pathlib
 
-from xt_bqg import get_contents, get_download_url
-from xt_utils.files import save_file
+from xt_bqg import CheckpointStore, RetryPolicy, crawl_with_retry, get_contents, get_download_url, iter_contents
+from xt_utils.files import save_file, save_iter
+from xtlog import mylog
 from xtthread import EnhancedThreadPool
 from xtwraps import timer
 
@@ -47,7 +48,40 @@ def myEnhancedThreadPool(book_name, urls_list):
     save_file(f'{files}&{book_name}AioHttpCrawl_pool.txt', texts, br='\n')
 
 
+@timer
+def myStreamPipeline(book_name, urls_list):
+    # 边抓取边按序写入,内存只保留重排窗口内的章节
+    files = pathlib.Path(__file__).name.split('.')[0]
+    save_iter(f'{files}&{book_name}StreamPipeline.txt', iter_contents(urls_list, max_workers=200), br='\n')
+
+
+@timer
+def myResumablePool(book_name, url, urls_list):
+    # 断点续传:重跑时只抓取缺失或失败的章节,最终文件由断点存储拼装
+    files = pathlib.Path(__file__).name.split('.')[0]
+    with CheckpointStore(f'{files}.db') as store:
+        thread_pool = EnhancedThreadPool(max_workers=200)
+        for i, chapter_url in store.pending(url, urls_list):
+            thread_pool.submit_task(get_contents, i, chapter_url, store=store, book=url)
+        thread_pool.wait_all_completed()
+        thread_pool.shutdown()
+        mylog(f'断点统计: {store.summary(url)}')
+        store.assemble(url, f'{files}&{book_name}ResumablePool.txt')
+
+
+@timer
+def myRetryPool(book_name, urls_list):
+    # 失败章节按真实序号退避重试,主机连续失败时熔断,结束时列出始终失败的章节
+    result = crawl_with_retry(urls_list, start=0, max_workers=200, policy=RetryPolicy(max_attempts=5))
+    mylog(result.report())
+    files = pathlib.Path(__file__).name.split('.')[0]
+    save_file(f'{files}&{book_name}RetryPool.txt', result.rows, br='\n')
+
+
 if __name__ == '__main__':
     url = 'https://www.bigee.cc/book/6909/'
     book_name, urls, _ = get_download_url(url)
     myEnhancedThreadPool(book_name, urls[0:10])  # | <Time-Consuming 77.5360s>
+    # myStreamPipeline(book_name, urls[0:10])
+    # myResumablePool(book_name, url, urls[0:10])
+    # myRetryPool(book_name, urls[0:10])